@@ -0,0 +1,340 @@
+"""Single-pass message analysis: phrase intents via an Aho-Corasick automaton plus lead extraction."""
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+
+ESCALATION_LABEL = "escalation"
+NAME_CUE_LABEL = "name_cue"
+
+DEFAULT_PHRASES: Dict[str, List[str]] = {
+    ESCALATION_LABEL: [
+        "talk to human",
+        "speak to agent",
+        "real person",
+        "customer service",
+        "help me please",
+        "not helpful",
+    ],
+    NAME_CUE_LABEL: ["my name is", "i am", "i'm", "i\u2019m"],
+}
+
+EMAIL_REGEX = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+_EMAIL_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+_EMAIL_DOMAIN_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.-")
+_PHONE_SEPARATORS = frozenset(" -.()")
+_LEAD_TRIGGERS = frozenset("0123456789+(@")
+_MONEY_MARKS = frozenset("#$€£¥₹%")
+# Words that introduce numbers which are not phone numbers ("order 123456789").
+_NUMBER_CUES = frozenset(
+    {"order", "invoice", "ref", "reference", "tracking", "account", "acct", "id", "no", "sku", "ticket", "receipt"}
+)
+_CURRENCY_WORDS = frozenset({"usd", "eur", "gbp", "ngn", "kes", "zar", "ghs", "inr", "naira", "dollars", "euros"})
+_NOT_NAMES = frozenset(
+    {
+        "a", "an", "the", "not", "in", "at", "on", "from", "with", "here", "there", "so", "very", "just",
+        "also", "still", "now", "interested", "looking", "trying", "having", "going", "calling", "writing",
+        "good", "fine", "ok", "okay", "sure", "sorry", "glad", "happy", "new", "available", "waiting", "done",
+    }
+)
+_NAME_WORD = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+_MAX_CACHED_EDGES = 128
+
+
+def _is_word_char(ch: str) -> bool:
+    """Return True for letters and digits of space-delimited scripts (CJK phrases skip boundary checks)."""
+    return ch.isalnum() and ord(ch) < 0x2E80
+
+
+def normalize_text(text: str) -> Tuple[str, str]:
+    """Collapse whitespace and return ``(text, lowered)`` with matching character offsets."""
+    collapsed = " ".join(text.split())
+    lowered = collapsed.lower()
+    if len(lowered) != len(collapsed):
+        # A few characters expand when lowercased (e.g. "İ"); keep offsets aligned.
+        lowered = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in collapsed)
+    return collapsed, lowered
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton matching many labelled phrases in one scan.
+
+    Transitions are resolved through failure links on first use and cached per state, so
+    steady-state matching costs one dict lookup per character regardless of phrase count.
+    """
+
+    def __init__(self, phrases: Dict[str, Iterable[str]]) -> None:
+        """Build the trie, failure links, and merged outputs for ``{label: phrases}``."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        self.phrase_count = 0
+        for label, items in phrases.items():
+            for phrase in items:
+                key = normalize_text(phrase)[1]
+                if key:
+                    self._insert(key, label)
+        self._link()
+        self._delta: List[Dict[str, int]] = [dict(edges) for edges in self._goto]
+
+    def _insert(self, key: str, label: str) -> None:
+        """Add one normalized phrase to the trie."""
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if (label, key) not in self._out[state]:
+            self._out[state].append((label, key))
+            self.phrase_count += 1
+
+    def _link(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _resolve(self, state: int, ch: str) -> int:
+        """Follow failure links for an uncached transition and cache the result."""
+        fallback = state
+        while fallback and ch not in self._goto[fallback]:
+            fallback = self._fail[fallback]
+        nxt = self._goto[fallback].get(ch, 0)
+        row = self._delta[state]
+        if len(row) < _MAX_CACHED_EDGES:
+            row[ch] = nxt
+        return nxt
+
+
+class MessageAnalysis:
+    """Intents and lead details found in one message."""
+
+    __slots__ = ("intents", "lead")
+
+    def __init__(self) -> None:
+        """Start with no matches."""
+        self.intents: Dict[str, List[str]] = {}
+        self.lead: Dict[str, str] = {}
+
+    @property
+    def escalate(self) -> bool:
+        """Return True when the customer asked for a human."""
+        return ESCALATION_LABEL in self.intents
+
+
+def _scan_phone(text: str, start: int) -> Tuple[Optional[str], int]:
+    """Read a phone-like span at ``start`` and return it if it passes the stricter checks, plus its end."""
+    n = len(text)
+    index = start + 1 if text[start] in "+(" else start
+    digits = 0
+    separators = 0
+    end = index
+    while index < n:
+        ch = text[index]
+        if ch.isdigit():
+            digits += 1
+            separators = 0
+            index += 1
+            end = index
+        elif ch in _PHONE_SEPARATORS and separators < 2:
+            separators += 1
+            index += 1
+        else:
+            break
+    candidate = text[start:end]
+    if not 9 <= digits <= 15:
+        return None, end
+    before = text[start - 1] if start else " "
+    after = text[end] if end < n else " "
+    if _is_word_char(before) or _is_word_char(after) or before in _MONEY_MARKS or after in _MONEY_MARKS:
+        return None, end
+    if after == "@" or (after == "." and end + 1 < n and text[end + 1].isdigit()):
+        return None, end
+    previous_word = text[max(start - 24, 0) : start].rstrip(" :#-").rsplit(" ", 1)[-1].lower().rstrip(".")
+    next_word = text[end : end + 12].strip().split(" ", 1)[0].lower() if end < n else ""
+    if previous_word in _NUMBER_CUES or next_word in _CURRENCY_WORDS:
+        return None, end
+    if re.search(r"\.\d{1,2}$", candidate):
+        return None, end
+    return candidate, end
+
+
+def _scan_email(text: str, at: int) -> Tuple[Optional[str], int]:
+    """Expand around an ``@`` and return the address if it is well formed, plus its end."""
+    start = at
+    while start > 0 and text[start - 1] in _EMAIL_LOCAL_CHARS:
+        start -= 1
+    end = at + 1
+    while end < len(text) and text[end] in _EMAIL_DOMAIN_CHARS:
+        end += 1
+    candidate = text[start:end].rstrip(".-")
+    if EMAIL_REGEX.fullmatch(candidate):
+        return candidate, end
+    return None, end
+
+
+def _read_name(text: str, end: int) -> Optional[str]:
+    """Read up to three name words after a name cue; words after the first must be capitalized."""
+    words: List[str] = []
+    for raw in text[end : end + 60].split(" "):
+        if not raw:
+            continue
+        word = raw.rstrip(",.!?;:")
+        if not _NAME_WORD.fullmatch(word):
+            break
+        if not words:
+            if word.lower() in _NOT_NAMES:
+                return None
+        elif not word[0].isupper():
+            break
+        words.append(word)
+        if len(words) == 3 or word != raw:
+            break
+    return " ".join(words).title() if words else None
+
+
+class MessageAnalyzer:
+    """Match configured phrases and extract lead details in one pass over each message.
+
+    Phrase sets default to :data:`DEFAULT_PHRASES` and may be overridden per label by a
+    JSON file (``{"label": ["phrase", ...]}``). The file is re-read when it changes, so
+    escalation and intent phrases can be edited without restarting the server.
+    """
+
+    def __init__(self, phrases_path: str = "", reload_interval: float = 5.0) -> None:
+        """Build the initial automaton and remember where to look for phrase updates."""
+        self.phrases_path = Path(phrases_path) if phrases_path else None
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.reloads = 0
+        self.last_error = ""
+        self._automaton = PhraseAutomaton(self._load_phrases())
+
+    def _load_phrases(self) -> Dict[str, List[str]]:
+        """Merge file-configured phrase lists over the defaults."""
+        phrases = {label: list(items) for label, items in DEFAULT_PHRASES.items()}
+        if self.phrases_path is None or not self.phrases_path.exists():
+            return phrases
+        self._mtime = self.phrases_path.stat().st_mtime
+        data = json.loads(self.phrases_path.read_text(encoding="utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("Phrase file must contain an object of label -> list of phrases.")
+        for label, items in data.items():
+            phrases[str(label)] = [str(item) for item in items]
+        return phrases
+
+    def reload(self) -> None:
+        """Rebuild the automaton from the phrase file, keeping the old one on errors."""
+        try:
+            automaton = PhraseAutomaton(self._load_phrases())
+        except Exception as exc:
+            self.last_error = str(exc)
+            print(f"Phrase reload failed: {exc}")
+            return
+        self._automaton = automaton
+        self.reloads += 1
+        self.last_error = ""
+
+    def _maybe_reload(self) -> None:
+        """Reload when the phrase file changed, checking at most once per interval."""
+        if self.phrases_path is None:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = self.phrases_path.stat().st_mtime
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self.reload()
+
+    def analyze(self, message: str) -> MessageAnalysis:
+        """Return matched intents and lead fields for a message."""
+        self._maybe_reload()
+        automaton = self._automaton
+        delta = automaton._delta
+        outputs = automaton._out
+        text, lowered = normalize_text(message)
+        analysis = MessageAnalysis()
+        lead = analysis.lead
+        skip_until = 0
+        state = 0
+
+        for index, ch in enumerate(lowered):
+            nxt = delta[state].get(ch)
+            state = automaton._resolve(state, ch) if nxt is None else nxt
+            if outputs[state]:
+                end = index + 1
+                for label, phrase in outputs[state]:
+                    start = end - len(phrase)
+                    # Require a word boundary before the phrase only, so plurals still match.
+                    if start and _is_word_char(phrase[0]) and _is_word_char(lowered[start - 1]):
+                        continue
+                    if label == NAME_CUE_LABEL:
+                        # A name cue must end at whitespace: "i amended" or "i'mma" is not "i am ...".
+                        if end < len(lowered) and not lowered[end].isspace():
+                            continue
+                        if "name" not in lead:
+                            name = _read_name(text, end)
+                            if name:
+                                lead["name"] = name
+                        continue
+                    matched = analysis.intents.setdefault(label, [])
+                    if phrase not in matched:
+                        matched.append(phrase)
+
+            if ch in _LEAD_TRIGGERS and index >= skip_until:
+                if ch == "@":
+                    if "email" not in lead:
+                        email, skip_until = _scan_email(text, index)
+                        if email:
+                            lead["email"] = email
+                elif "phone" not in lead and (index == 0 or not _is_word_char(text[index - 1])):
+                    phone, skip_until = _scan_phone(text, index)
+                    if phone:
+                        lead["phone"] = phone
+        return analysis
+
+    def stats(self) -> Dict[str, object]:
+        """Return phrase counts and reload status."""
+        return {
+            "phrases": self._automaton.phrase_count,
+            "states": len(self._automaton._goto),
+            "phrases_path": str(self.phrases_path or ""),
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
+
+
+message_analyzer = MessageAnalyzer(
+    phrases_path=settings.ANALYZER_PHRASES_PATH,
+    reload_interval=settings.ANALYZER_RELOAD_INTERVAL_SECONDS,
+)
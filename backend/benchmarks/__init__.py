@@ -0,0 +1 @@
+"""Offline benchmarks for the chatbot backend. Run modules from the backend directory."""
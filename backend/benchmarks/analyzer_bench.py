@@ -0,0 +1,142 @@
+"""Compare the single-pass message analyzer with the previous regex and substring scans.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.analyzer_bench --phrases 6 100 500 --messages 20000
+
+The legacy path runs the three lead regexes and a linear ``in`` scan over every
+escalation phrase, exactly as ``LeadService`` and ``HandoffService`` used to.
+"""
+
+import argparse
+import json
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from analyzer import DEFAULT_PHRASES, ESCALATION_LABEL, NAME_CUE_LABEL, MessageAnalyzer
+
+
+LEGACY_EMAIL = re.compile(r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b")
+LEGACY_PHONE = re.compile(r"\b(?:\+?\d{1,3})?[-.\s()]?\d{3,4}[-.\s()]?\d{3}[-.\s()]?\d{3,4}\b")
+LEGACY_NAME = re.compile(r"\b(?:my name is|i am|i'm)\s+([a-zA-Z][a-zA-Z\s'-]{1,40})\b", re.IGNORECASE)
+
+SAMPLE_MESSAGES = [
+    "Hi, what time do you open on Saturdays?",
+    "My name is Grace Okafor, you can reach me at grace.okafor@example.com or +234 803 123 4567.",
+    "Order 123456789 still hasn't arrived, can I talk to a real person?",
+    "How much is the premium plan? I saw 1,250,000.00 on the website.",
+    "Quiero hablar con un agente por favor",
+    "i'm looking for the price list for bulk orders",
+    "This is not helpful, I need customer service now",
+    "Do you deliver to Nairobi? My number is 0712 345 678.",
+]
+
+# Messages that contain numbers but no phone number; any phone found here is a false positive.
+NON_PHONE_MESSAGES = [
+    "Order 123456789 still hasn't arrived",
+    "my order #555123456 is late",
+    "It costs 1234567890 NGN in total",
+    "The invoice ref: 2024001234 is wrong",
+    "Tracking 9400111899223344556677 shows nothing",
+    "The price went from 123456789.50 to more",
+]
+
+
+def _synthetic_phrases(count: int, rng: random.Random) -> Dict[str, List[str]]:
+    """Return the default phrases padded with multilingual intent phrases up to ``count`` escalation entries."""
+    words = [
+        "agent", "human", "humano", "persona", "parler", "conseiller", "mensch", "sprechen", "manager",
+        "refund", "reembolso", "remboursement", "complaint", "queja", "urgent", "operator", "support", "help",
+    ]
+    phrases = {label: list(items) for label, items in DEFAULT_PHRASES.items()}
+    escalation = phrases[ESCALATION_LABEL]
+    while len(escalation) < count:
+        phrase = " ".join(rng.sample(words, rng.randint(2, 4)))
+        if phrase not in escalation:
+            escalation.append(phrase)
+    return phrases
+
+
+def legacy_analyze(message: str, escalation_phrases: List[str]) -> Dict[str, object]:
+    """Run the previous three regex searches and substring scan."""
+    data: Dict[str, str] = {}
+    name_match = LEGACY_NAME.search(message)
+    email_match = LEGACY_EMAIL.search(message)
+    phone_match = LEGACY_PHONE.search(message)
+    if name_match:
+        data["name"] = name_match.group(1).strip().title()
+    if email_match:
+        data["email"] = email_match.group(0).strip()
+    if phone_match:
+        data["phone"] = phone_match.group(0).strip()
+    lowered = message.lower()
+    escalate = any(phrase in lowered for phrase in escalation_phrases)
+    return {"lead": data, "escalate": escalate}
+
+
+def run(phrase_count: int, messages: int, seed: int = 7) -> Dict[str, object]:
+    """Time both implementations over the same message stream."""
+    rng = random.Random(seed)
+    phrases = _synthetic_phrases(phrase_count, rng)
+    with tempfile.TemporaryDirectory() as workdir:
+        phrases_path = Path(workdir) / "phrases.json"
+        phrases_path.write_text(json.dumps(phrases), encoding="utf-8")
+        analyzer = MessageAnalyzer(str(phrases_path))
+    stream = [SAMPLE_MESSAGES[rng.randrange(len(SAMPLE_MESSAGES))] for _ in range(messages)]
+    escalation = phrases[ESCALATION_LABEL]
+    for message in SAMPLE_MESSAGES * 50:
+        # Warm the regex cache and the automaton's lazily resolved transitions.
+        legacy_analyze(message, escalation)
+        analyzer.analyze(message)
+
+    started = time.perf_counter()
+    for message in stream:
+        legacy_analyze(message, escalation)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for message in stream:
+        analyzer.analyze(message)
+    analyzer_seconds = time.perf_counter() - started
+
+    return {
+        "phrases": len(escalation) + len(phrases[NAME_CUE_LABEL]),
+        "legacy_us": round(legacy_seconds / messages * 1e6, 2),
+        "analyzer_us": round(analyzer_seconds / messages * 1e6, 2),
+        "speedup": round(legacy_seconds / analyzer_seconds, 2),
+        "legacy_phone_false_positives": sum(
+            1 for message in NON_PHONE_MESSAGES if "phone" in legacy_analyze(message, escalation)["lead"]
+        ),
+        "analyzer_phone_false_positives": sum(
+            1 for message in NON_PHONE_MESSAGES if "phone" in analyzer.analyze(message).lead
+        ),
+    }
+
+
+def main() -> None:
+    """Run each phrase-set size and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", type=int, nargs="+", default=[6, 100, 500])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    results = [run(count, args.messages) for count in args.phrases]
+    columns = [
+        "phrases", "legacy_us", "analyzer_us", "speedup", "legacy_phone_false_positives",
+        "analyzer_phone_false_positives",
+    ]
+    print("  ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>14}" for column in columns))
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Measure cold-start cost: import time of ``main``, the heaviest imports, and time until routes answer.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.cold_start_bench --runs 5 --top 15
+    python -m benchmarks.cold_start_bench --warmup-modes off background blocking --env VECTOR_BACKEND=numpy
+
+Every measurement runs in a fresh interpreter. The report shows:
+
+- the median wall time of ``import main``
+- the modules with the largest cumulative import time (from ``python -X importtime``)
+- for each ``WARMUP_MODE``, how long after launching uvicorn ``/health`` and the webhook
+  verification route first return 200, plus the app's own ``/debug/startup`` profile
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.load_test import BENCH_ENV
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def _environment(workdir: Path, overrides: List[str]) -> Dict[str, str]:
+    """Return a child-process environment with placeholder credentials and temporary state paths."""
+    env = dict(os.environ)
+    env.update(BENCH_ENV)
+    env.update({
+        "LEAD_SPOOL_PATH": str(workdir / "lead_spool.sqlite3"),
+        "DELIVERY_DEAD_LETTER_PATH": str(workdir / "dead_letters.sqlite3"),
+        "MEMORY_SQLITE_PATH": str(workdir / "memory.sqlite3"),
+        "IDEMPOTENCY_SQLITE_PATH": str(workdir / "idempotency.sqlite3"),
+    })
+    for item in overrides:
+        key, _, value = item.partition("=")
+        env[key.strip()] = value
+    return env
+
+
+def time_import(env: Dict[str, str], runs: int) -> float:
+    """Return the median seconds for a fresh interpreter to ``import main``."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, env=env, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def heaviest_imports(env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """Return the ``top`` modules by cumulative import time in milliseconds."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True,
+    )
+    rows: List[Tuple[str, float]] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(cumulative) / 1000.0))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:top]
+
+
+def time_to_ready(env: Dict[str, str], warmup_mode: str, timeout: float) -> Dict[str, object]:
+    """Launch uvicorn and report when ``/health`` and ``/webhook/whatsapp`` first answer."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(env, WARMUP_MODE=warmup_mode)
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    ready: Dict[str, object] = {"warmup_mode": warmup_mode}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5.0) as client:
+            for path in ("/health", "/webhook/whatsapp"):
+                while time.perf_counter() - started < timeout:
+                    try:
+                        if client.get(path).status_code == 200:
+                            ready[f"{path}_s"] = round(time.perf_counter() - started, 3)
+                            break
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(0.01)
+            if warmup_mode == "background":
+                time.sleep(min(timeout, 10.0))
+            ready["startup_profile"] = client.get("/debug/startup").json()
+    finally:
+        process.terminate()
+        process.wait(10)
+    return ready
+
+
+def main() -> None:
+    """Run the measurements and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter launches for the import median.")
+    parser.add_argument("--top", type=int, default=15, help="Heaviest imports to list.")
+    parser.add_argument("--warmup-modes", nargs="+", default=["off"], choices=["off", "background", "blocking"])
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra setting overrides.")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="chatbot-cold-") as tmp:
+        env = _environment(Path(tmp), args.env)
+        result = {
+            "import_main_s": round(time_import(env, args.runs), 3),
+            "heaviest_imports_ms": heaviest_imports(env, args.top),
+            "time_to_ready": [time_to_ready(env, mode, args.timeout) for mode in args.warmup_modes],
+        }
+
+    print(f"{'import main':>24}: {result['import_main_s']} s (median of {args.runs})")
+    print("heaviest imports (cumulative ms):")
+    for name, elapsed in result["heaviest_imports_ms"]:
+        print(f"{elapsed:>10.1f}  {name}")
+    for ready in result["time_to_ready"]:
+        profile = ready.get("startup_profile", {})
+        print(f"WARMUP_MODE={ready['warmup_mode']}: /health {ready.get('/health_s')} s, "
+              f"/webhook/whatsapp {ready.get('/webhook/whatsapp_s')} s")
+        print(f"    marks {profile.get('seconds_since_process_start')} steps {profile.get('steps')}")
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Local stand-ins for Groq, Twilio, Meta, Google Sheets, and the embedding model.
+
+The benchmarks use these so load can be generated without network access or API quota.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+import numpy as np
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+
+
+class FakeLLMError(Exception):
+    """Injected model failure that looks like a Groq server error (HTTP 503)."""
+
+    status_code = 503
+
+
+class FakeChatModel:
+    """Chat model with the ``invoke``/``ainvoke``/``stream``/``astream`` surface of ``ChatGroq``.
+
+    Each reply waits ``latency_ms`` before the first token and then produces
+    ``reply_tokens`` tokens at ``tokens_per_second``, so a full reply takes
+    ``latency + reply_tokens / tokens_per_second`` seconds.
+
+    For resilience testing, a ``slow_rate`` fraction of calls waits ``slow_latency_ms``
+    instead, and an ``error_rate`` fraction raises :class:`FakeLLMError` after the first-token
+    wait. Both can be changed between calls to simulate an outage and its recovery.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        tokens_per_second: float = 200.0,
+        reply_tokens: int = 40,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency_ms: float = 3000.0,
+        seed: int = 7,
+    ) -> None:
+        """Configure time to first token, generation speed, reply length, and injected faults."""
+        self.latency = latency_ms / 1000.0
+        self.token_delay = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+        self.reply_tokens = max(reply_tokens, 1)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency_ms / 1000.0
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+
+    def _first_token_wait(self) -> Tuple[float, bool]:
+        """Pick this call's time to first token and whether it fails."""
+        latency = self.slow_latency if self._random.random() < self.slow_rate else self.latency
+        failing = self._random.random() < self.error_rate
+        if failing:
+            self.errors += 1
+        return latency, failing
+
+    def _tokens(self, messages: Sequence[BaseMessage]) -> List[str]:
+        """Return reply tokens that echo the start of the last user message."""
+        self.calls += 1
+        question = next((str(item.content) for item in reversed(messages) if isinstance(item, HumanMessage)), "")
+        tokens = ["Thanks ", "for ", "asking ", "about ", f"'{question[:40]}'. "]
+        while len(tokens) < self.reply_tokens:
+            tokens.append("details ")
+        return tokens[: self.reply_tokens]
+
+    def invoke(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        """Block for the full generation time and return the reply."""
+        tokens = self._tokens(messages)
+        latency, failing = self._first_token_wait()
+        time.sleep(latency)
+        if failing:
+            raise FakeLLMError("Injected model failure.")
+        time.sleep(self.token_delay * len(tokens))
+        return AIMessage(content="".join(tokens))
+
+    async def ainvoke(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        """Wait for the full generation time without blocking the event loop."""
+        tokens = self._tokens(messages)
+        latency, failing = self._first_token_wait()
+        await asyncio.sleep(latency)
+        if failing:
+            raise FakeLLMError("Injected model failure.")
+        await asyncio.sleep(self.token_delay * len(tokens))
+        return AIMessage(content="".join(tokens))
+
+    def stream(self, messages: Sequence[BaseMessage]) -> Iterator[AIMessageChunk]:
+        """Yield reply tokens at the configured rate."""
+        tokens = self._tokens(messages)
+        latency, failing = self._first_token_wait()
+        time.sleep(latency)
+        if failing:
+            raise FakeLLMError("Injected model failure.")
+        for token in tokens:
+            time.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+    async def astream(self, messages: Sequence[BaseMessage]) -> AsyncIterator[AIMessageChunk]:
+        """Yield reply tokens at the configured rate without blocking the event loop."""
+        tokens = self._tokens(messages)
+        latency, failing = self._first_token_wait()
+        await asyncio.sleep(latency)
+        if failing:
+            raise FakeLLMError("Injected model failure.")
+        for token in tokens:
+            await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=token)
+
+
+def hashing_embedding(texts: List[str], dim: int = 384) -> List[List[float]]:
+    """Embed texts as unit-normalized hashed bags of words (no model download needed)."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vectors[row, int.from_bytes(digest, "little") % dim] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).tolist()
+
+
+class FakeSheetsWriter:
+    """Lead sink writer that records rows instead of calling the Sheets API."""
+
+    def __init__(self, latency_ms: float = 150.0) -> None:
+        """Configure how long each ``append_rows`` call takes."""
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self.rows: List[Tuple[str, List[str]]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, sheet_id: str, rows: List[List[str]]) -> None:
+        """Record one batched append."""
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.rows.extend((sheet_id, row) for row in rows)
+
+
+class FakeProviderServer:
+    """Threaded HTTP server that imitates the Twilio Messages and Meta Graph send endpoints.
+
+    Delivered messages are recorded per recipient in arrival order together with the
+    time they arrived, so callers can check ordering and measure end-to-end latency.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 20.0,
+        fail_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        bad_recipients: Optional[set] = None,
+        seed: int = 7,
+    ) -> None:
+        """Configure failure injection and start listening on an ephemeral port."""
+        self.latency = latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.throttle_rate = throttle_rate
+        self.bad_recipients = bad_recipients or set()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.received: Dict[str, List[str]] = {}
+        self.received_at: Dict[str, List[float]] = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answer send requests with success or an injected failure."""
+
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: object) -> None:
+                """Keep benchmark output quiet."""
+
+            def do_POST(self) -> None:
+                """Record delivered messages in arrival order."""
+                body = self.rfile.read(int(self.headers.get("Content-Length", "0"))).decode("utf-8")
+                if self.path.endswith("/Messages.json"):
+                    form = parse_qs(body)
+                    recipient, text = form["To"][0], form["Body"][0]
+                else:
+                    data = json.loads(body)
+                    recipient, text = data["recipient"]["id"], data["message"]["text"]
+                time.sleep(server.latency)
+                with server.lock:
+                    server.requests += 1
+                    roll = server.rng.random()
+                if recipient in server.bad_recipients:
+                    self._reply(400, {"error": {"message": "invalid recipient", "code": 100}})
+                elif roll < server.throttle_rate:
+                    self._reply(429, {"error": {"message": "slow down", "code": 4}}, {"Retry-After": "0"})
+                elif roll < server.throttle_rate + server.fail_rate:
+                    self._reply(500, {"error": {"message": "temporary failure"}})
+                else:
+                    with server.lock:
+                        server.received.setdefault(recipient, []).append(text)
+                        server.received_at.setdefault(recipient, []).append(time.perf_counter())
+                    self._reply(201 if self.path.endswith("/Messages.json") else 200, {"ok": True})
+
+            def _reply(self, status: int, payload: dict, headers: Dict[str, str] = None) -> None:
+                """Write a JSON response."""
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def delivered_count(self) -> int:
+        """Return how many messages have been accepted so far."""
+        with self.lock:
+            return sum(len(texts) for texts in self.received.values())
+
+    def close(self) -> None:
+        """Stop the server thread."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def write_text_pdf(path: Path, pages: int, lines_per_page: int = 40, seed: int = 7) -> Path:
+    """Write a plain-text PDF with ``pages`` pages of FAQ-like sentences for ingestion runs."""
+    rng = random.Random(seed)
+    words = ("order delivery menu price hours breakfast vegetarian catering refund table booking "
+             "payment transfer pickup spicy rice chicken soup weekend holiday location parking").split()
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Page tree, filled in once the page object numbers are known.
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs: List[int] = []
+    for page in range(pages):
+        lines = [f"Page {page + 1} section {line + 1}: " + " ".join(rng.choice(words) for _ in range(10))
+                 for line in range(lines_per_page)]
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = zlib.compress(f"BT /F1 10 Tf 12 TL 40 780 Td {text}ET".encode("latin-1"))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets: List[int] = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_at = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    path.write_bytes(bytes(output))
+    return path
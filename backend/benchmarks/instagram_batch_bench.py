@@ -0,0 +1,147 @@
+"""Check Instagram webhook batch handling with synthetic multi-entry, multi-event payloads.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.instagram_batch_bench --senders 50 --messages-per-sender 4 --reply-latency-ms 200
+
+Each payload mixes customer texts with echoes, read and delivery receipts, reactions,
+and attachment-only messages. The run asserts that every text is answered exactly once,
+that each sender's replies keep their order, and that non-message batches are acknowledged
+with 200. It reports parse cost (the only work done before the ack) and the wall time of
+background processing compared with handling every event serially.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from fastapi.testclient import TestClient
+
+import instagram
+from main import app
+
+
+def build_payload(senders: int, messages_per_sender: int, entries: int, noise: int, seed: int) -> Dict[str, object]:
+    """Return a Meta-style batch with customer texts spread over entries and interleaved noise events."""
+    rng = random.Random(seed)
+    page_id = instagram.settings.INSTAGRAM_ACCOUNT_ID or "17841400000000000"
+    pending = {f"igsid-{index}": 0 for index in range(senders)}
+    events: List[Dict[str, object]] = []
+    while pending:
+        sender = rng.choice(sorted(pending))
+        position = pending[sender]
+        events.append({
+            "sender": {"id": sender},
+            "recipient": {"id": page_id},
+            "timestamp": 1700000000000 + len(events),
+            "message": {"mid": f"mid.{sender}.{position}", "text": f"{sender} message {position}"},
+        })
+        pending[sender] += 1
+        if pending[sender] == messages_per_sender:
+            del pending[sender]
+        for _ in range(rng.randint(0, noise)):
+            events.append(rng.choice([
+                {"sender": {"id": page_id}, "recipient": {"id": sender},
+                 "message": {"mid": "mid.echo", "text": "our reply", "is_echo": True}},
+                {"sender": {"id": sender}, "recipient": {"id": page_id}, "read": {"mid": "mid.read"}},
+                {"sender": {"id": sender}, "recipient": {"id": page_id}, "delivery": {"mids": ["mid.x"]}},
+                {"sender": {"id": sender}, "recipient": {"id": page_id},
+                 "reaction": {"mid": "mid.react", "action": "react", "reaction": "love"}},
+                {"sender": {"id": sender}, "recipient": {"id": page_id},
+                 "message": {"mid": "mid.image", "attachments": [{"type": "image", "payload": {"url": "x"}}]}},
+            ]))
+    size = max(len(events) // max(entries, 1), 1)
+    return {
+        "object": "instagram",
+        "entry": [
+            {"id": page_id, "time": 1700000000000, "messaging": events[start : start + size]}
+            for start in range(0, len(events), size)
+        ],
+    }
+
+
+async def _run_processing(events: List[instagram.InstagramMessageEvent], latency: float) -> Dict[str, object]:
+    """Process events with a fake LLM and capture what would be delivered."""
+    delivered: Dict[str, List[str]] = {}
+
+    async def fake_reply(user_id: str, message: str, platform: str, **kwargs: object) -> str:
+        await asyncio.sleep(latency)
+        return f"reply to {message}"
+
+    def capture(message: instagram.OutboundMessage) -> bool:
+        delivered.setdefault(message.recipient, []).append(message.text)
+        return True
+
+    original_reply, original_enqueue = instagram.chat_service.aget_reply, instagram.delivery_queue.enqueue
+    instagram.chat_service.aget_reply = fake_reply
+    instagram.delivery_queue.enqueue = capture
+    try:
+        started = time.perf_counter()
+        await instagram.process_events(events)
+        elapsed = time.perf_counter() - started
+    finally:
+        instagram.chat_service.aget_reply = original_reply
+        instagram.delivery_queue.enqueue = original_enqueue
+    return {"delivered": delivered, "elapsed": elapsed}
+
+
+def main() -> None:
+    """Build a synthetic batch, verify handling, and print timings."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--messages-per-sender", type=int, default=4)
+    parser.add_argument("--entries", type=int, default=5)
+    parser.add_argument("--noise", type=int, default=2, help="Max non-message events after each text.")
+    parser.add_argument("--reply-latency-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    payload = build_payload(args.senders, args.messages_per_sender, args.entries, args.noise, args.seed)
+    raw_events = sum(len(entry["messaging"]) for entry in payload["entry"])
+
+    started = time.perf_counter()
+    events = instagram.extract_message_events(payload)
+    parse_ms = (time.perf_counter() - started) * 1000.0
+    expected = args.senders * args.messages_per_sender
+    assert len(events) == expected, f"expected {expected} message events, got {len(events)}"
+
+    outcome = asyncio.run(_run_processing(events, args.reply_latency_ms / 1000.0))
+    delivered = outcome["delivered"]
+    for sender, replies in delivered.items():
+        wanted = [f"reply to {sender} message {index}" for index in range(args.messages_per_sender)]
+        assert replies == wanted, f"replies for {sender} out of order or missing: {replies}"
+    assert sum(len(replies) for replies in delivered.values()) == expected
+
+    noise_only = {"object": "instagram", "entry": [{"id": "1", "messaging": [
+        {"sender": {"id": "1"}, "recipient": {"id": "2"}, "read": {"mid": "m"}},
+        {"sender": {"id": "2"}, "recipient": {"id": "1"}, "message": {"mid": "m", "text": "x", "is_echo": True}},
+    ]}]}
+    with TestClient(app) as client:
+        response = client.post("/webhook/instagram", json=noise_only)
+        assert response.status_code == 200 and response.json()["messages"] == 0, response.text
+        response = client.post("/webhook/instagram", json={"object": "instagram"})
+        assert response.status_code == 200, response.text
+
+    serial_s = expected * args.reply_latency_ms / 1000.0
+    result = {
+        "raw_events": raw_events,
+        "message_events": len(events),
+        "parse_ms": round(parse_ms, 3),
+        "processing_s": round(outcome["elapsed"], 3),
+        "serial_estimate_s": round(serial_s, 3),
+        "speedup": round(serial_s / outcome["elapsed"], 1) if outcome["elapsed"] else 0.0,
+        "ordering": "ok",
+    }
+    for key, value in result.items():
+        print(f"{key:>18}: {value}")
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
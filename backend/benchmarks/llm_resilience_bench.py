@@ -0,0 +1,149 @@
+"""Compare LLM call policies against a fake model that injects stalls and errors.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.llm_resilience_bench --requests 400 --concurrency 20
+    python -m benchmarks.llm_resilience_bench --scenarios tail --slow-rate 0.1 --slow-ms 5000
+
+Each scenario runs the same requests through ``resilience.LLMGuard`` under two policies,
+each with a fresh ``benchmarks.fakes.FakeChatModel``:
+
+- ``tail``: a ``--slow-rate`` share of calls stalls for ``--slow-ms``; a single attempt vs hedging.
+- ``errors``: an ``--error-rate`` share of calls fails with HTTP 503; a single attempt vs retries.
+- ``outage``: every call fails; retries without a breaker vs the circuit breaker.
+
+The report shows answered and unavailable requests (the ones the chat service would answer
+with a degraded reply), p50/p95/p99 latency, and how many calls reached the model.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel
+from resilience import Deadline, LLMGuard, LLMUnavailable
+
+
+SCENARIO_NAMES = ["tail", "errors", "outage"]
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """Return a percentile of latency samples in milliseconds."""
+    ordered = sorted(samples)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 1)
+
+
+def _scenarios(args: argparse.Namespace) -> Dict[str, Tuple[Dict[str, float], List[Tuple[str, Dict[str, object]]]]]:
+    """Return each scenario's injected faults and the two guard policies it compares."""
+    single = {"max_attempts": 1, "failure_threshold": 10 ** 9}
+    return {
+        "tail": (
+            {"slow_rate": args.slow_rate},
+            [("single", single), ("hedged", {**single, "hedge": True})],
+        ),
+        "errors": (
+            {"error_rate": args.error_rate},
+            [("single", single), ("retry", {"failure_threshold": 10 ** 9})],
+        ),
+        "outage": (
+            {"error_rate": 1.0},
+            [("retry", {"failure_threshold": 10 ** 9}), ("breaker", {})],
+        ),
+    }
+
+
+async def run_policy(
+    args: argparse.Namespace, faults: Dict[str, float], policy: Dict[str, object]
+) -> Dict[str, object]:
+    """Send ``--requests`` calls with ``--concurrency`` in flight and summarize the outcome."""
+    model = FakeChatModel(
+        args.latency_ms, args.tokens_per_second, args.reply_tokens, slow_latency_ms=args.slow_ms, seed=args.seed, **faults
+    )
+    options: Dict[str, object] = {
+        "deadline_seconds": args.deadline,
+        "backoff_base": args.backoff_base,
+        "backoff_max": args.backoff_base * 8,
+        "hedge_min_delay": args.hedge_min_delay,
+        "reset_seconds": args.reset_seconds,
+    }
+    options.update(policy)
+    guard = LLMGuard(**options)
+    messages = [HumanMessage(content="What are your opening hours?")]
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    outcomes = {"answered": 0, "unavailable": 0}
+
+    async def one() -> None:
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await guard.acall("fake", lambda: model.ainvoke(messages), Deadline(guard.deadline_seconds))
+                outcomes["answered"] += 1
+            except LLMUnavailable:
+                outcomes["unavailable"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        **outcomes,
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+        "model_calls": model.calls,
+        "retries": guard.counters["retries"],
+        "hedges": guard.counters["hedges"],
+        "circuit_rejections": guard.counters["circuit_rejections"],
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, object]]:
+    """Run every selected scenario under both of its policies."""
+    results: Dict[str, Dict[str, object]] = {}
+    for name, (faults, policies) in _scenarios(args).items():
+        if name not in args.scenarios:
+            continue
+        results[name] = {label: await run_policy(args, faults, policy) for label, policy in policies}
+    return results
+
+
+def main() -> None:
+    """Parse options, run the scenarios, and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIO_NAMES, default=SCENARIO_NAMES)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Fake LLM time to first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--reply-tokens", type=int, default=20)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--deadline", type=float, default=5.0, help="Per-request budget in seconds.")
+    parser.add_argument("--backoff-base", type=float, default=0.05)
+    parser.add_argument("--hedge-min-delay", type=float, default=0.05)
+    parser.add_argument("--reset-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for name, policies in results.items():
+        print(f"{name}:")
+        for label, result in policies.items():
+            print(f"  {label:>8}: " + ", ".join(f"{key} {value}" for key, value in result.items()))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,566 @@
+"""Load-test the API offline with local fakes for Groq, Twilio, Meta, Google Sheets, and embeddings.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --scenarios steady burst --rate 50 --llm-latency-ms 500
+    python -m benchmarks.load_test --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --scenarios steady --llm-error-rate 0.2 --llm-slow-rate 0.05
+
+The app is served by uvicorn on 127.0.0.1 in a background thread. External services are
+replaced by the fakes in ``benchmarks.fakes``: a chat model with configurable latency,
+token rate, and injected errors and stalls, a local HTTP server that records Twilio/Meta
+sends, a Sheets writer that records rows, and a hashing embedder. Nothing leaves the
+machine. All state lives in a temporary directory.
+
+Scenarios:
+
+- ``steady``: open-loop ``/chat/message`` traffic at ``--rate`` from ``--users`` users.
+- ``burst``: ``--burst-size`` simultaneous requests every ``--burst-interval`` seconds.
+- ``many_users``: every request comes from a new user, so memory keeps growing.
+- ``webhooks``: WhatsApp and Instagram webhooks at ``--rate``. Reports ack latency and the
+  end-to-end time until the fake provider receives the reply.
+- ``ingest``: a ``--pdf-pages`` PDF through ``/ingest`` while light chat traffic runs.
+
+Each scenario reports throughput, p50/p95/p99 latency, status codes, event-loop lag of
+the server loop, and peak RSS. ``--save-baseline`` writes the results as JSON.
+``--baseline`` compares a run against saved results and exits with status 1 when a metric
+regresses by more than ``--tolerance``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.fakes import FakeChatModel, FakeProviderServer, FakeSheetsWriter, hashing_embedding, write_text_pdf
+
+
+QUESTIONS = [
+    "What are your opening hours?",
+    "Do you offer breakfast?",
+    "Where are you located?",
+    "Do you have delivery?",
+    "How can I place an order?",
+    "Do you offer vegetarian options?",
+    "How much is the jollof rice?",
+    "Can I book a table for six on Saturday?",
+    "Do you cater for events?",
+    "Is there parking near the restaurant?",
+]
+
+# Lift the production rate limits so scenarios measure the pipeline rather than the limiter.
+# Override any of these (or other settings) with --env KEY=VALUE.
+BENCH_ENV = {
+    "GROQ_API_KEY": "bench",
+    "TWILIO_ACCOUNT_SID": "ACbench",
+    "TWILIO_AUTH_TOKEN": "bench",
+    "TWILIO_WHATSAPP_NUMBER": "whatsapp:+10000000000",
+    "META_PAGE_ACCESS_TOKEN": "bench",
+    "INSTAGRAM_ACCOUNT_ID": "17841400000000000",
+    "GOOGLE_SHEET_ID": "bench-sheet",
+    "VECTOR_BACKEND": "numpy",
+    "GLOBAL_RATE_LIMIT_PER_SECOND": "10000",
+    "GLOBAL_RATE_LIMIT_BURST": "10000",
+    "USER_RATE_LIMIT_PER_MINUTE": "6000",
+    "USER_RATE_LIMIT_BURST": "100",
+    "TWILIO_RATE_LIMIT_PER_SECOND": "1000",
+    "META_RATE_LIMIT_PER_SECOND": "1000",
+}
+
+# Metrics compared against a baseline and whether a larger value is worse.
+BASELINE_METRICS = {
+    "throughput_rps": False,
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "loop_lag_p99_ms": True,
+    "peak_rss_mb": True,
+}
+
+
+def _rss_mb() -> float:
+    """Return the current resident set size in MiB."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Return a percentile of second-valued samples in milliseconds."""
+    return round(float(np.percentile(samples, pct)) * 1000.0, 2) if samples else 0.0
+
+
+class LoopMonitor:
+    """Measure event-loop lag and peak RSS from inside the server's loop.
+
+    A task sleeps for ``interval`` seconds in a loop. Lag is how much later than requested
+    it wakes, which is time other callbacks held the loop.
+    """
+
+    def __init__(self, interval: float = 0.02) -> None:
+        """Configure the probe interval."""
+        self.interval = interval
+        self._lags: List[float] = []
+        self._peak_rss = 0.0
+        self._lock = threading.Lock()
+
+    async def run(self) -> None:
+        """Probe until cancelled."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            rss = _rss_mb()
+            with self._lock:
+                self._lags.append(lag)
+                self._peak_rss = max(self._peak_rss, rss)
+
+    def reset(self) -> None:
+        """Start a new measurement window."""
+        with self._lock:
+            self._lags = []
+            self._peak_rss = _rss_mb()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return lag percentiles and peak RSS for the current window."""
+        with self._lock:
+            lags = list(self._lags)
+            peak_rss = self._peak_rss
+        return {
+            "loop_lag_p50_ms": _percentile(lags, 50),
+            "loop_lag_p99_ms": _percentile(lags, 99),
+            "loop_lag_max_ms": round(max(lags) * 1000.0, 2) if lags else 0.0,
+            "peak_rss_mb": round(peak_rss, 1),
+        }
+
+
+class ServerThread:
+    """Run the FastAPI app under uvicorn on a background thread with its own event loop."""
+
+    def __init__(self, app: Any, monitor: LoopMonitor) -> None:
+        """Pick a free port and hook the loop monitor into application startup."""
+        import uvicorn
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.monitor = monitor
+        self._monitor_task: Optional[asyncio.Task] = None
+        app.router.add_event_handler("startup", self._start_monitor)
+        app.router.add_event_handler("shutdown", self._stop_monitor)
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on")
+        )
+        self.thread = threading.Thread(target=self.server.run, name="uvicorn", daemon=True)
+
+    async def _start_monitor(self) -> None:
+        """Start probing the server loop."""
+        self._monitor_task = asyncio.get_running_loop().create_task(self.monitor.run())
+
+    async def _stop_monitor(self) -> None:
+        """Stop probing before the loop closes."""
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+
+    def start(self, timeout: float = 30.0) -> None:
+        """Start serving and wait until the app has finished startup."""
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        """Ask uvicorn to shut down and wait for the thread."""
+        self.server.should_exit = True
+        self.thread.join(30.0)
+
+
+class Recorder:
+    """Collect request latencies and status codes for one scenario."""
+
+    def __init__(self) -> None:
+        """Start with no samples."""
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+
+    async def call(self, send: Callable[[], Awaitable[httpx.Response]]) -> Optional[httpx.Response]:
+        """Time one request and record its status (or the exception type)."""
+        started = time.perf_counter()
+        try:
+            response = await send()
+        except httpx.HTTPError as exc:
+            key = type(exc).__name__
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            return None
+        self.latencies.append(time.perf_counter() - started)
+        key = str(response.status_code)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """Return request counts, throughput, and latency percentiles."""
+        ok = self.statuses.get("200", 0) + self.statuses.get("202", 0)
+        return {
+            "requests": sum(self.statuses.values()),
+            "ok": ok,
+            "statuses": dict(sorted(self.statuses.items())),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(ok / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": _percentile(self.latencies, 50),
+            "p95_ms": _percentile(self.latencies, 95),
+            "p99_ms": _percentile(self.latencies, 99),
+            "max_ms": round(max(self.latencies) * 1000.0, 2) if self.latencies else 0.0,
+        }
+
+
+async def _open_loop(rate: float, count: int, fire: Callable[[int], Awaitable[Any]]) -> None:
+    """Start ``count`` calls at a fixed arrival rate regardless of how fast earlier calls finish."""
+    started = time.perf_counter()
+    tasks = []
+    for index in range(count):
+        delay = started + index / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(index)))
+    await asyncio.gather(*tasks)
+
+
+def _chat(client: httpx.AsyncClient, recorder: Recorder, user_id: str, message: str) -> Awaitable[Any]:
+    """Return a coroutine that posts one ``/chat/message`` request."""
+    return recorder.call(lambda: client.post("/chat/message", json={"user_id": user_id, "message": message}))
+
+
+async def scenario_steady(client: httpx.AsyncClient, args: argparse.Namespace, env: Dict[str, Any]) -> Dict[str, Any]:
+    """Constant arrival rate from a fixed pool of users."""
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    await _open_loop(
+        args.rate,
+        int(args.rate * args.duration),
+        lambda index: _chat(client, recorder, f"steady-{rng.randrange(args.users)}", rng.choice(QUESTIONS)),
+    )
+    return recorder.summary(time.perf_counter() - started)
+
+
+async def scenario_burst(client: httpx.AsyncClient, args: argparse.Namespace, env: Dict[str, Any]) -> Dict[str, Any]:
+    """Simultaneous bursts separated by quiet periods."""
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    for burst in range(args.bursts):
+        await asyncio.gather(*[
+            _chat(client, recorder, f"burst-{rng.randrange(args.users)}", rng.choice(QUESTIONS))
+            for _ in range(args.burst_size)
+        ])
+        if burst < args.bursts - 1:
+            await asyncio.sleep(args.burst_interval)
+    return recorder.summary(time.perf_counter() - started)
+
+
+async def scenario_many_users(client: httpx.AsyncClient, args: argparse.Namespace, env: Dict[str, Any]) -> Dict[str, Any]:
+    """Every request from a distinct user, growing conversation memory."""
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    await _open_loop(
+        args.rate,
+        args.distinct_users,
+        lambda index: _chat(client, recorder, f"visitor-{index}", f"{rng.choice(QUESTIONS)} My name is Guest {index}"),
+    )
+    result = recorder.summary(time.perf_counter() - started)
+    result["memory_users"] = (await client.get("/chat/memory/stats")).json().get("users")
+    return result
+
+
+async def scenario_webhooks(client: httpx.AsyncClient, args: argparse.Namespace, env: Dict[str, Any]) -> Dict[str, Any]:
+    """WhatsApp and Instagram webhooks, measuring the ack and the time until the reply is sent."""
+    recorder = Recorder()
+    provider: FakeProviderServer = env["provider"]
+    rng = random.Random(args.seed)
+    page_id = BENCH_ENV["INSTAGRAM_ACCOUNT_ID"]
+    posted_at: Dict[str, List[float]] = {}
+    before = provider.delivered_count()
+
+    async def fire(index: int) -> None:
+        question = rng.choice(QUESTIONS)
+        if index % 2 == 0:
+            recipient = f"whatsapp:+1555{rng.randrange(args.users):07d}"
+            form = {"From": recipient, "Body": question, "MessageSid": f"SM{index:032d}"}
+            send = lambda: client.post("/webhook/whatsapp", data=form)
+        else:
+            recipient = f"igsid-{rng.randrange(args.users)}"
+            event = {"sender": {"id": recipient}, "recipient": {"id": page_id},
+                     "message": {"mid": f"mid.{index}", "text": question}}
+            body = {"object": "instagram", "entry": [{"id": page_id, "messaging": [event]}]}
+            send = lambda: client.post("/webhook/instagram", json=body)
+        posted_at.setdefault(recipient, []).append(time.perf_counter())
+        await recorder.call(send)
+
+    count = int(args.rate * args.duration)
+    started = time.perf_counter()
+    await _open_loop(args.rate, count, fire)
+    deadline = time.perf_counter() + args.drain_timeout
+    while provider.delivered_count() - before < count and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    # Per-recipient order is preserved, so the n-th post pairs with the n-th delivery.
+    end_to_end: List[float] = []
+    with provider.lock:
+        for recipient, posts in posted_at.items():
+            arrivals = provider.received_at.get(recipient, [])[-len(posts):]
+            end_to_end.extend(arrived - posted for posted, arrived in zip(posts, arrivals))
+    result = recorder.summary(elapsed)
+    result["delivered"] = provider.delivered_count() - before
+    result["delivered_rps"] = round(result["delivered"] / elapsed, 1) if elapsed else 0.0
+    result["end_to_end_p50_ms"] = _percentile(end_to_end, 50)
+    result["end_to_end_p95_ms"] = _percentile(end_to_end, 95)
+    result["end_to_end_p99_ms"] = _percentile(end_to_end, 99)
+    return result
+
+
+async def scenario_ingest(client: httpx.AsyncClient, args: argparse.Namespace, env: Dict[str, Any]) -> Dict[str, Any]:
+    """Upload a large PDF while chat traffic continues, showing ingestion's impact on replies."""
+    pdf_path = write_text_pdf(Path(env["workdir"]) / "bench.pdf", args.pdf_pages)
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    chat_rate = max(args.rate / 4.0, 1.0)
+    finished = asyncio.Event()
+
+    async def upload() -> Dict[str, Any]:
+        try:
+            with pdf_path.open("rb") as handle:
+                response = await client.post(
+                    "/ingest",
+                    params={"wait": "true"},
+                    files={"file": ("bench.pdf", handle, "application/pdf")},
+                    timeout=None,
+                )
+            return response.json()
+        finally:
+            finished.set()
+
+    async def chat_while_ingesting() -> None:
+        index = 0
+        tasks = []
+        started = time.perf_counter()
+        while not finished.is_set():
+            delay = started + index / chat_rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(
+                _chat(client, recorder, f"ingest-{rng.randrange(args.users)}", rng.choice(QUESTIONS))
+            ))
+            index += 1
+        await asyncio.gather(*tasks)
+
+    started = time.perf_counter()
+    job, _ = await asyncio.gather(upload(), chat_while_ingesting())
+    result = recorder.summary(time.perf_counter() - started)
+    result.update({
+        "ingest_status": job.get("status"),
+        "pdf_pages": job.get("pages_total"),
+        "chunks_stored": job.get("chunks_stored"),
+        "ingest_s": job.get("elapsed_s"),
+        "pages_per_s": job.get("pages_per_s"),
+        "chunks_per_s": job.get("chunks_per_s"),
+    })
+    return result
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, argparse.Namespace, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "steady": scenario_steady,
+    "burst": scenario_burst,
+    "many_users": scenario_many_users,
+    "webhooks": scenario_webhooks,
+    "ingest": scenario_ingest,
+}
+
+
+def configure_environment(workdir: Path, provider: FakeProviderServer, overrides: List[str]) -> None:
+    """Point settings at the fakes and the temporary directory before the app is imported."""
+    os.environ.update(BENCH_ENV)
+    os.environ.update({
+        "TWILIO_API_BASE_URL": provider.base_url,
+        "META_GRAPH_BASE_URL": provider.base_url,
+        "LEAD_SPOOL_PATH": str(workdir / "lead_spool.sqlite3"),
+        "DELIVERY_DEAD_LETTER_PATH": str(workdir / "dead_letters.sqlite3"),
+        "MEMORY_SQLITE_PATH": str(workdir / "memory.sqlite3"),
+        "IDEMPOTENCY_SQLITE_PATH": str(workdir / "idempotency.sqlite3"),
+    })
+    for item in overrides:
+        key, _, value = item.partition("=")
+        os.environ[key.strip()] = value
+
+
+def install_fakes(workdir: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    """Import the app and swap the LLM, embedder, vector store path, and Sheets writer for fakes."""
+    import database
+
+    # Patch before anything opens the knowledge collection with the real embedder.
+    database._embedding_fn = hashing_embedding
+    database._vector_index_path = workdir / "vector_store"
+
+    from chat import chat_service
+    from lead_sink import lead_sink
+
+    model = FakeChatModel(
+        args.llm_latency_ms,
+        args.llm_tokens_per_second,
+        args.llm_reply_tokens,
+        error_rate=args.llm_error_rate,
+        slow_rate=args.llm_slow_rate,
+        slow_latency_ms=args.llm_slow_ms,
+        seed=args.seed,
+    )
+    # Every model tier (and tenant) gets the same fake, so routing changes nothing but the tier counts.
+    chat_service._build_model = lambda api_key, model_name, max_tokens: model
+    sheets = FakeSheetsWriter(args.sheets_latency_ms)
+    lead_sink.writer = sheets
+
+    from ingest import ingest_service
+
+    knowledge = Path(__file__).resolve().parents[2] / "tests" / "sample_business.txt"
+    if knowledge.exists():
+        text = knowledge.read_text(encoding="utf-8")
+        ingest_service.embed_and_store(ingest_service.chunk_text(text), source=knowledge.name)
+
+    from main import app
+
+    return {"app": app, "sheets": sheets, "model": model}
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a line for every metric that is worse than the baseline by more than ``tolerance``."""
+    regressions: List[str] = []
+    for name, result in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_worse in BASELINE_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def _print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    """Print the headline numbers of each scenario."""
+    columns = ["requests", "ok", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "loop_lag_p99_ms", "peak_rss_mb"]
+    print(f"{'scenario':>12} " + " ".join(f"{column:>15}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:>12} " + " ".join(f"{result.get(column, ''):>15}" for column in columns))
+    for name, result in results.items():
+        extra = {key: value for key, value in result.items() if key not in columns}
+        print(f"{name}: {json.dumps(extra)}")
+
+
+async def _run_scenarios(server: ServerThread, args: argparse.Namespace, env: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Run the selected scenarios one after another against the live server."""
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    results: Dict[str, Dict[str, Any]] = {}
+    async with httpx.AsyncClient(base_url=server.base_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            server.monitor.reset()
+            result = await SCENARIOS[name](client, args, env)
+            result.update(server.monitor.snapshot())
+            results[name] = result
+            print(f"finished {name}", file=sys.stderr)
+            await asyncio.sleep(args.pause)
+    return results
+
+
+def main() -> None:
+    """Start the app with fakes, run the scenarios, and report or compare the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--rate", type=float, default=40.0, help="Requests per second for open-loop scenarios.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of steady and webhook traffic.")
+    parser.add_argument("--users", type=int, default=200, help="Size of the user pool for repeat visitors.")
+    parser.add_argument("--distinct-users", type=int, default=1000)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=100)
+    parser.add_argument("--burst-interval", type=float, default=2.0)
+    parser.add_argument("--pdf-pages", type=int, default=300)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Fake LLM time to first token.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--llm-reply-tokens", type=int, default=40)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of fake LLM calls that fail.")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="Fraction of fake LLM calls that stall.")
+    parser.add_argument("--llm-slow-ms", type=float, default=3000.0, help="Time to first token of stalled calls.")
+    parser.add_argument("--sheets-latency-ms", type=float, default=150.0)
+    parser.add_argument("--provider-latency-ms", type=float, default=30.0, help="Fake Twilio/Meta send latency.")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Seconds to wait for webhook replies.")
+    parser.add_argument("--pause", type=float, default=1.0, help="Idle seconds between scenarios.")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra setting overrides.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    parser.add_argument("--save-baseline", help="Write results to this file for later comparison.")
+    parser.add_argument("--baseline", help="Compare results with a file written by --save-baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression.")
+    args = parser.parse_args()
+
+    provider = FakeProviderServer(latency_ms=args.provider_latency_ms, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="chatbot-load-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, provider, args.env)
+        env = install_fakes(workdir, args)
+        env.update({"provider": provider, "workdir": workdir})
+        server = ServerThread(env["app"], LoopMonitor())
+        server.start()
+        try:
+            results = asyncio.run(_run_scenarios(server, args, env))
+        finally:
+            server.stop()
+            provider.close()
+
+    _print_table(results)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "options": {key: value for key, value in vars(args).items() if key not in {"json_path", "save_baseline", "baseline"}},
+        "fake_llm_calls": env["model"].calls,
+        "fake_sheet_rows": len(env["sheets"].rows),
+        "scenarios": results,
+    }
+    for path in filter(None, [args.json_path, args.save_baseline]):
+        Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.baseline:
+        regressions = compare_with_baseline(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Simulate many users against the in-process and SQLite conversation memory backends.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.memory_bench --users 100000 --messages 6
+
+Each backend runs in its own subprocess so resident memory is measured in isolation.
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+BACKENDS = ["memory", "sqlite"]
+
+
+def _rss_mb() -> float:
+    """Return the current resident set size in MiB."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_backend(backend: str, users: int, messages: int, max_users: int, reads: int) -> Dict[str, float]:
+    """Write ``messages`` turns for ``users`` simulated users, then time random reads."""
+    from memory import MemoryManager, SqliteMemoryManager
+
+    baseline_rss = _rss_mb()
+    with tempfile.TemporaryDirectory() as workdir:
+        if backend == "sqlite":
+            manager = SqliteMemoryManager(Path(workdir) / "memory.sqlite3", max_users=max_users)
+        else:
+            manager = MemoryManager(max_users=max_users)
+
+        user_ids = [f"whatsapp:+1555{index:07d}" for index in range(users)]
+        started = time.perf_counter()
+        for turn in range(messages):
+            role = "user" if turn % 2 == 0 else "assistant"
+            for user_id in user_ids:
+                manager.add_message(user_id, role, f"Message {turn} from {user_id}: what time do you open today?")
+        write_seconds = time.perf_counter() - started
+
+        rng = random.Random(7)
+        samples: List[float] = []
+        for _ in range(reads):
+            user_id = user_ids[rng.randrange(users)]
+            started = time.perf_counter()
+            manager.get_history(user_id)
+            samples.append(time.perf_counter() - started)
+
+        stats = manager.stats()
+
+    total_writes = users * messages
+    return {
+        "backend": backend,
+        "users": users,
+        "writes_per_s": round(total_writes / write_seconds, 1),
+        "read_p50_us": round(float(np.percentile(samples, 50)) * 1e6, 1),
+        "read_p99_us": round(float(np.percentile(samples, 99)) * 1e6, 1),
+        "rss_delta_mb": round(_rss_mb() - baseline_rss, 1),
+        "stored_users": stats["users"],
+        "evictions": stats["evictions"],
+    }
+
+
+def main() -> None:
+    """Run every backend in a subprocess and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, help="Run a single backend in this process.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=6)
+    parser.add_argument("--max-users", type=int, default=50000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.users, args.messages, args.max_users, args.reads)))
+        return
+
+    results = []
+    for backend in BACKENDS:
+        command = [
+            sys.executable, "-m", "benchmarks.memory_bench", "--backend", backend,
+            "--users", str(args.users), "--messages", str(args.messages),
+            "--max-users", str(args.max_users), "--reads", str(args.reads),
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend}: failed\n{completed.stderr.strip()}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    columns = ["backend", "writes_per_s", "read_p50_us", "read_p99_us", "rss_delta_mb", "stored_users", "evictions"]
+    print("  ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>14}" for column in columns))
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Compare query latency and memory of the Chroma and NumPy retrieval backends.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.vector_index_bench --chunks 5000 --queries 500
+
+Each backend runs in its own subprocess so resident memory is measured in isolation.
+Embeddings are synthetic unit vectors, so no ONNX model download is needed.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+BACKENDS = ["chroma", "numpy-float32", "numpy-float16", "numpy-int8"]
+
+
+def _rss_mb() -> float:
+    """Return the current resident set size in MiB."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _peak_rss_mb() -> float:
+    """Return the peak resident set size in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Return a percentile of latency samples in milliseconds."""
+    return round(float(np.percentile(samples, pct)) * 1000.0, 3)
+
+
+def _synthetic_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    """Return reproducible random unit vectors."""
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run_backend(backend: str, chunks: int, dim: int, queries: int, top_k: int) -> Dict[str, float]:
+    """Load one backend with synthetic chunks and time single-query lookups."""
+    baseline_rss = _rss_mb()
+    corpus = _synthetic_vectors(chunks, dim, seed=1)
+    probes = _synthetic_vectors(queries, dim, seed=2)
+    ids = [f"chunk_{index}" for index in range(chunks)]
+    documents = [f"document text {index}" for index in range(chunks)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        if backend == "chroma":
+            import chromadb
+
+            client = chromadb.PersistentClient(path=workdir)
+            collection = client.get_or_create_collection(name="bench", embedding_function=None)
+            step = 4096
+            for start in range(0, chunks, step):
+                collection.add(
+                    ids=ids[start : start + step],
+                    documents=documents[start : start + step],
+                    embeddings=corpus[start : start + step].tolist(),
+                )
+        else:
+            from vector_index import NumpyVectorIndex
+
+            dtype = backend.split("-", 1)[1]
+            collection = NumpyVectorIndex("bench", Path(workdir), dtype=dtype)
+            collection.add(ids=ids, documents=documents, embeddings=corpus)
+        build_seconds = time.perf_counter() - started
+
+        del corpus
+        loaded_rss = _rss_mb()
+        samples: List[float] = []
+        for probe in probes:
+            started = time.perf_counter()
+            collection.query(query_embeddings=[probe.tolist()], n_results=top_k)
+            samples.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "chunks": chunks,
+        "dim": dim,
+        "build_s": round(build_seconds, 3),
+        "p50_ms": _percentile(samples, 50),
+        "p95_ms": _percentile(samples, 95),
+        "p99_ms": _percentile(samples, 99),
+        "rss_delta_mb": round(loaded_rss - baseline_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    """Run every backend in a subprocess and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, help="Run a single backend in this process.")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.backend:
+        result = run_backend(args.backend, args.chunks, args.dim, args.queries, args.top_k)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for backend in BACKENDS:
+        command = [
+            sys.executable, "-m", "benchmarks.vector_index_bench", "--backend", backend,
+            "--chunks", str(args.chunks), "--dim", str(args.dim),
+            "--queries", str(args.queries), "--top-k", str(args.top_k),
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend}: failed\n{completed.stderr.strip()}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    columns = ["backend", "build_s", "p50_ms", "p95_ms", "p99_ms", "rss_delta_mb", "peak_rss_mb"]
+    print("  ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>14}" for column in columns))
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Bounded response cache with exact and embedding-similarity lookups."""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from database import embed_texts
+
+
+class ResponseCache:
+    """Cache assistant replies keyed by normalized question text with LRU/TTL eviction.
+
+    Entries carry a namespace (one per tenant) and only match lookups in the same namespace.
+    """
+
+    _NON_WORD = re.compile(r"[^\w\s]+")
+    _SPACES = re.compile(r"\s+")
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.92,
+        semantic: bool = True,
+    ) -> None:
+        """Initialize an empty cache with the given size, expiry, and similarity limits."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.semantic = semantic
+        self._entries: "OrderedDict[str, Tuple[str, Optional[np.ndarray], float, str]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._generation = 0
+        self._namespace_generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """Return True when the cache is allowed to hold entries."""
+        return self.max_entries > 0
+
+    def generation(self, namespace: str = "") -> int:
+        """Return a counter that increases every time ``namespace``'s replies are invalidated."""
+        with self._lock:
+            return self._generation_of(namespace)
+
+    def _generation_of(self, namespace: str) -> int:
+        """Return ``namespace``'s generation: full plus per-namespace invalidations. Caller holds the lock."""
+        return self._generation + self._namespace_generations.get(namespace, 0)
+
+    def normalize(self, text: str) -> str:
+        """Lowercase text and strip punctuation and repeated whitespace."""
+        lowered = self._NON_WORD.sub(" ", text.lower())
+        return self._SPACES.sub(" ", lowered).strip()
+
+    @staticmethod
+    def _key(normalized: str, namespace: str) -> str:
+        """Return the entry key for normalized text within a namespace."""
+        return f"{namespace}\x1f{normalized}" if namespace else normalized
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Return a unit-length embedding for text, or None when embeddings are unavailable."""
+        if not self.semantic:
+            return None
+        vectors = embed_texts([text])
+        if not vectors:
+            return None
+        vector = np.asarray(vectors[0], dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        """Return True when an entry is older than the configured TTL."""
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _drop(self, key: str) -> None:
+        """Remove one entry and mark the similarity matrix stale. Caller holds the lock."""
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def _semantic_match(self, vector: np.ndarray, now: float, namespace: str = "") -> Optional[str]:
+        """Return the key of the most similar live entry above the threshold. Caller holds the lock."""
+        if self._matrix is None:
+            keys = [key for key, entry in self._entries.items() if entry[1] is not None]
+            self._matrix_keys = keys
+            self._matrix = np.vstack([self._entries[key][1] for key in keys]) if keys else None
+        if self._matrix is None:
+            return None
+
+        scores = self._matrix @ vector
+        for index in np.argsort(scores)[::-1]:
+            if scores[index] < self.similarity_threshold:
+                return None
+            key = self._matrix_keys[index]
+            entry = self._entries.get(key)
+            if entry is None or entry[3] != namespace:
+                continue
+            if self._is_expired(entry[2], now):
+                self._drop(key)
+                self._counters["expirations"] += 1
+                continue
+            return key
+        return None
+
+    def lookup(self, text: str, namespace: str = "") -> Optional[str]:
+        """Return a cached reply for text or a near-duplicate of it within ``namespace``."""
+        normalized = self.normalize(text)
+        if not normalized or not self.enabled:
+            return None
+        key = self._key(normalized, namespace)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._is_expired(entry[2], now):
+                    self._entries.move_to_end(key)
+                    self._counters["exact_hits"] += 1
+                    return entry[0]
+                self._drop(key)
+                self._counters["expirations"] += 1
+            has_vectors = self.semantic and bool(self._entries)
+
+        vector = self._embed(normalized) if has_vectors else None
+        with self._lock:
+            match = self._semantic_match(vector, now, namespace) if vector is not None else None
+            if match is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(match)
+            self._counters["semantic_hits"] += 1
+            return self._entries[match][0]
+
+    def store(self, text: str, reply: str, generation: Optional[int] = None, namespace: str = "") -> None:
+        """Cache a reply for text, evicting the least recently used entries when full.
+
+        Replies generated before an invalidation of ``namespace`` are dropped when ``generation``
+        no longer matches.
+        """
+        normalized = self.normalize(text)
+        if not normalized or not reply or not self.enabled:
+            return
+
+        key = self._key(normalized, namespace)
+        vector = self._embed(normalized)
+        with self._lock:
+            if generation is not None and generation != self._generation_of(namespace):
+                return
+            self._entries[key] = (reply, vector, time.monotonic(), namespace)
+            self._entries.move_to_end(key)
+            self._matrix = None
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        """Drop cached replies, e.g. after the knowledge base changes; only ``namespace``'s when given."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._generation += 1
+            else:
+                for key in [key for key, entry in self._entries.items() if entry[3] == namespace]:
+                    del self._entries[key]
+                self._namespace_generations[namespace] = self._namespace_generations.get(namespace, 0) + 1
+            self._matrix = None
+            self._matrix_keys = []
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters, hit ratio, and current size."""
+        with self._lock:
+            data: Dict[str, float] = dict(self._counters)
+            data["size"] = len(self._entries)
+        lookups = data["exact_hits"] + data["semantic_hits"] + data["misses"]
+        data["hit_ratio"] = round((data["exact_hits"] + data["semantic_hits"]) / lookups, 4) if lookups else 0.0
+        return data
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES if settings.RESPONSE_CACHE_ENABLED else 0,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    semantic=settings.RESPONSE_CACHE_SEMANTIC,
+)
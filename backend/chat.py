@@ -1,37 +1,70 @@
 """Chat orchestration service using Groq, RAG, memory, leads, and handoff."""
 
-from typing import List
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_groq import ChatGroq
+import httpx
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
+from analyzer import message_analyzer
+from cache import response_cache
 from config import settings
-from database import get_collection, query_similar
+from database import get_collection, query_scored_batch, release_collection
+from faq import get_faq_index
 from handoff import handoff_service
 from leads import lead_service
 from memory import memory_manager
+from metrics import count, timed
+from prompt import prompt_assembler
+from resilience import LLMUnavailable, llm_guard
+from retrieval import RetrievalBatcher
+from routing import COMPLEX, ModelTier, model_router
+from scheduler import Admission, chat_scheduler
+from tenants import Tenant, tenant_registry
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+
+DEGRADED_REPLY = "Sorry, I can't answer that right now. Please try again in a few minutes."
+DEGRADED_CONTEXT_REPLY = "I can't give a full answer right now, but here is what I found:\n\n{context}"
+DEGRADED_CONTEXT_CHARS = 400
+# Sent by the webhooks when the pipeline fails outright.
+FALLBACK_REPLY = "Sorry, something went wrong. Please try again shortly."
 
 
 class ChatService:
-    """Generate responses by combining retrieval context and conversation state."""
+    """Generate responses by combining retrieval context and conversation state.
+
+    Every entry point takes an optional :class:`tenants.Tenant`; it selects the business
+    profile, model credentials, knowledge collection, lead sheet, and the namespace used
+    for memory and cached replies. ``None`` means the default tenant. A message matching
+    the tenant's curated FAQ is answered from it without retrieval or a model call; any
+    other is answered by the model tier ``routing.model_router`` picks for it. Model calls
+    run under ``resilience.llm_guard``; when it gives up, the reply degrades to a cached
+    answer or the best retrieved passage.
+    """
 
     def __init__(self) -> None:
-        """Initialize shared resources for chat requests."""
-        self.collection = get_collection(settings.CHROMA_COLLECTION_NAME)
-
-    def _build_system_prompt(self, context_chunks: List[str]) -> str:
-        """Create a system prompt from business settings and retrieved context."""
-        context_block = "\n\n".join(context_chunks) if context_chunks else "No specific knowledge found."
-        return (
-            f"You are the AI customer support assistant for {settings.BUSINESS_NAME}.\n"
-            f"Tone: {settings.BOT_TONE}.\n"
-            "Use the context below when relevant. If context is missing, be transparent and helpful.\n\n"
-            f"Context:\n{context_block}"
+        """Initialize shared resources for chat requests; the vector store and model open on first use."""
+        self.collection: Any = None
+        self._models: Dict[Tuple[str, str, int], "ChatGroq"] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+        self._retrieval_executor = ThreadPoolExecutor(
+            max_workers=settings.RETRIEVAL_WORKERS,
+            thread_name_prefix="retrieval",
+        )
+        self._retrieval_batcher = RetrievalBatcher(
+            executor=self._retrieval_executor,
+            window_ms=settings.RETRIEVAL_BATCH_WINDOW_MS,
+            max_batch=settings.RETRIEVAL_MAX_BATCH,
         )
 
-    def _build_history_messages(self, user_id: str) -> List[HumanMessage | AIMessage]:
+    def _build_history_messages(self, history: List[Dict[str, str]]) -> List[HumanMessage | AIMessage]:
         """Convert stored message history into LangChain message objects."""
-        history = memory_manager.get_history(user_id)
         messages: List[HumanMessage | AIMessage] = []
         for item in history:
             role = item.get("role", "")
@@ -44,39 +77,506 @@ class ChatService:
                 messages.append(AIMessage(content=content))
         return messages
 
-    def get_reply(self, user_id: str, message: str, platform: str = "web") -> str:
-        """Return an assistant reply for a user message."""
-        lead_data = lead_service.detect_lead_info(message)
-        if lead_data:
+    def _build_model(self, api_key: str, model_name: str, max_tokens: int) -> "ChatGroq":
+        """Create a Groq chat model on the shared pooled keep-alive HTTP clients."""
+        from langchain_groq import ChatGroq
+
+        if self._http_client is None or self._http_async_client is None:
+            limits = httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            )
+            timeout = httpx.Timeout(settings.LLM_REQUEST_TIMEOUT)
+            self._http_client = httpx.Client(limits=limits, timeout=timeout)
+            self._http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return ChatGroq(
+            model_name=model_name,
+            groq_api_key=api_key,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            http_client=self._http_client,
+            http_async_client=self._http_async_client,
+            max_retries=0,
+        )
+
+    def _get_model(self, tenant: Optional[Tenant] = None, tier: Optional[ModelTier] = None) -> "ChatGroq":
+        """Return the long-lived chat model for a tenant and tier (the complex tier by default).
+
+        One model is kept per API key, model name, and token limit. Models on a tenant's
+        own API key are released with the tenant's other resources when it goes idle.
+        """
+        tenant = tenant or tenant_registry.default
+        tier = tier or model_router.tiers[COMPLEX]
+        key = (tenant.groq_api_key, tier.model_name or tenant.groq_model_name, tier.max_tokens)
+        if key[0] != settings.GROQ_API_KEY:
+            return tenant_registry.resource(tenant, f"llm:{key[1]}:{key[2]}", lambda: self._build_model(*key))
+        model = self._models.get(key)
+        if model is None:
+            model = self._models.setdefault(key, self._build_model(*key))
+        return model
+
+    def _model_name(self, tenant: Tenant, tier: Optional[ModelTier] = None) -> str:
+        """Return the circuit-breaker name of a tier's model, qualified by tenant when it has its own API key."""
+        tier = tier or model_router.tiers[COMPLEX]
+        model_name = tier.model_name or tenant.groq_model_name
+        return model_name if tenant.groq_api_key == settings.GROQ_API_KEY else f"{tenant.id}/{model_name}"
+
+    async def aclose(self) -> None:
+        """Close pooled HTTP clients and the retrieval executor."""
+        if self._http_async_client is not None:
+            await self._http_async_client.aclose()
+        if self._http_client is not None:
+            self._http_client.close()
+        self._models.clear()
+        self._http_client = None
+        self._http_async_client = None
+        self._retrieval_executor.shutdown(wait=False)
+
+    def retrieval_stats(self) -> dict:
+        """Return counters from the retrieval micro-batcher."""
+        return self._retrieval_batcher.stats()
+
+    def _handle_pre_llm(
+        self, tenant: Tenant, user_id: str, message: str, platform: str, parts: Optional[Sequence[str]] = None
+    ) -> Optional[str]:
+        """Capture lead details and return the handoff reply when escalation is requested."""
+        with timed("analysis"):
+            analysis = message_analyzer.analyze(message)
+        if analysis.lead and not tenant.google_sheet_id:
+            print(f"Tenant {tenant.id} has no google_sheet_id; lead from {platform} not saved.")
+        elif analysis.lead:
+            count("lead")
             try:
-                lead_service.save_lead(platform=platform, user_id=user_id, data_dict=lead_data)
+                with timed("lead_save"):
+                    lead_service.save_lead(
+                        platform=platform, user_id=user_id, data_dict=analysis.lead, sheet_id=tenant.google_sheet_id
+                    )
             except Exception:
                 pass
-
-        if handoff_service.check_handoff(message):
+        if analysis.escalate:
+            count("handoff")
             handoff_text = handoff_service.get_handoff_message()
-            memory_manager.add_message(user_id, "user", message)
-            memory_manager.add_message(user_id, "assistant", handoff_text)
+            self._record_exchange(tenant.scoped(user_id), message, handoff_text, parts)
             return handoff_text
+        return None
 
-        history_messages = self._build_history_messages(user_id)
-        self.collection = get_collection(settings.CHROMA_COLLECTION_NAME)
-        context_chunks = query_similar(self.collection, message, n=2)
-        system_prompt = self._build_system_prompt(context_chunks)
+    def _get_collection(self, tenant: Tenant) -> Any:
+        """Return a tenant's knowledge collection; other tenants' handles are released when idle."""
+        if tenant.is_default:
+            self.collection = get_collection(tenant.collection_name)
+            return self.collection
+        return tenant_registry.resource(
+            tenant,
+            "collection",
+            lambda: get_collection(tenant.collection_name),
+            close=lambda _: release_collection(tenant.collection_name),
+        )
 
-        model = ChatGroq(
-            model_name=settings.GROQ_MODEL_NAME,
-            groq_api_key=settings.GROQ_API_KEY,
-            temperature=0.7,
-            max_tokens=150,
+    def _retrieve_context(self, message: str, tenant: Tenant) -> List[Tuple[str, float]]:
+        """Fetch the most relevant knowledge chunks for a message with their similarity scores."""
+        with timed("get_collection"):
+            collection = self._get_collection(tenant)
+        with timed("retrieval"):
+            return query_scored_batch(collection, [message], n=2)[0]
+
+    async def _run_on_retrieval_executor(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking retrieval, embedding, or memory call on the dedicated executor.
+
+        The call runs in a copy of the caller's context, so its ``timed`` stages still count.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._retrieval_executor, contextvars.copy_context().run, func, *args)
+
+    async def _aretrieve_context(self, message: str, tenant: Tenant) -> List[Tuple[str, float]]:
+        """Fetch scored knowledge chunks through the micro-batching retrieval queue."""
+        with timed("get_collection"):
+            collection = await self._run_on_retrieval_executor(self._get_collection, tenant)
+        with timed("retrieval"):
+            return await self._retrieval_batcher.query_scored(collection, message, n=2)
+
+    def _prepare(
+        self, tenant: Tenant, memory_id: str, message: str
+    ) -> Tuple[ModelTier, List[BaseMessage], List[str]]:
+        """Retrieve context unless the message is small talk, pick the model tier, and build the prompt."""
+        scored = [] if model_router.is_small_talk(message) else self._retrieve_context(message, tenant)
+        return self._route(tenant, memory_id, message, scored)
+
+    async def _aprepare(
+        self, tenant: Tenant, memory_id: str, message: str
+    ) -> Tuple[ModelTier, List[BaseMessage], List[str]]:
+        """Async variant of :meth:`_prepare` using the batched retrieval queue; memory is read off the loop."""
+        scored = [] if model_router.is_small_talk(message) else await self._aretrieve_context(message, tenant)
+        return await self._run_on_retrieval_executor(self._route, tenant, memory_id, message, scored)
+
+    def _route(
+        self, tenant: Tenant, memory_id: str, message: str, scored: List[Tuple[str, float]]
+    ) -> Tuple[ModelTier, List[BaseMessage], List[str]]:
+        """Pick the tier from the message and best retrieval score, then build the message stack.
+
+        The retrieved chunks are returned too, for a degraded reply if the model is unavailable.
+        """
+        with timed("routing"):
+            tier = model_router.tier(model_router.classify(message, scored[0][1] if scored else None))
+        context_chunks = [chunk for chunk, _ in scored]
+        return tier, self._build_message_stack(tenant, memory_id, message, context_chunks), context_chunks
+
+    @staticmethod
+    def _finish_reason(response: BaseMessage) -> str:
+        """Return why the model stopped ("stop", "length", ...) when the provider reports it."""
+        return str((getattr(response, "response_metadata", None) or {}).get("finish_reason", ""))
+
+    def _invoke(self, tenant: Tenant, tier: ModelTier, message_stack: List[BaseMessage]) -> str:
+        """Call the tier's model, regenerating with the complex tier when the reply looks unreliable.
+
+        Both calls share one ``LLM_DEADLINE_SECONDS`` budget. Raises ``resilience.LLMUnavailable`` when no reply was
+        obtained; a failed escalation keeps the first reply.
+        """
+        model = self._get_model(tenant, tier)
+        deadline = llm_guard.deadline()
+        with timed("llm"):
+            response = llm_guard.call(self._model_name(tenant, tier), lambda: model.invoke(message_stack), deadline)
+        reply_text = self._content_text(response.content)
+        if model_router.should_escalate(tier, reply_text, self._finish_reason(response)):
+            model_router.record_escalation(tier)
+            complex_model = self._get_model(tenant)
+            try:
+                with timed("llm_escalation"):
+                    response = llm_guard.call(
+                        self._model_name(tenant), lambda: complex_model.invoke(message_stack), deadline
+                    )
+            except LLMUnavailable:
+                if not reply_text.strip():
+                    raise
+            else:
+                reply_text = self._content_text(response.content)
+        return reply_text
+
+    async def _ainvoke(self, tenant: Tenant, tier: ModelTier, message_stack: List[BaseMessage]) -> str:
+        """Async variant of :meth:`_invoke`, holding one LLM slot for both calls.
+
+        An open circuit fails before queueing for a slot, so the degraded reply is immediate.
+        The deadline starts once the slot is held, so local queueing never counts against the model.
+        """
+        model_name = self._model_name(tenant, tier)
+        llm_guard.ensure_available(model_name)
+        model = self._get_model(tenant, tier)
+        async with chat_scheduler.llm_slot():
+            deadline = llm_guard.deadline()
+            with timed("llm"):
+                response = await llm_guard.acall(model_name, lambda: model.ainvoke(message_stack), deadline)
+            reply_text = self._content_text(response.content)
+            if model_router.should_escalate(tier, reply_text, self._finish_reason(response)):
+                model_router.record_escalation(tier)
+                complex_model = self._get_model(tenant)
+                try:
+                    with timed("llm_escalation"):
+                        response = await llm_guard.acall(
+                            self._model_name(tenant), lambda: complex_model.ainvoke(message_stack), deadline
+                        )
+                except LLMUnavailable:
+                    if not reply_text.strip():
+                        raise
+                else:
+                    reply_text = self._content_text(response.content)
+        return reply_text
+
+    def _degraded_reply(self, message: str, tenant: Tenant, context_chunks: List[str]) -> str:
+        """Answer without the model: a cached reply to the question, else the best retrieved passage."""
+        count("llm_degraded")
+        cached_text = response_cache.lookup(message, tenant.namespace)
+        if cached_text is not None:
+            return cached_text
+        if not context_chunks:
+            return DEGRADED_REPLY
+        passage = " ".join(context_chunks[0].split())
+        if len(passage) > DEGRADED_CONTEXT_CHARS:
+            passage = passage[:DEGRADED_CONTEXT_CHARS].rsplit(" ", 1)[0] + "..."
+        return DEGRADED_CONTEXT_REPLY.format(context=passage)
+
+    def _is_cacheable(self, memory_id: str) -> bool:
+        """Return True when the reply depends only on the message, not on earlier turns."""
+        return response_cache.enabled and not memory_manager.get_history(memory_id)
+
+    def _lookup_cached(self, message: str, tenant: Tenant) -> Optional[str]:
+        """Return a cached reply for ``message`` and count the hit or miss."""
+        with timed("cache_lookup"):
+            cached_text = response_cache.lookup(message, tenant.namespace)
+        count("cache_hit" if cached_text is not None else "cache_miss")
+        return cached_text
+
+    async def _alookup_cached(self, message: str, tenant: Tenant) -> Optional[str]:
+        """Look up a cached reply on the retrieval executor and count the hit or miss."""
+        with timed("cache_lookup"):
+            cached_text = await self._run_on_retrieval_executor(response_cache.lookup, message, tenant.namespace)
+        count("cache_hit" if cached_text is not None else "cache_miss")
+        return cached_text
+
+    @staticmethod
+    def _lookup_faq(message: str, tenant: Tenant) -> Tuple[bool, Optional[str]]:
+        """Return whether the tenant has a curated FAQ and its answer for ``message``, if any."""
+        faq_index = get_faq_index(tenant)
+        if faq_index is None or not faq_index.has_entries():
+            return False, None
+        return True, faq_index.lookup(message)
+
+    def _match_faq(self, message: str, tenant: Tenant) -> Optional[str]:
+        """Return the tenant's curated FAQ answer for ``message`` and count the hit or miss."""
+        with timed("faq_lookup"):
+            consulted, answer = self._lookup_faq(message, tenant)
+        if consulted:
+            count("faq_hit" if answer is not None else "faq_miss")
+        return answer
+
+    async def _amatch_faq(self, message: str, tenant: Tenant) -> Optional[str]:
+        """Match the curated FAQ on the retrieval executor: (re)loading it reads files and a near match embeds."""
+        with timed("faq_lookup"):
+            consulted, answer = await self._run_on_retrieval_executor(self._lookup_faq, message, tenant)
+        if consulted:
+            count("faq_hit" if answer is not None else "faq_miss")
+        return answer
+
+    def _build_message_stack(
+        self, tenant: Tenant, memory_id: str, message: str, context_chunks: List[str]
+    ) -> List[BaseMessage]:
+        """Assemble the budgeted system prompt, recent history, and the new user message for the model."""
+        with timed("prompt_build"):
+            system_prompt, history = prompt_assembler.assemble(
+                context_chunks,
+                memory_manager.get_summary(memory_id),
+                memory_manager.get_history(memory_id),
+                message,
+                business_name=tenant.business_name,
+                bot_tone=tenant.bot_tone,
+            )
+            history_messages = self._build_history_messages(history)
+        return [SystemMessage(content=system_prompt), *history_messages, HumanMessage(content=message)]
+
+    def _record_exchange(
+        self, memory_id: str, message: str, reply_text: str, parts: Optional[Sequence[str]] = None
+    ) -> None:
+        """Store the user message (or each original message merged into it) and the assistant reply."""
+        with timed("record_memory"):
+            for part in parts or [message]:
+                memory_manager.add_message(memory_id, "user", part)
+            memory_manager.add_message(memory_id, "assistant", reply_text)
+
+    @staticmethod
+    def _content_text(content: object) -> str:
+        """Normalize LangChain message content into plain text."""
+        return content if isinstance(content, str) else str(content)
+
+    def get_reply(self, user_id: str, message: str, platform: str = "web", tenant: Optional[Tenant] = None) -> str:
+        """Return an assistant reply for a user message."""
+        tenant = tenant or tenant_registry.default
+        memory_id = tenant.scoped(user_id)
+        handoff_text = self._handle_pre_llm(tenant, user_id, message, platform)
+        if handoff_text is not None:
+            return handoff_text
+
+        faq_answer = self._match_faq(message, tenant)
+        if faq_answer is not None:
+            self._record_exchange(memory_id, message, faq_answer)
+            return faq_answer
+
+        cacheable = self._is_cacheable(memory_id)
+        cached_text = self._lookup_cached(message, tenant) if cacheable else None
+        if cached_text is not None:
+            self._record_exchange(memory_id, message, cached_text)
+            return cached_text
+
+        generation = response_cache.generation(tenant.namespace)
+        tier, message_stack, context_chunks = self._prepare(tenant, memory_id, message)
+        try:
+            reply_text = self._invoke(tenant, tier, message_stack)
+        except LLMUnavailable:
+            reply_text = self._degraded_reply(message, tenant, context_chunks)
+            cacheable = False
+
+        if cacheable:
+            response_cache.store(message, reply_text, generation, tenant.namespace)
+        self._record_exchange(memory_id, message, reply_text)
+        return reply_text
+
+    async def aget_reply(
+        self,
+        user_id: str,
+        message: str,
+        platform: str = "web",
+        admission: Optional[Admission] = None,
+        parts: Optional[Sequence[str]] = None,
+        tenant: Optional[Tenant] = None,
+    ) -> str:
+        """Return an assistant reply, queued behind the user's earlier messages.
+
+        ``parts`` lists the original messages when several were merged into ``message``;
+        history then records each of them. Raises ``scheduler.Overloaded`` when the
+        request is shed instead of queued.
+        """
+        tenant = tenant or tenant_registry.default
+        admission = admission or chat_scheduler.admit(tenant.scoped(user_id))
+        async with admission:
+            return await self._agenerate_reply(tenant, user_id, message, platform, parts)
+
+    async def _agenerate_reply(
+        self, tenant: Tenant, user_id: str, message: str, platform: str, parts: Optional[Sequence[str]] = None
+    ) -> str:
+        """Run the async pipeline without tying up a thread for the LLM call."""
+        memory_id = tenant.scoped(user_id)
+        handoff_text = await self._run_on_retrieval_executor(
+            self._handle_pre_llm, tenant, user_id, message, platform, parts
         )
-        message_stack = [SystemMessage(content=system_prompt), *history_messages, HumanMessage(content=message)]
-        response = model.invoke(message_stack)
-        reply_text = response.content if isinstance(response.content, str) else str(response.content)
+        if handoff_text is not None:
+            return handoff_text
+
+        faq_answer = await self._amatch_faq(message, tenant)
+        if faq_answer is not None:
+            await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, faq_answer, parts)
+            return faq_answer
+
+        cacheable = await self._run_on_retrieval_executor(self._is_cacheable, memory_id)
+        if cacheable:
+            cached_text = await self._alookup_cached(message, tenant)
+            if cached_text is not None:
+                await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, cached_text, parts)
+                return cached_text
+
+        generation = response_cache.generation(tenant.namespace)
+        tier, message_stack, context_chunks = await self._aprepare(tenant, memory_id, message)
+        try:
+            reply_text = await self._ainvoke(tenant, tier, message_stack)
+        except LLMUnavailable:
+            reply_text = await self._run_on_retrieval_executor(self._degraded_reply, message, tenant, context_chunks)
+            cacheable = False
 
-        memory_manager.add_message(user_id, "user", message)
-        memory_manager.add_message(user_id, "assistant", reply_text)
+        if cacheable:
+            await self._run_on_retrieval_executor(
+                response_cache.store, message, reply_text, generation, tenant.namespace
+            )
+        await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, reply_text, parts)
         return reply_text
 
+    def stream_reply(
+        self, user_id: str, message: str, platform: str = "web", tenant: Optional[Tenant] = None
+    ) -> Iterator[str]:
+        """Yield reply tokens as the model produces them, then record the full exchange.
+
+        Streamed replies use the routed tier but are never escalated, since tokens are already sent.
+        """
+        tenant = tenant or tenant_registry.default
+        memory_id = tenant.scoped(user_id)
+        handoff_text = self._handle_pre_llm(tenant, user_id, message, platform)
+        if handoff_text is not None:
+            yield handoff_text
+            return
+
+        faq_answer = self._match_faq(message, tenant)
+        if faq_answer is not None:
+            self._record_exchange(memory_id, message, faq_answer)
+            yield faq_answer
+            return
+
+        cacheable = self._is_cacheable(memory_id)
+        cached_text = self._lookup_cached(message, tenant) if cacheable else None
+        if cached_text is not None:
+            self._record_exchange(memory_id, message, cached_text)
+            yield cached_text
+            return
+
+        generation = response_cache.generation(tenant.namespace)
+        tier, message_stack, context_chunks = self._prepare(tenant, memory_id, message)
+        model = self._get_model(tenant, tier)
+        parts: List[str] = []
+        try:
+            with timed("llm"):
+                for chunk in llm_guard.stream(
+                    self._model_name(tenant, tier), lambda: model.stream(message_stack), llm_guard.deadline()
+                ):
+                    token = self._content_text(chunk.content)
+                    if not token:
+                        continue
+                    parts.append(token)
+                    yield token
+        except LLMUnavailable:
+            # Raised only before the first token, so nothing has been sent yet.
+            reply_text = self._degraded_reply(message, tenant, context_chunks)
+            self._record_exchange(memory_id, message, reply_text)
+            yield reply_text
+            return
+
+        reply_text = "".join(parts)
+        if cacheable:
+            response_cache.store(message, reply_text, generation, tenant.namespace)
+        self._record_exchange(memory_id, message, reply_text)
+
+    async def astream_reply(
+        self,
+        user_id: str,
+        message: str,
+        platform: str = "web",
+        admission: Optional[Admission] = None,
+        tenant: Optional[Tenant] = None,
+    ) -> AsyncIterator[str]:
+        """Async variant of stream_reply, queued behind the user's earlier messages."""
+        tenant = tenant or tenant_registry.default
+        admission = admission or chat_scheduler.admit(tenant.scoped(user_id))
+        try:
+            async with admission:
+                async for token in self._agenerate_stream(tenant, user_id, message, platform):
+                    yield token
+        finally:
+            admission.release()
+
+    async def _agenerate_stream(self, tenant: Tenant, user_id: str, message: str, platform: str) -> AsyncIterator[str]:
+        """Yield reply tokens from the pooled async client and record the exchange."""
+        memory_id = tenant.scoped(user_id)
+        handoff_text = await self._run_on_retrieval_executor(self._handle_pre_llm, tenant, user_id, message, platform)
+        if handoff_text is not None:
+            yield handoff_text
+            return
+
+        faq_answer = await self._amatch_faq(message, tenant)
+        if faq_answer is not None:
+            await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, faq_answer)
+            yield faq_answer
+            return
+
+        cacheable = await self._run_on_retrieval_executor(self._is_cacheable, memory_id)
+        if cacheable:
+            cached_text = await self._alookup_cached(message, tenant)
+            if cached_text is not None:
+                await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, cached_text)
+                yield cached_text
+                return
+
+        generation = response_cache.generation(tenant.namespace)
+        tier, message_stack, context_chunks = await self._aprepare(tenant, memory_id, message)
+        model_name = self._model_name(tenant, tier)
+        model = self._get_model(tenant, tier)
+        parts: List[str] = []
+        try:
+            llm_guard.ensure_available(model_name)
+            async with chat_scheduler.llm_slot():
+                deadline = llm_guard.deadline()
+                with timed("llm"):
+                    async for chunk in llm_guard.astream(model_name, lambda: model.astream(message_stack), deadline):
+                        token = self._content_text(chunk.content)
+                        if not token:
+                            continue
+                        parts.append(token)
+                        yield token
+        except LLMUnavailable:
+            # Raised only before the first token, so nothing has been sent yet.
+            reply_text = await self._run_on_retrieval_executor(self._degraded_reply, message, tenant, context_chunks)
+            await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, reply_text)
+            yield reply_text
+            return
+
+        reply_text = "".join(parts)
+        if cacheable:
+            await self._run_on_retrieval_executor(
+                response_cache.store, message, reply_text, generation, tenant.namespace
+            )
+        await self._run_on_retrieval_executor(self._record_exchange, memory_id, message, reply_text)
+
 
 chat_service = ChatService()
@@ -0,0 +1,106 @@
+"""Per-platform debouncing that merges a user's rapid-fire messages into one pipeline run."""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+
+class _Burst:
+    """Messages collected for one user while the debounce window is open."""
+
+    __slots__ = ("messages", "started", "last", "wakeup", "closed")
+
+    def __init__(self, message: str) -> None:
+        """Open a burst with its first message."""
+        self.messages = [message]
+        self.started = self.last = time.monotonic()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+
+class MessageCoalescer:
+    """Merge consecutive messages from one user into a single reply.
+
+    The first message of a burst waits until the user has been quiet for the platform's
+    idle window, ``max_wait`` has passed since the burst began, or ``max_batch`` messages
+    have arrived. Messages that join an open burst return ``None`` because they are
+    answered by the first message's run.
+    """
+
+    def __init__(
+        self,
+        platforms: str = "",
+        idle_ms: float = 1200.0,
+        max_wait_ms: float = 4000.0,
+        max_batch: int = 5,
+    ) -> None:
+        """Parse ``platforms`` as ``"whatsapp,instagram:800"`` (optional per-platform idle window in ms)."""
+        self.idle_windows: Dict[str, float] = {}
+        for item in platforms.split(","):
+            name, _, window = item.strip().partition(":")
+            if name:
+                self.idle_windows[name] = (float(window) if window else idle_ms) / 1000.0
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max(max_batch, 1)
+        self._bursts: Dict[Tuple[str, str], _Burst] = {}
+        self._stats: Dict[str, int] = {"bursts": 0, "messages": 0, "merged": 0}
+
+    def enabled(self, platform: str) -> bool:
+        """Return True when messages from ``platform`` are debounced."""
+        return platform in self.idle_windows
+
+    async def collect(self, platform: str, user_id: str, message: str) -> Optional[List[str]]:
+        """Return the burst's messages for the run that should reply, or ``None`` if merged into another."""
+        if not self.enabled(platform):
+            return [message]
+
+        key = (platform, user_id)
+        burst = self._bursts.get(key)
+        if burst is not None and not burst.closed:
+            burst.messages.append(message)
+            burst.last = time.monotonic()
+            if len(burst.messages) >= self.max_batch:
+                burst.closed = True
+            burst.wakeup.set()
+            self._stats["messages"] += 1
+            self._stats["merged"] += 1
+            return None
+
+        burst = _Burst(message)
+        self._bursts[key] = burst
+        self._stats["bursts"] += 1
+        self._stats["messages"] += 1
+        idle = self.idle_windows[platform]
+        try:
+            while not burst.closed:
+                remaining = min(burst.last + idle, burst.started + self.max_wait) - time.monotonic()
+                if remaining <= 0:
+                    break
+                burst.wakeup.clear()
+                try:
+                    await asyncio.wait_for(burst.wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            burst.closed = True
+            if self._bursts.get(key) is burst:
+                del self._bursts[key]
+        return list(burst.messages)
+
+    def stats(self) -> Dict[str, object]:
+        """Return burst counts and the average number of messages answered per reply."""
+        data: Dict[str, object] = dict(self._stats)
+        data["platforms"] = {name: round(window * 1000.0) for name, window in self.idle_windows.items()}
+        data["open_bursts"] = len(self._bursts)
+        data["avg_batch"] = round(self._stats["messages"] / self._stats["bursts"], 2) if self._stats["bursts"] else 0.0
+        return data
+
+
+message_coalescer = MessageCoalescer(
+    platforms=settings.COALESCE_PLATFORMS,
+    idle_ms=settings.COALESCE_IDLE_MS,
+    max_wait_ms=settings.COALESCE_MAX_WAIT_MS,
+    max_batch=settings.COALESCE_MAX_BATCH,
+)
@@ -18,9 +18,96 @@ class Settings(BaseSettings):
     META_VERIFY_TOKEN: str = ""
     META_PAGE_ACCESS_TOKEN: str = ""
     INSTAGRAM_ACCOUNT_ID: str = ""
+    TWILIO_API_BASE_URL: str = "https://api.twilio.com"
+    META_GRAPH_BASE_URL: str = "https://graph.facebook.com"
+    TWILIO_RATE_LIMIT_PER_SECOND: float = 10.0
+    META_RATE_LIMIT_PER_SECOND: float = 20.0
+    DELIVERY_WORKERS: int = 8
+    DELIVERY_MAX_CONNECTIONS: int = 20
+    DELIVERY_MAX_ATTEMPTS: int = 5
+    DELIVERY_BACKOFF_BASE_SECONDS: float = 0.5
+    DELIVERY_BACKOFF_MAX_SECONDS: float = 30.0
+    DELIVERY_MAX_QUEUE: int = 10000
+    DELIVERY_DEAD_LETTER_PATH: str = ""
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_SQLITE_PATH: str = ""
+    IDEMPOTENCY_MAX_ENTRIES: int = 100000
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: float = 30.0
+    COALESCE_PLATFORMS: str = ""
+    COALESCE_IDLE_MS: float = 1200.0
+    COALESCE_MAX_WAIT_MS: float = 4000.0
+    COALESCE_MAX_BATCH: int = 5
+    SERVER_TIMING_ENABLED: bool = False
+    PROFILER_ENABLED: bool = False
+    PROFILER_INTERVAL_MS: float = 10.0
+    WARMUP_MODE: str = "off"
+    TENANTS_CONFIG_PATH: str = ""
+    TENANT_IDLE_SECONDS: float = 900.0
     GOOGLE_SHEET_ID: str = ""
     GOOGLE_SERVICE_ACCOUNT_JSON: str = ""
+    INGEST_PROCESS_WORKERS: int = 2
+    INGEST_PAGES_PER_TASK: int = 8
+    INGEST_EMBED_BATCH_SIZE: int = 64
+    INGEST_MAX_CONCURRENT_JOBS: int = 2
+    LEAD_SPOOL_PATH: str = ""
+    LEAD_SINK_BATCH_SIZE: int = 50
+    LEAD_SINK_FLUSH_INTERVAL_SECONDS: float = 5.0
     CHROMA_COLLECTION_NAME: str = "business_knowledge"
+    VECTOR_BACKEND: str = "chroma"
+    VECTOR_INDEX_DTYPE: str = "float32"
+    LLM_MAX_CONCURRENCY: int = 32
+    SCHEDULER_MAX_QUEUE: int = 256
+    SCHEDULER_MAX_USER_QUEUE: int = 3
+    SCHEDULER_QUEUE_TIMEOUT_SECONDS: float = 20.0
+    USER_RATE_LIMIT_PER_MINUTE: float = 20.0
+    USER_RATE_LIMIT_BURST: float = 5.0
+    GLOBAL_RATE_LIMIT_PER_SECOND: float = 20.0
+    GLOBAL_RATE_LIMIT_BURST: float = 40.0
+    MODEL_ROUTING_ENABLED: bool = True
+    ROUTING_SMALL_TALK_MODEL: str = "llama-3.1-8b-instant"
+    ROUTING_SMALL_TALK_MAX_TOKENS: int = 60
+    ROUTING_FAQ_MODEL: str = "llama-3.1-8b-instant"
+    ROUTING_FAQ_MAX_TOKENS: int = 150
+    ROUTING_COMPLEX_MODEL: str = ""
+    ROUTING_COMPLEX_MAX_TOKENS: int = 150
+    ROUTING_FAQ_MIN_SCORE: float = 0.6
+    ROUTING_COMPLEX_MIN_WORDS: int = 25
+    ROUTING_ESCALATE: bool = True
+    LLM_MAX_CONNECTIONS: int = 64
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    LLM_REQUEST_TIMEOUT: float = 30.0
+    LLM_DEADLINE_SECONDS: float = 15.0
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_BACKOFF_BASE_SECONDS: float = 0.25
+    LLM_BACKOFF_MAX_SECONDS: float = 2.0
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    RETRIEVAL_WORKERS: int = 4
+    RETRIEVAL_BATCH_WINDOW_MS: float = 5.0
+    RETRIEVAL_MAX_BATCH: int = 32
+    EMBEDDING_CACHE_SIZE: int = 2048
+    MEMORY_BACKEND: str = "memory"
+    MEMORY_SQLITE_PATH: str = ""
+    MEMORY_MAX_MESSAGES: int = 8
+    MEMORY_MAX_USERS: int = 10000
+    MEMORY_TTL_SECONDS: float = 86400.0
+    MEMORY_SUMMARY_MAX_CHARS: int = 1200
+    PROMPT_TOKEN_BUDGET: int = 1500
+    PROMPT_MAX_CONTEXT_TOKENS: int = 700
+    PROMPT_MAX_SUMMARY_TOKENS: int = 200
+    ANALYZER_PHRASES_PATH: str = ""
+    ANALYZER_RELOAD_INTERVAL_SECONDS: float = 5.0
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_SEMANTIC: bool = True
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = 0.92
+    FAQ_ENABLED: bool = True
+    FAQ_STORE_PATH: str = ""
+    FAQ_MATCH_THRESHOLD: float = 0.9
 
     model_config = SettingsConfigDict(
         env_file=str(Path(__file__).resolve().parent / ".env"),
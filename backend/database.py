@@ -1,40 +1,194 @@
-"""ChromaDB helper functions and singleton client access."""
+"""Vector-store helper functions and the lazily initialized, process-wide store and embedder."""
 
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
-try:
-    import chromadb
+from config import settings
+from vector_index import NumpyVectorIndex, get_vector_index, release_vector_index
+
+if TYPE_CHECKING:
     from chromadb.api.models.Collection import Collection
-    from chromadb.utils import embedding_functions
-
-    _store_path = str(Path(__file__).resolve().parent / "chroma_store")
-    _client = chromadb.PersistentClient(path=_store_path)
-    # Use Chroma's built-in ONNX embedding function to avoid heavyweight torch dependencies.
-    _embedding_fn = embedding_functions.DefaultEmbeddingFunction()
-except Exception:
-    chromadb = None
-    Collection = object  # type: ignore[assignment]
-    _client = None
-    _embedding_fn = None
-
-
-def get_collection(name: str) -> Collection:
-    """Return an existing ChromaDB collection or create it if missing."""
-    if _client is None:
+
+_store_path = str(Path(__file__).resolve().parent / "chroma_store")
+_vector_index_path = Path(__file__).resolve().parent / "vector_store"
+
+# Chroma and its ONNX embedder are imported on first use so the app starts without them.
+_client: Any = None
+_client_failed = False
+_embedding_fn: Optional[Callable[[List[str]], Any]] = None
+_embedding_failed = False
+_init_lock = threading.Lock()
+
+
+def get_embedding_function() -> Optional[Callable[[List[str]], Any]]:
+    """Return the shared embedding function, creating it on first use (None when unavailable)."""
+    global _embedding_fn, _embedding_failed
+    if _embedding_fn is not None or _embedding_failed:
+        return _embedding_fn
+    with _init_lock:
+        if _embedding_fn is None and not _embedding_failed:
+            try:
+                from chromadb.utils import embedding_functions
+
+                # Use Chroma's built-in ONNX embedding function to avoid heavyweight torch dependencies.
+                _embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+            except Exception as exc:
+                _embedding_failed = True
+                print(f"Embedding function unavailable: {exc}")
+    return _embedding_fn
+
+
+def get_chroma_client() -> Any:
+    """Return the shared Chroma ``PersistentClient``, opening it on first use (None when unavailable)."""
+    global _client, _client_failed
+    if _client is not None or _client_failed:
+        return _client
+    with _init_lock:
+        if _client is None and not _client_failed:
+            try:
+                import chromadb
+
+                _client = chromadb.PersistentClient(path=_store_path)
+            except Exception as exc:
+                _client_failed = True
+                print(f"Chroma client unavailable: {exc}")
+    return _client
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of text embeddings so repeated queries skip the ONNX pass."""
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        """Initialize an empty cache holding at most ``max_entries`` vectors."""
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for whichever of ``texts`` are present."""
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for text in texts:
+                vector = self._entries.get(text)
+                if vector is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(text)
+                found[text] = vector
+                self.hits += 1
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Store vectors and evict the least recently used entries beyond capacity."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for text, vector in items.items():
+                self._entries[text] = vector
+                self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+embedding_cache = EmbeddingCache(max_entries=settings.EMBEDDING_CACHE_SIZE)
+
+
+def _use_numpy_index() -> bool:
+    """Return True when the in-process NumPy index is the configured retrieval backend."""
+    return settings.VECTOR_BACKEND == "numpy"
+
+
+def get_collection(name: str) -> "Collection":
+    """Return the named collection from the configured backend, creating it if missing."""
+    if _use_numpy_index():
+        return get_vector_index(  # type: ignore[return-value]
+            name,
+            _vector_index_path,
+            embedding_function=get_embedding_function(),
+            dtype=settings.VECTOR_INDEX_DTYPE,
+        )
+    client = get_chroma_client()
+    if client is None:
         return object()  # type: ignore[return-value]
-    return _client.get_or_create_collection(name=name, embedding_function=_embedding_fn)
+    return client.get_or_create_collection(name=name, embedding_function=get_embedding_function())
 
 
-def query_similar(collection: Collection, query_text: str, n: int = 4) -> List[str]:
-    """Query a collection for similar chunks and return their text values."""
-    if _client is None:
-        return []
-    if not query_text.strip():
-        return []
+def release_collection(name: str) -> None:
+    """Drop the in-process index held for a collection (Chroma handles hold no data to release)."""
+    if _use_numpy_index():
+        release_vector_index(name)
 
-    results = collection.query(query_texts=[query_text], n_results=n)
-    docs = results.get("documents", [])
-    if not docs:
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed texts with the shared embedding function, or return [] when unavailable.
+
+    Cached vectors are reused and all cache misses are embedded in one batched call.
+    """
+    embedding_fn = get_embedding_function() if texts else None
+    if embedding_fn is None:
         return []
-    return [item for item in docs[0] if isinstance(item, str)]
+
+    found = embedding_cache.get_many(texts)
+    missing = list(dict.fromkeys(text for text in texts if text not in found))
+    if missing:
+        computed = {text: list(vector) for text, vector in zip(missing, embedding_fn(missing))}
+        embedding_cache.put_many(computed)
+        found.update(computed)
+    return [found[text] for text in texts]
+
+
+def _similarity(distance: float, space: str) -> float:
+    """Convert a vector-store distance into a cosine similarity for unit-length embeddings."""
+    if space == "l2":
+        # Chroma's default space reports squared L2, which is 2 - 2 * cosine for unit vectors.
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+
+def query_scored_batch(collection: "Collection", query_texts: List[str], n: int = 4) -> List[List[Tuple[str, float]]]:
+    """Query a collection for several texts in one call and return (chunk, similarity) pairs per query."""
+    if not isinstance(collection, NumpyVectorIndex) and get_chroma_client() is None:
+        return [[] for _ in query_texts]
+
+    active = [index for index, text in enumerate(query_texts) if text.strip()]
+    results: List[List[Tuple[str, float]]] = [[] for _ in query_texts]
+    if not active:
+        return results
+
+    embeddings = embed_texts([query_texts[index] for index in active])
+    if not embeddings:
+        return results
+    response = collection.query(query_embeddings=embeddings, n_results=n)
+    docs = response.get("documents") or []
+    distances = response.get("distances") or []
+    if isinstance(collection, NumpyVectorIndex):
+        space = "cosine"
+    else:
+        space = (getattr(collection, "metadata", None) or {}).get("hnsw:space", "l2")
+    for position, (index, items) in enumerate(zip(active, docs)):
+        row = distances[position] if position < len(distances) and distances[position] else []
+        results[index] = [
+            (item, _similarity(float(row[rank]), space) if rank < len(row) else 0.0)
+            for rank, item in enumerate(items or [])
+            if isinstance(item, str)
+        ]
+    return results
+
+
+def query_similar_batch(collection: "Collection", query_texts: List[str], n: int = 4) -> List[List[str]]:
+    """Query a collection for several texts in one call and return chunk texts per query."""
+    return [[doc for doc, _ in scored] for scored in query_scored_batch(collection, query_texts, n=n)]
+
+
+def query_similar(collection: "Collection", query_text: str, n: int = 4) -> List[str]:
+    """Query a collection for similar chunks and return their text values."""
+    return query_similar_batch(collection, [query_text], n=n)[0]
@@ -0,0 +1,525 @@
+"""Outbound message delivery for Twilio and Meta with pooled clients, retries, and a dead-letter store."""
+
+import abc
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from config import settings
+from metrics import DELIVERY_SECONDS, count, registry
+from scheduler import TokenBucket
+from tenants import Tenant, tenant_registry
+
+
+class OutboundMessage:
+    """One reply waiting to be delivered to a platform user."""
+
+    __slots__ = ("provider", "recipient", "text", "tenant_id", "attempts", "created_at", "last_error", "not_before")
+
+    def __init__(self, provider: str, recipient: str, text: str, attempts: int = 0, tenant_id: str = "") -> None:
+        """Create a message for ``provider`` ("twilio" or "meta"), sent with ``tenant_id``'s credentials."""
+        self.provider = provider
+        self.recipient = recipient
+        self.text = text
+        self.tenant_id = tenant_id
+        self.attempts = attempts
+        self.created_at = time.time()
+        self.last_error = ""
+        # Monotonic time before which a failed message is not retried.
+        self.not_before = 0.0
+
+
+class DeliveryError(Exception):
+    """A failed send; ``retryable`` tells the queue whether another attempt may succeed."""
+
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None) -> None:
+        """Store whether to retry and any server-provided delay in seconds."""
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class Provider(abc.ABC):
+    """Connection-pooled sender for one messaging API with its own rate limit."""
+
+    name = ""
+
+    def __init__(
+        self,
+        base_url: str,
+        rate_per_second: float = 10.0,
+        burst: float = 10.0,
+        max_connections: int = 20,
+        timeout: float = 15.0,
+    ) -> None:
+        """Configure the API base URL, rate limit, and connection pool size."""
+        self.base_url = base_url.rstrip("/")
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_connections = max(max_connections, 1)
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=httpx.Timeout(self.timeout),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def wait_for_rate(self) -> None:
+        """Sleep until the provider's token bucket allows another request."""
+        while True:
+            wait = self.bucket.wait_time()
+            if wait <= 0:
+                self.bucket.consume()
+                return
+            await asyncio.sleep(wait)
+
+    def _tenant(self, message: OutboundMessage) -> Optional[Tenant]:
+        """Return the tenant whose credentials send ``message``, or None for the provider's own."""
+        if not message.tenant_id:
+            return None
+        tenant = tenant_registry.get(message.tenant_id)
+        if tenant is None:
+            raise DeliveryError(f"{self.name}: unknown tenant {message.tenant_id}", retryable=False)
+        return None if tenant.is_default else tenant
+
+    @abc.abstractmethod
+    async def _post(self, message: OutboundMessage) -> httpx.Response:
+        """Issue the provider-specific send request."""
+
+    def _is_rate_limited(self, response: httpx.Response) -> bool:
+        """Return True when the response signals throttling."""
+        return response.status_code == 429
+
+    async def send(self, message: OutboundMessage) -> None:
+        """Send one message, raising :class:`DeliveryError` on failure."""
+        started = time.perf_counter()
+        try:
+            response = await self._post(message)
+        except httpx.TransportError as exc:
+            DELIVERY_SECONDS.observe(time.perf_counter() - started, provider=self.name, outcome="transport_error")
+            raise DeliveryError(f"{self.name} transport error: {exc}", retryable=True) from exc
+        DELIVERY_SECONDS.observe(time.perf_counter() - started, provider=self.name, outcome=str(response.status_code))
+        if response.status_code < 400:
+            return
+        retry_after: Optional[float] = None
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            pass
+        retryable = self._is_rate_limited(response) or response.status_code >= 500
+        raise DeliveryError(
+            f"{self.name} API error {response.status_code}: {response.text[:300]}",
+            retryable=retryable,
+            retry_after=retry_after,
+        )
+
+
+class TwilioProvider(Provider):
+    """Send WhatsApp messages through the Twilio Messages REST API."""
+
+    name = "twilio"
+
+    def __init__(self, base_url: str, account_sid: str, auth_token: str, from_number: str, **kwargs: float) -> None:
+        """Store Twilio credentials and the WhatsApp sender number."""
+        super().__init__(base_url, **kwargs)
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+
+    def _account(self, message: OutboundMessage) -> Tuple[str, str, str]:
+        """Return the account SID, auth token, and sender number to send ``message`` with."""
+        tenant = self._tenant(message)
+        if tenant is None:
+            return self.account_sid, self.auth_token, self.from_number
+        if not tenant.twilio_account_sid or not tenant.twilio_auth_token:
+            raise DeliveryError(f"twilio: tenant {tenant.id} has no Twilio credentials", retryable=False)
+        return tenant.twilio_account_sid, tenant.twilio_auth_token, tenant.whatsapp_number
+
+    async def _post(self, message: OutboundMessage) -> httpx.Response:
+        """POST the message form to the account's Messages resource."""
+        account_sid, auth_token, from_number = self._account(message)
+        return await self._get_client().post(
+            f"/2010-04-01/Accounts/{account_sid}/Messages.json",
+            data={"From": from_number, "To": message.recipient, "Body": message.text},
+            auth=(account_sid, auth_token),
+        )
+
+
+class MetaProvider(Provider):
+    """Send Instagram direct messages through the Meta Graph API."""
+
+    name = "meta"
+    # Graph API throttling codes returned with HTTP 400/403 instead of 429.
+    RATE_LIMIT_CODES = {4, 17, 32, 613}
+
+    def __init__(self, base_url: str, account_id: str, access_token: str, **kwargs: float) -> None:
+        """Store the Instagram account and page access token."""
+        super().__init__(base_url, **kwargs)
+        self.account_id = account_id
+        self.access_token = access_token
+
+    def _account(self, message: OutboundMessage) -> Tuple[str, str]:
+        """Return the Instagram account ID and access token to send ``message`` with."""
+        tenant = self._tenant(message)
+        if tenant is None:
+            return self.account_id, self.access_token
+        if not tenant.meta_page_access_token:
+            raise DeliveryError(f"meta: tenant {tenant.id} has no Meta page access token", retryable=False)
+        return tenant.instagram_account_id, tenant.meta_page_access_token
+
+    async def _post(self, message: OutboundMessage) -> httpx.Response:
+        """POST the message JSON to the account's messages edge."""
+        account_id, access_token = self._account(message)
+        return await self._get_client().post(
+            f"/v20.0/{account_id}/messages",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={"recipient": {"id": message.recipient}, "message": {"text": message.text}},
+        )
+
+    def _is_rate_limited(self, response: httpx.Response) -> bool:
+        """Detect HTTP 429 and Graph API throttling error codes."""
+        if response.status_code == 429:
+            return True
+        try:
+            code = response.json().get("error", {}).get("code")
+        except ValueError:
+            return False
+        return code in self.RATE_LIMIT_CODES
+
+
+class DeliveryQueue:
+    """Deliver replies from a bounded async queue with worker, retry, and rate limits.
+
+    Webhooks only enqueue. Workers send through the provider's pooled client. A transient
+    failure is parked with a ``not_before`` time (exponential backoff with full jitter) and
+    re-queued when it passes, so no worker sleeps through a backoff. Messages that exhaust
+    their attempts (or are rejected outright) move to a SQLite dead-letter table.
+    Messages to the same recipient are delivered in the order they were enqueued: while one
+    is being sent or waits to retry, later ones are held behind it without taking a worker.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, Provider],
+        dead_letter_path: Path,
+        workers: int = 8,
+        max_attempts: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_queue: int = 10000,
+    ) -> None:
+        """Configure providers, worker count, retry policy, and the dead-letter database."""
+        self.providers = providers
+        self.dead_letter_path = Path(dead_letter_path)
+        self.workers = max(workers, 1)
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue = max(max_queue, 1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Per recipient: the message being sent or waiting to retry, and the ones held behind it.
+        self._active: Dict[str, OutboundMessage] = {}
+        self._held: Dict[str, Deque[OutboundMessage]] = {}
+        self._retry_timers: Dict[int, Tuple[OutboundMessage, asyncio.TimerHandle]] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._outstanding = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.in_flight = 0
+        self.held = 0
+        self.last_error = ""
+        self._stats: Dict[str, int] = {"enqueued": 0, "delivered": 0, "retries": 0, "dead_lettered": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the dead-letter database on first use."""
+        if self._conn is None:
+            self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.dead_letter_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, provider TEXT NOT NULL, recipient TEXT NOT NULL, "
+                "text TEXT NOT NULL, attempts INTEGER NOT NULL, error TEXT NOT NULL, created_at REAL NOT NULL, "
+                "tenant_id TEXT NOT NULL DEFAULT '')"
+            )
+            self._conn = conn
+        return self._conn
+
+    def start(self) -> None:
+        """Create the queue and worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._idle = asyncio.Event()
+        if not self._outstanding:
+            self._idle.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def enqueue(self, message: OutboundMessage) -> bool:
+        """Queue a message for delivery; dead-letter it in the background if the queue is full."""
+        if message.provider not in self.providers:
+            raise ValueError(f"Unknown delivery provider: {message.provider}")
+        self.start()
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            task = asyncio.create_task(asyncio.to_thread(self._dead_letter, [message], "delivery queue full"))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return False
+        self._stats["enqueued"] += 1
+        self._outstanding += 1
+        self._idle.clear()
+        return True
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Return the delay before retry ``attempt`` using exponential backoff with full jitter."""
+        cap = min(self.backoff_base * (2 ** (attempt - 1)), self.backoff_max)
+        delay = random.uniform(0, cap)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    @staticmethod
+    def _recipient_key(message: OutboundMessage) -> str:
+        """Return the key that keeps one recipient's messages in order."""
+        return f"{message.provider}:{message.tenant_id}:{message.recipient}"
+
+    def _retry_later(self, message: OutboundMessage, delay: float) -> None:
+        """Park a message until ``delay`` seconds from now, then put it back on the queue."""
+        message.not_before = time.monotonic() + delay
+        handle = asyncio.get_running_loop().call_later(delay, self._resume, message)
+        self._retry_timers[id(message)] = (message, handle)
+
+    def _resume(self, message: OutboundMessage) -> None:
+        """Re-queue a parked message whose ``not_before`` time has come."""
+        self._retry_timers.pop(id(message), None)
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._retry_later(message, self.backoff_base)
+
+    def _settle(self, key: str) -> Optional[OutboundMessage]:
+        """Finish a recipient's current message and return the next one held behind it, if any."""
+        self._outstanding -= 1
+        if not self._outstanding:
+            self._idle.set()
+        held = self._held.get(key)
+        if not held:
+            self._held.pop(key, None)
+            self._active.pop(key, None)
+            return None
+        message = held.popleft()
+        self.held -= 1
+        self._active[key] = message
+        return message
+
+    async def _attempt(self, message: OutboundMessage) -> bool:
+        """Send one message once; returns False when it was parked for a retry."""
+        provider = self.providers[message.provider]
+        message.attempts += 1
+        await provider.wait_for_rate()
+        try:
+            await provider.send(message)
+        except DeliveryError as exc:
+            message.last_error = str(exc)
+            self.last_error = message.last_error
+            if not exc.retryable or message.attempts >= self.max_attempts:
+                await asyncio.to_thread(self._dead_letter, [message], message.last_error)
+                return True
+            self._stats["retries"] += 1
+            count("delivery_retry")
+            self._retry_later(message, self._backoff(message.attempts, exc.retry_after))
+            return False
+        self._stats["delivered"] += 1
+        count("delivery_sent")
+        return True
+
+    async def _deliver(self, message: OutboundMessage) -> None:
+        """Send a message, then any held behind it for the same recipient, until one is parked."""
+        key = self._recipient_key(message)
+        current = self._active.setdefault(key, message)
+        if current is not message:
+            self._held.setdefault(key, deque()).append(message)
+            self.held += 1
+            return
+        while message is not None:
+            try:
+                settled = await self._attempt(message)
+            except Exception as exc:
+                self.last_error = str(exc)
+                print(f"Delivery worker error: {exc}")
+                await asyncio.to_thread(self._dead_letter, [message], str(exc))
+                settled = True
+            if not settled:
+                return
+            message = self._settle(key)
+
+    async def _worker(self) -> None:
+        """Take messages off the queue and deliver them until cancelled."""
+        while True:
+            message = await self._queue.get()
+            self.in_flight += 1
+            try:
+                await self._deliver(message)
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    def _dead_letter(self, messages: List[OutboundMessage], error: str) -> None:
+        """Persist undeliverable messages for inspection or a later retry."""
+        with self._db_lock:
+            self._connect().executemany(
+                "INSERT INTO dead_letters (provider, recipient, text, attempts, error, created_at, tenant_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        message.provider, message.recipient, message.text, message.attempts, error,
+                        message.created_at, message.tenant_id,
+                    )
+                    for message in messages
+                ],
+            )
+        self._stats["dead_lettered"] += len(messages)
+        count("delivery_dead_letter", len(messages))
+        for message in messages:
+            print(f"Delivery to {message.provider}:{message.recipient} dead-lettered: {error}")
+
+    def dead_letters(self, limit: int = 50) -> List[Dict[str, object]]:
+        """Return the most recent dead-lettered messages."""
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT id, tenant_id, provider, recipient, text, attempts, error, created_at "
+                "FROM dead_letters ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        columns = ["id", "tenant_id", "provider", "recipient", "text", "attempts", "error", "created_at"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _take_dead_letters(self, limit: int) -> List[Tuple[int, str, str, str, str]]:
+        """Remove and return up to ``limit`` dead letters, oldest first."""
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT id, provider, recipient, text, tenant_id FROM dead_letters ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            self._conn.executemany("DELETE FROM dead_letters WHERE id = ?", [(row[0],) for row in rows])
+        return rows
+
+    async def retry_dead_letters(self, limit: int = 100) -> int:
+        """Move up to ``limit`` dead letters back onto the queue, oldest first."""
+        rows = await asyncio.to_thread(self._take_dead_letters, limit)
+        requeued = 0
+        for _, provider, recipient, text, tenant_id in rows:
+            if provider in self.providers and self.enqueue(OutboundMessage(provider, recipient, text, tenant_id=tenant_id)):
+                requeued += 1
+        return requeued
+
+    async def join(self) -> None:
+        """Wait until every queued message is delivered or dead-lettered, including parked retries."""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain the queue for up to ``timeout`` seconds, then dead-letter what is left."""
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for _, handle in self._retry_timers.values():
+            handle.cancel()
+        # Parked retries are still the active message of their recipient.
+        leftovers: Dict[int, OutboundMessage] = {id(message): message for message in self._active.values()}
+        for held in self._held.values():
+            leftovers.update((id(message), message) for message in held)
+        while self._queue is not None and not self._queue.empty():
+            message = self._queue.get_nowait()
+            leftovers[id(message)] = message
+        self._retry_timers.clear()
+        self._active.clear()
+        self._held.clear()
+        self.held = 0
+        self._outstanding = 0
+        if leftovers:
+            await asyncio.to_thread(self._dead_letter, list(leftovers.values()), "delivery interrupted by shutdown")
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        for provider in self.providers.values():
+            await provider.aclose()
+
+    def stats(self) -> Dict[str, object]:
+        """Return queue depth, delivery counters, parked retries, and the dead-letter backlog."""
+        with self._db_lock:
+            dead_letter_backlog = self._connect().execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        data: Dict[str, object] = dict(self._stats)
+        data["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        data["in_flight"] = self.in_flight
+        data["waiting_to_retry"] = len(self._retry_timers)
+        data["held_behind_recipient"] = self.held
+        data["workers"] = len(self._tasks)
+        data["dead_letter_backlog"] = dead_letter_backlog
+        data["last_error"] = self.last_error
+        return data
+
+
+delivery_queue = DeliveryQueue(
+    providers={
+        "twilio": TwilioProvider(
+            settings.TWILIO_API_BASE_URL,
+            account_sid=settings.TWILIO_ACCOUNT_SID,
+            auth_token=settings.TWILIO_AUTH_TOKEN,
+            from_number=settings.TWILIO_WHATSAPP_NUMBER,
+            rate_per_second=settings.TWILIO_RATE_LIMIT_PER_SECOND,
+            burst=settings.TWILIO_RATE_LIMIT_PER_SECOND,
+            max_connections=settings.DELIVERY_MAX_CONNECTIONS,
+        ),
+        "meta": MetaProvider(
+            settings.META_GRAPH_BASE_URL,
+            account_id=settings.INSTAGRAM_ACCOUNT_ID,
+            access_token=settings.META_PAGE_ACCESS_TOKEN,
+            rate_per_second=settings.META_RATE_LIMIT_PER_SECOND,
+            burst=settings.META_RATE_LIMIT_PER_SECOND,
+            max_connections=settings.DELIVERY_MAX_CONNECTIONS,
+        ),
+    },
+    dead_letter_path=Path(settings.DELIVERY_DEAD_LETTER_PATH or Path(__file__).resolve().parent / "dead_letters.sqlite3"),
+    workers=settings.DELIVERY_WORKERS,
+    max_attempts=settings.DELIVERY_MAX_ATTEMPTS,
+    backoff_base=settings.DELIVERY_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.DELIVERY_BACKOFF_MAX_SECONDS,
+    max_queue=settings.DELIVERY_MAX_QUEUE,
+)
+registry.gauge(
+    "chatbot_delivery_queue_depth",
+    "Replies waiting for a delivery worker.",
+    callback=lambda: {(): delivery_queue._queue.qsize() if delivery_queue._queue is not None else 0},
+)
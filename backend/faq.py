@@ -0,0 +1,192 @@
+"""Curated FAQ answers matched before retrieval so common questions skip the LLM."""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cache import response_cache
+from config import settings
+from database import embed_texts
+from tenants import Tenant, tenant_registry
+
+
+def parse_faq_entries(data: object) -> List[Dict[str, object]]:
+    """Validate uploaded FAQ JSON: a list of ``{"answer": str, "questions": [str, ...]}`` objects."""
+    if not isinstance(data, list):
+        raise ValueError("FAQ file must be a JSON list of {\"answer\": ..., \"questions\": [...]} objects.")
+    entries: List[Dict[str, object]] = []
+    for position, item in enumerate(data, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"FAQ entry {position} is not an object.")
+        answer = item.get("answer")
+        questions = item.get("questions")
+        if not isinstance(answer, str) or not answer.strip():
+            raise ValueError(f"FAQ entry {position} needs a non-empty \"answer\".")
+        if not isinstance(questions, list) or not all(isinstance(question, str) for question in questions):
+            raise ValueError(f"FAQ entry {position} needs a \"questions\" list of strings.")
+        variants = [question.strip() for question in questions if question.strip()]
+        if not variants:
+            raise ValueError(f"FAQ entry {position} has no question variants.")
+        entries.append({"answer": answer.strip(), "questions": variants})
+    return entries
+
+
+class FaqIndex:
+    """One tenant's curated FAQ: question variants mapped to fixed answers.
+
+    A message whose normalized text equals a variant is answered without embedding it.
+    Otherwise its embedding is compared with every variant's, and the best answer is
+    returned when the cosine similarity reaches ``threshold``. Variant embeddings are
+    computed once by :meth:`save` (at upload) and stored next to the entries as
+    ``<name>.npy``; every process reloads them when ``<name>.json`` changes.
+    """
+
+    def __init__(self, root: Path, name: str, threshold: float = 0.9, reload_interval: float = 2.0) -> None:
+        """Point the index at its files and load them if present."""
+        self.json_path = root / f"{name}.json"
+        self.vectors_path = root / f"{name}.npy"
+        self.threshold = threshold
+        self.reload_interval = reload_interval
+        self._answers: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._variant_answers: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._load()
+
+    def _load(self) -> None:
+        """Read entries and precomputed embeddings, keeping exact matching if the vectors are missing."""
+        try:
+            mtime = self.json_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        answers: List[str] = []
+        exact: Dict[str, int] = {}
+        variant_answers: List[int] = []
+        matrix: Optional[np.ndarray] = None
+        if mtime is not None:
+            for entry in json.loads(self.json_path.read_text(encoding="utf-8")):
+                answers.append(entry["answer"])
+                for variant in entry["normalized"]:
+                    exact.setdefault(variant, len(answers) - 1)
+                    variant_answers.append(len(answers) - 1)
+            try:
+                matrix = np.load(self.vectors_path)
+            except (OSError, ValueError):
+                matrix = None
+            if matrix is not None and len(matrix) != len(variant_answers):
+                print(f"FAQ vectors in {self.vectors_path} do not match the entries; using exact matches only.")
+                matrix = None
+        with self._lock:
+            self._answers = answers
+            self._exact = exact
+            self._variant_answers = np.asarray(variant_answers, dtype=np.int32)
+            self._matrix = matrix
+            self._mtime = mtime
+
+    def _refresh(self) -> None:
+        """Reload when the entries file changed, checking at most once per interval."""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = self.json_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._load()
+
+    def has_entries(self) -> bool:
+        """Return True when at least one answer is loaded."""
+        self._refresh()
+        return bool(self._answers)
+
+    def lookup(self, message: str) -> Optional[str]:
+        """Return the curated answer for a message, or None when no variant is close enough."""
+        self._refresh()
+        normalized = response_cache.normalize(message)
+        with self._lock:
+            answers, exact, matrix, variant_answers = self._answers, self._exact, self._matrix, self._variant_answers
+        if not normalized or not answers:
+            return None
+        index = exact.get(normalized)
+        if index is not None:
+            self._counters["exact_hits"] += 1
+            return answers[index]
+
+        if matrix is not None and len(matrix):
+            vectors = embed_texts([normalized])
+            vector = np.asarray(vectors[0], dtype=np.float32) if vectors else None
+            if vector is not None and vector.shape[0] == matrix.shape[1]:
+                norm = float(np.linalg.norm(vector))
+                scores = matrix @ (vector / norm) if norm else None
+                if scores is not None:
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        self._counters["semantic_hits"] += 1
+                        return answers[int(variant_answers[best])]
+        self._counters["misses"] += 1
+        return None
+
+    def save(self, entries: List[Dict[str, object]]) -> Dict[str, object]:
+        """Replace the FAQ with validated ``entries``, embedding every variant now."""
+        stored: List[Dict[str, object]] = []
+        variants: List[str] = []
+        for entry in entries:
+            normalized = list(dict.fromkeys(
+                text for text in (response_cache.normalize(question) for question in entry["questions"]) if text
+            ))
+            stored.append({"answer": entry["answer"], "questions": entry["questions"], "normalized": normalized})
+            variants.extend(normalized)
+
+        vectors = embed_texts(variants) if variants else []
+        self.json_path.parent.mkdir(parents=True, exist_ok=True)
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors_tmp = self.vectors_path.with_suffix(".tmp.npy")
+            np.save(vectors_tmp, matrix / norms)
+            os.replace(vectors_tmp, self.vectors_path)
+        else:
+            self.vectors_path.unlink(missing_ok=True)
+        # The entries file is replaced last; its mtime tells other processes to reload both.
+        json_tmp = self.json_path.with_suffix(".tmp")
+        json_tmp.write_text(json.dumps(stored, ensure_ascii=False), encoding="utf-8")
+        os.replace(json_tmp, self.json_path)
+        self._load()
+        return {"entries": len(stored), "variants": len(variants), "embedded": bool(vectors)}
+
+    def stats(self) -> Dict[str, object]:
+        """Return entry and variant counts and hit/miss counters."""
+        self._refresh()
+        data: Dict[str, object] = dict(self._counters)
+        data["entries"] = len(self._answers)
+        data["variants"] = len(self._variant_answers) if self._variant_answers is not None else 0
+        data["semantic"] = self._matrix is not None
+        data["threshold"] = self.threshold
+        return data
+
+
+_faq_root = Path(settings.FAQ_STORE_PATH or Path(__file__).resolve().parent / "faq_store")
+
+
+def get_faq_index(tenant: Optional[Tenant] = None) -> Optional[FaqIndex]:
+    """Return a tenant's FAQ index, loading it on first use, or None when the fast path is disabled."""
+    if not settings.FAQ_ENABLED:
+        return None
+    tenant = tenant or tenant_registry.default
+    return tenant_registry.resource(
+        tenant,
+        "faq",
+        lambda: FaqIndex(_faq_root, tenant.id, threshold=settings.FAQ_MATCH_THRESHOLD),
+    )
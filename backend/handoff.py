@@ -1,22 +1,16 @@
 """Escalation and human handoff detection utilities."""
 
+from analyzer import DEFAULT_PHRASES, ESCALATION_LABEL, message_analyzer
+
 
 class HandoffService:
     """Detect escalation intent and provide a standard handoff response."""
 
-    ESCALATION_PHRASES = [
-        "talk to human",
-        "speak to agent",
-        "real person",
-        "customer service",
-        "help me please",
-        "not helpful",
-    ]
+    ESCALATION_PHRASES = DEFAULT_PHRASES[ESCALATION_LABEL]
 
     def check_handoff(self, message: str) -> bool:
-        """Return True if an escalation phrase appears in the message."""
-        lowered = message.lower()
-        return any(phrase in lowered for phrase in self.ESCALATION_PHRASES)
+        """Return True if a configured escalation phrase appears in the message."""
+        return message_analyzer.analyze(message).escalate
 
     def get_handoff_message(self) -> str:
         """Return the fixed message shown when escalation is triggered."""
@@ -0,0 +1,280 @@
+"""Idempotent processing of webhook and API messages keyed on provider message IDs."""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+
+class IdempotencyInProgress(Exception):
+    """Raised when a duplicate gives up waiting for the first delivery of its key to finish."""
+
+    def __init__(self, key: str) -> None:
+        """Store the key that is still being processed."""
+        super().__init__(f"Timed out waiting for {key} to finish.")
+        self.key = key
+
+
+def message_key(provider: str, message_id: str) -> str:
+    """Return the dedup key for a provider message ID, or "" when the provider sent none."""
+    return f"{provider}:{message_id}" if message_id else ""
+
+
+class IdempotencyStore:
+    """Run each keyed pipeline once and hand its result to every duplicate delivery.
+
+    Finished results are kept in least-recently-stored order with a TTL and an entry cap.
+    A duplicate that arrives while the first run is still in flight awaits that run's
+    result instead of starting a second pipeline.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: float = 86400.0, wait_timeout: float = 30.0) -> None:
+        """Configure capacity, result lifetime, and how long duplicates wait for the first run."""
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self._results: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, int] = {"runs": 0, "duplicates": 0, "waited": 0, "failures": 0}
+
+    def _get_result(self, key: str) -> Optional[str]:
+        """Return a stored, unexpired result."""
+        now = time.monotonic()
+        while self._results:
+            oldest_key, (_, expires_at) = next(iter(self._results.items()))
+            if expires_at > now:
+                break
+            del self._results[oldest_key]
+        item = self._results.get(key)
+        return item[0] if item is not None else None
+
+    def _store_result(self, key: str, result: str) -> None:
+        """Remember a finished result, evicting the oldest entries past capacity."""
+        self._results[key] = (result, time.monotonic() + self.ttl_seconds)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run one store operation; the in-memory store runs it inline on the event loop."""
+        return func(*args)
+
+    def _claim(self, key: str) -> bool:
+        """Reserve a key across processes; the in-memory store only sees this process."""
+        return True
+
+    def _release(self, key: str) -> None:
+        """Drop a reservation after the first run failed so a redelivery can retry."""
+
+    async def _wait_remote(self, key: str) -> Optional[str]:
+        """Wait for another process to finish a claimed key."""
+        return None
+
+    async def run_once(self, key: str, produce: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """Return ``(result, duplicate)``, running ``produce`` only for the first delivery of ``key``.
+
+        Raises :class:`IdempotencyInProgress` when a duplicate waits longer than ``wait_timeout``.
+        """
+        if not key:
+            return await produce(), False
+
+        result = await self._run(self._get_result, key)
+        if result is not None:
+            self._stats["duplicates"] += 1
+            return result, True
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["duplicates"] += 1
+            self._stats["waited"] += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout), True
+            except asyncio.TimeoutError:
+                if future.done():
+                    # The first run itself failed with a timeout; duplicates share its error.
+                    raise
+                raise IdempotencyInProgress(key) from None
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved when no duplicate was waiting for them.
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = future
+        owned = False
+        try:
+            if not await self._run(self._claim, key):
+                result = await self._wait_remote(key)
+                if result is not None:
+                    self._stats["duplicates"] += 1
+                    self._stats["waited"] += 1
+                    future.set_result(result)
+                    return result, True
+            owned = True
+            self._stats["runs"] += 1
+            result = await produce()
+            await self._run(self._store_result, key, result)
+        except BaseException as exc:
+            if not future.done():
+                future.set_exception(exc)
+            if owned:
+                self._stats["failures"] += 1
+                await self._run(self._release, key)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        return result, False
+
+    def stats(self) -> Dict[str, object]:
+        """Return stored keys, in-flight runs, and duplicate counters."""
+        data: Dict[str, object] = dict(self._stats)
+        data["backend"] = self.backend
+        data["stored"] = len(self._results)
+        data["in_flight"] = len(self._inflight)
+        return data
+
+
+class SqliteIdempotencyStore(IdempotencyStore):
+    """Share idempotency keys between worker processes through a SQLite (WAL) database.
+
+    The first process to insert a key owns it; other processes poll for its result. A
+    claim that is not completed within ``claim_timeout`` seconds is treated as abandoned
+    and may be taken over.
+    """
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 100000,
+        ttl_seconds: float = 86400.0,
+        wait_timeout: float = 30.0,
+        claim_timeout: float = 120.0,
+        poll_interval: float = 0.1,
+        sweep_every: int = 256,
+    ) -> None:
+        """Open the database and create the keys table if needed."""
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds, wait_timeout=wait_timeout)
+        self.path = Path(path)
+        self.claim_timeout = claim_timeout
+        self.poll_interval = poll_interval
+        self.sweep_every = max(sweep_every, 1)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the shared database in WAL mode."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            "key TEXT PRIMARY KEY, result TEXT, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idempotency_keys_expires ON idempotency_keys (expires_at)")
+        return conn
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run one blocking database operation on a worker thread, off the event loop."""
+        return await asyncio.to_thread(func, *args)
+
+    def _get_result(self, key: str) -> Optional[str]:
+        """Return a finished, unexpired result stored by any process."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM idempotency_keys WHERE key = ? AND result IS NOT NULL AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _store_result(self, key: str, result: str) -> None:
+        """Record the result for every process and expire old keys periodically."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO idempotency_keys (key, result, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET result = excluded.result, expires_at = excluded.expires_at",
+                (key, result, now + self.ttl_seconds),
+            )
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+                overflow = self._conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM idempotency_keys WHERE key IN "
+                        "(SELECT key FROM idempotency_keys ORDER BY expires_at LIMIT ?)",
+                        (overflow,),
+                    )
+
+    def _claim(self, key: str) -> bool:
+        """Insert a pending row, or take over one whose claim has expired."""
+        now = time.time()
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (key, result, expires_at) VALUES (?, NULL, ?)",
+                (key, now + self.claim_timeout),
+            ).rowcount
+            if inserted:
+                return True
+            return bool(
+                self._conn.execute(
+                    "UPDATE idempotency_keys SET result = NULL, expires_at = ? WHERE key = ? AND expires_at <= ?",
+                    (now + self.claim_timeout, key, now),
+                ).rowcount
+            )
+
+    def _release(self, key: str) -> None:
+        """Delete a pending claim so the key can be processed again."""
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND result IS NULL", (key,))
+
+    async def _wait_remote(self, key: str) -> Optional[str]:
+        """Poll until the owning process stores a result or the wait times out."""
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await self._run(self._get_result, key)
+            if result is not None:
+                return result
+            if await self._run(self._claim, key):
+                return None
+        raise IdempotencyInProgress(key)
+
+    def stats(self) -> Dict[str, object]:
+        """Return stored keys, in-flight runs, and duplicate counters."""
+        data = super().stats()
+        with self._lock:
+            data["stored"] = self._conn.execute(
+                "SELECT COUNT(*) FROM idempotency_keys WHERE result IS NOT NULL"
+            ).fetchone()[0]
+        return data
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    """Build the idempotency backend selected in settings."""
+    if settings.IDEMPOTENCY_BACKEND == "sqlite":
+        path = Path(settings.IDEMPOTENCY_SQLITE_PATH or Path(__file__).resolve().parent / "idempotency.sqlite3")
+        return SqliteIdempotencyStore(
+            path,
+            max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+            ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+            wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS,
+        )
+    return IdempotencyStore(
+        max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+        ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+        wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS,
+    )
+
+
+idempotency_store = create_idempotency_store()
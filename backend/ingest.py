@@ -1,24 +1,94 @@
 """Document ingestion pipeline for chunking, embedding, and storage."""
 
+import hashlib
+import time
 from pathlib import Path
-from typing import List
-from uuid import uuid4
-
-import chromadb
-from chromadb.utils import embedding_functions
-from PyPDF2 import PdfReader
+from typing import Any, Dict, Iterator, List, Optional, Set
 
+from cache import response_cache
 from config import settings
+from database import get_collection
+from tenants import Tenant, tenant_registry
+from vector_index import NumpyVectorIndex
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Return the number of pages in a PDF."""
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    """Extract text from pages ``start`` to ``end`` (exclusive); runs in worker processes."""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(file_path)
+    return [reader.pages[index].extract_text() or "" for index in range(start, min(end, len(reader.pages)))]
+
+
+def iter_text_blocks(file_path: str, block_chars: int = 65536) -> Iterator[str]:
+    """Yield a UTF-8 text file in fixed-size character blocks."""
+    with open(file_path, encoding="utf-8") as handle:
+        while True:
+            block = handle.read(block_chars)
+            if not block:
+                return
+            yield block
+
+
+class StreamingChunker:
+    """Incrementally split a text stream into fixed-size chunks with character overlap.
+
+    Feeding a document piece by piece yields the same chunks as ``chunk_text`` on the
+    whole (stripped) document while holding at most one chunk of text in memory.
+    """
+
+    def __init__(self, chunk_size: int = 500, overlap: int = 50) -> None:
+        """Configure the chunk size and the overlap carried between chunks."""
+        if overlap >= chunk_size:
+            raise ValueError("Chunk overlap must be smaller than chunk size.")
+        self.chunk_size = chunk_size
+        self.step = chunk_size - overlap
+        self._buffer = ""
+        self._started = False
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return every chunk that is now complete."""
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return []
+            self._started = True
+        self._buffer += text
+
+        chunks: List[str] = []
+        while len(self._buffer) >= self.chunk_size:
+            chunk = self._buffer[: self.chunk_size].strip()
+            if chunk:
+                chunks.append(chunk)
+            self._buffer = self._buffer[self.step :]
+        return chunks
+
+    def finish(self) -> List[str]:
+        """Flush the remaining text as final chunks."""
+        remainder = self._buffer.rstrip()
+        self._buffer = ""
+        chunks: List[str] = []
+        start = 0
+        while start < len(remainder):
+            chunk = remainder[start : start + self.chunk_size].strip()
+            if chunk:
+                chunks.append(chunk)
+            start += self.step
+        return chunks
 
 
 class IngestService:
-    """Handle loading knowledge documents and writing chunks into Chroma."""
+    """Handle loading knowledge documents and writing chunks into the vector store.
 
-    def __init__(self) -> None:
-        """Initialize Chroma client and embedding function for ingestion."""
-        store_path = str(Path(__file__).resolve().parent / "chroma_store")
-        self.client = chromadb.PersistentClient(path=store_path)
-        self.ef = embedding_functions.DefaultEmbeddingFunction()
+    The store and embedder are the shared ones owned by ``database``, opened on first use.
+    """
 
     def load_document(self, file_path: str) -> str:
         """Load text from a PDF or TXT document."""
@@ -26,6 +96,8 @@ class IngestService:
         suffix = path.suffix.lower()
 
         if suffix == ".pdf":
+            from PyPDF2 import PdfReader
+
             reader = PdfReader(file_path)
             pages = [page.extract_text() or "" for page in reader.pages]
             return "\n".join(pages).strip()
@@ -40,30 +112,114 @@ class IngestService:
         if not text:
             return []
 
-        chunks: List[str] = []
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            start += chunk_size - overlap
-        return chunks
+        chunker = StreamingChunker(chunk_size=chunk_size, overlap=overlap)
+        return chunker.feed(text) + chunker.finish()
+
+    def get_store(self, tenant: Optional[Tenant] = None) -> Any:
+        """Return a tenant's knowledge collection (the default one when ``tenant`` is None)."""
+        return get_collection(tenant.collection_name if tenant else settings.CHROMA_COLLECTION_NAME)
 
-    def embed_and_store(self, chunks: List[str]) -> int:
-        """Embed chunk list and store it in ChromaDB using native client APIs."""
+    def begin(self, source: str, version: Optional[str] = None, tenant: Optional[Tenant] = None) -> "IncrementalIngest":
+        """Start an incremental ingest of one source document into a tenant's collection."""
+        tenant = tenant or tenant_registry.default
+        return IncrementalIngest(self.get_store(tenant), source, version, tenant.namespace)
+
+    def embed_and_store(self, chunks: List[str], source: str = "uploaded") -> int:
+        """Store chunks under content-hash IDs, embedding only ones not already present."""
         if not chunks:
             return 0
 
-        collection = self.client.get_or_create_collection(
-            name=settings.CHROMA_COLLECTION_NAME,
-            embedding_function=self.ef,
-        )
-
-        ids = [f"chunk_{uuid4().hex}" for _ in chunks]
-        metadatas = [{"source": "uploaded"} for _ in chunks]
-        collection.add(ids=ids, documents=chunks, metadatas=metadatas)
-        return len(chunks)
+        session = self.begin(source)
+        session.add(chunks)
+        summary = session.finish(prune=False)
+        return summary["embedded"] + summary["reused"]
+
+
+class IncrementalIngest:
+    """Sync one source document's chunks into the vector store by content hash.
+
+    Chunks whose ID already exists for the source are reused without embedding, new
+    chunks are upserted, and ``finish(prune=True)`` deletes chunks the new version no
+    longer contains. Re-ingesting an unchanged document therefore embeds nothing.
+
+    With the NumPy index, writes are collected in one batch and published by ``finish``,
+    so a document costs one matrix rewrite rather than one per batch.
+    """
+
+    def __init__(self, collection: Any, source: str, version: Optional[str] = None, cache_namespace: str = "") -> None:
+        """Load the IDs currently stored for ``source``; ``cache_namespace`` names the replies to invalidate."""
+        self.collection = collection
+        self.store = collection.batch() if isinstance(collection, NumpyVectorIndex) else collection
+        self.source = source
+        self.cache_namespace = cache_namespace
+        self.version = version or str(int(time.time()))
+        existing = collection.get(where={"source": source}, include=[])
+        self.existing_ids: Set[str] = set(existing.get("ids") or [])
+        self.seen_ids: Set[str] = set()
+        self.reused_ids: List[str] = []
+        self.embedded = 0
+        self.reused = 0
+        self.duplicates = 0
+        self.deleted = 0
+
+    @staticmethod
+    def chunk_id(source: str, chunk: str) -> str:
+        """Return the content-addressed ID of a chunk within a source document."""
+        digest = hashlib.sha256(f"{source}\0{chunk}".encode("utf-8")).hexdigest()
+        return f"chunk_{digest[:40]}"
+
+    def add(self, chunks: List[str]) -> Dict[str, int]:
+        """Upsert new chunks from a batch and count them and the reused ones.
+
+        Reused chunks are restamped with this version once, by ``finish``. A chunk repeated within the document is stored once; its repeats are counted as
+        ``duplicates``, not as reused.
+        """
+        new_ids: List[str] = []
+        new_chunks: List[str] = []
+        reused_ids: List[str] = []
+        duplicates = 0
+        for chunk in chunks:
+            chunk_id = self.chunk_id(self.source, chunk)
+            if chunk_id in self.seen_ids:
+                duplicates += 1
+                continue
+            self.seen_ids.add(chunk_id)
+            if chunk_id in self.existing_ids:
+                reused_ids.append(chunk_id)
+                continue
+            new_ids.append(chunk_id)
+            new_chunks.append(chunk)
+
+        if new_ids:
+            metadatas = [{"source": self.source, "version": self.version} for _ in new_ids]
+            self.store.upsert(ids=new_ids, documents=new_chunks, metadatas=metadatas)
+            self.embedded += len(new_ids)
+        self.reused_ids.extend(reused_ids)
+        self.reused += len(reused_ids)
+        self.duplicates += duplicates
+        return {"embedded": len(new_ids), "reused": len(reused_ids), "duplicates": duplicates}
+
+    def finish(self, prune: bool = True) -> Dict[str, int]:
+        """Restamp reused chunks, delete ones missing from this version, publish, and invalidate on change."""
+        if self.reused_ids:
+            # Metadata only: the stored embeddings stay as they are.
+            metadatas = [{"source": self.source, "version": self.version} for _ in self.reused_ids]
+            self.store.update(ids=self.reused_ids, metadatas=metadatas)
+        if prune:
+            stale = sorted(self.existing_ids - self.seen_ids)
+            if stale:
+                self.store.delete(ids=stale)
+                self.deleted = len(stale)
+        if self.store is not self.collection:
+            self.store.commit()
+        if self.embedded or self.deleted:
+            response_cache.invalidate(self.cache_namespace)
+        return {
+            "embedded": self.embedded,
+            "reused": self.reused,
+            "duplicates": self.duplicates,
+            "deleted": self.deleted,
+        }
 
 
 ingest_service = IngestService()
@@ -1,28 +1,120 @@
 """Instagram webhook routes for Meta Graph API integration."""
 
 import asyncio
+import json
+import time
+from typing import Dict, List, Tuple
 
-import requests
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
 
-from chat import chat_service
+from chat import FALLBACK_REPLY, chat_service
+from coalesce import message_coalescer
 from config import settings
+from delivery import OutboundMessage, delivery_queue
+from idempotency import IdempotencyInProgress, idempotency_store, message_key
+from metrics import ERRORS, WEBHOOK_SECONDS
+from scheduler import BUSY_REPLY, Overloaded
+from tenants import Tenant, tenant_registry
 
 
 router = APIRouter(prefix="/webhook/instagram", tags=["instagram"])
 
 
-def _send_instagram_message(recipient_id: str, text: str) -> None:
-    """Send a direct reply message through Meta Graph API."""
-    url = f"https://graph.facebook.com/v20.0/{settings.INSTAGRAM_ACCOUNT_ID}/messages"
-    headers = {"Authorization": f"Bearer {settings.META_PAGE_ACCESS_TOKEN}"}
-    payload = {
-        "recipient": {"id": recipient_id},
-        "message": {"text": text},
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=15)
-    if response.status_code >= 400:
-        raise RuntimeError(f"Meta API error {response.status_code}: {response.text}")
+async def _generate_and_deliver(tenant: Tenant, sender_id: str, message_text: str) -> str:
+    """Generate a reply and queue it for delivery; returns "" when merged into an earlier message's reply."""
+    started = time.perf_counter()
+    parts = await message_coalescer.collect("instagram", tenant.scoped(sender_id), message_text)
+    if parts is None:
+        return ""
+    try:
+        reply_text = await chat_service.aget_reply(sender_id, "\n".join(parts), "instagram", parts=parts, tenant=tenant)
+    except Overloaded:
+        reply_text = BUSY_REPLY
+    except Exception as exc:
+        ERRORS.inc(stage="instagram_webhook")
+        print(f"Instagram webhook error: {exc}")
+        reply_text = FALLBACK_REPLY
+    WEBHOOK_SECONDS.observe(time.perf_counter() - started, platform="instagram")
+    delivery_queue.enqueue(OutboundMessage("meta", sender_id, reply_text, tenant_id=tenant.id))
+    return reply_text
+
+
+async def _reply_and_deliver(tenant: Tenant, sender_id: str, message_text: str, mid: str = "") -> None:
+    """Reply once per Meta message ID after the webhook has been acknowledged."""
+    try:
+        await idempotency_store.run_once(
+            message_key("meta", mid),
+            lambda: _generate_and_deliver(tenant, sender_id, message_text),
+        )
+    except IdempotencyInProgress:
+        print(f"Instagram message {mid} is still being processed elsewhere; duplicate skipped.")
+
+
+class InstagramMessageEvent:
+    """A customer text message extracted from a webhook batch."""
+
+    __slots__ = ("sender_id", "mid", "text", "account_id")
+
+    def __init__(self, sender_id: str, mid: str, text: str, account_id: str = "") -> None:
+        """Store the sender, Meta message ID, stripped text, and the receiving Instagram account."""
+        self.sender_id = sender_id
+        self.mid = mid
+        self.text = text
+        self.account_id = account_id
+
+
+def extract_message_events(payload: object) -> List[InstagramMessageEvent]:
+    """Return every customer text message in a webhook payload, in delivery order.
+
+    Meta batches several entries and messaging events into one POST. Echoes of our own
+    replies, read/delivery receipts, reactions, postbacks, and attachment-only messages
+    are skipped without raising.
+    """
+    events: List[InstagramMessageEvent] = []
+    if not isinstance(payload, dict):
+        return events
+    for entry in payload.get("entry") or []:
+        if not isinstance(entry, dict):
+            continue
+        for messaging in entry.get("messaging") or []:
+            if not isinstance(messaging, dict):
+                continue
+            message = messaging.get("message")
+            if not isinstance(message, dict) or message.get("is_echo") or message.get("is_deleted"):
+                continue
+            text = message.get("text")
+            sender_id = (messaging.get("sender") or {}).get("id")
+            if not isinstance(text, str) or not text.strip() or not sender_id:
+                continue
+            if tenant_registry.is_own_instagram_account(str(sender_id)):
+                continue
+            account_id = (messaging.get("recipient") or {}).get("id") or entry.get("id") or ""
+            events.append(
+                InstagramMessageEvent(str(sender_id), str(message.get("mid", "")), text.strip(), str(account_id))
+            )
+    return events
+
+
+async def _process_sender(events: List[InstagramMessageEvent]) -> None:
+    """Reply to one sender's messages to one account strictly in order."""
+    tenant = tenant_registry.by_instagram_account(events[0].account_id)
+    if message_coalescer.enabled("instagram"):
+        # Start them together so they join one burst; the first event leads the reply.
+        await asyncio.gather(*(_reply_and_deliver(tenant, event.sender_id, event.text, event.mid) for event in events))
+        return
+    for event in events:
+        await _reply_and_deliver(tenant, event.sender_id, event.text, event.mid)
+
+
+async def process_events(events: List[InstagramMessageEvent]) -> None:
+    """Handle different senders concurrently while keeping each sender's messages in order.
+
+    The Instagram account that received a message selects the tenant that answers it.
+    """
+    by_sender: Dict[Tuple[str, str], List[InstagramMessageEvent]] = {}
+    for event in events:
+        by_sender.setdefault((event.account_id, event.sender_id), []).append(event)
+    await asyncio.gather(*(_process_sender(sender_events) for sender_events in by_sender.values()))
 
 
 @router.get("")
@@ -43,20 +135,15 @@ async def verify_instagram_webhook(
 
 
 @router.post("")
-async def receive_instagram_message(request: Request) -> dict:
-    """Receive Instagram webhook events, generate an AI reply, and send response."""
+async def receive_instagram_message(request: Request, background_tasks: BackgroundTasks) -> dict:
+    """Acknowledge a webhook batch at once and reply to every message event in the background."""
     try:
         payload = await request.json()
-        messaging = payload["entry"][0]["messaging"][0]
-        sender_id = messaging["sender"]["id"]
-        message_text = messaging["message"]["text"].strip()
-
-        reply_text = await asyncio.to_thread(chat_service.get_reply, sender_id, message_text, "instagram")
-        await asyncio.to_thread(_send_instagram_message, sender_id, reply_text)
-        return {"status": "ok"}
-    except KeyError as exc:
-        raise HTTPException(status_code=400, detail=f"Invalid Instagram payload: missing {exc}") from exc
-    except HTTPException:
-        raise
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Instagram webhook error: {exc}") from exc
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Invalid Instagram payload: body is not JSON.") from exc
+
+    events = extract_message_events(payload)
+    if events:
+        background_tasks.add_task(process_events, events)
+    # Always 200 for well-formed JSON so Meta does not redeliver receipts and echoes.
+    return {"status": "ok", "messages": len(events)}
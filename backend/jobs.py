@@ -0,0 +1,233 @@
+"""Background ingestion jobs with parallel PDF extraction and batched embedding."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+from uuid import uuid4
+
+from config import settings
+from ingest import (
+    IncrementalIngest,
+    StreamingChunker,
+    count_pdf_pages,
+    extract_pdf_pages,
+    ingest_service,
+    iter_text_blocks,
+)
+from tenants import Tenant, tenant_registry
+
+
+class IngestJob:
+    """Progress and outcome of one document ingestion."""
+
+    def __init__(self, filename: str, file_path: str, tenant: Optional[Tenant] = None) -> None:
+        """Create a queued job for an uploaded file saved at ``file_path``."""
+        self.id = uuid4().hex
+        self.tenant = tenant or tenant_registry.default
+        self.filename = filename
+        self.file_path = file_path
+        self.status = "queued"
+        self.pages_total = 0
+        self.pages_done = 0
+        self.chunks_stored = 0
+        self.chunks_embedded = 0
+        self.chunks_reused = 0
+        self.chunks_duplicate = 0
+        self.chunks_deleted = 0
+        self.batches_stored = 0
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, object]:
+        """Return a JSON-serializable progress report."""
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "tenant": self.tenant.id,
+            "status": self.status,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "chunks_stored": self.chunks_stored,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_reused": self.chunks_reused,
+            "chunks_duplicate": self.chunks_duplicate,
+            "chunks_deleted": self.chunks_deleted,
+            "batches_stored": self.batches_stored,
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_s": round(self.pages_done / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_s": round(self.chunks_stored / elapsed, 2) if elapsed else 0.0,
+            "errors": list(self.errors),
+        }
+
+
+class IngestJobManager:
+    """Run ingestion jobs in the background so uploads never block the event loop.
+
+    PDF pages are extracted in a process pool, streamed into a :class:`StreamingChunker`,
+    and written to the vector store in bounded embedding batches.
+    """
+
+    def __init__(
+        self,
+        process_workers: int = 2,
+        pages_per_task: int = 8,
+        embed_batch_size: int = 64,
+        max_concurrent_jobs: int = 2,
+        max_jobs_kept: int = 200,
+    ) -> None:
+        """Configure worker pools, batch sizes, and how many finished jobs to remember."""
+        self.process_workers = max(process_workers, 1)
+        self.pages_per_task = max(pages_per_task, 1)
+        self.embed_batch_size = max(embed_batch_size, 1)
+        self.max_jobs_kept = max(max_jobs_kept, 1)
+        self._job_slots = asyncio.Semaphore(max(max_concurrent_jobs, 1))
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest")
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Create the PDF extraction process pool on first use."""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._process_pool
+
+    def submit(self, filename: str, file_path: str, tenant: Optional[Tenant] = None) -> IngestJob:
+        """Register a job for a saved upload and start it in the background."""
+        job = IngestJob(filename, file_path, tenant)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs_kept:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done.is_set():
+                break
+            self._jobs.pop(oldest_id)
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        """Return a job by ID, if it is still tracked."""
+        return self._jobs.get(job_id)
+
+    async def _iter_pdf_pages(self, job: IngestJob) -> AsyncIterator[str]:
+        """Yield PDF page texts in order while later page ranges extract in parallel."""
+        loop = asyncio.get_running_loop()
+        pool = self._get_process_pool()
+        job.pages_total = await loop.run_in_executor(pool, count_pdf_pages, job.file_path)
+
+        ranges = [
+            (start, min(start + self.pages_per_task, job.pages_total))
+            for start in range(0, job.pages_total, self.pages_per_task)
+        ]
+        window = self.process_workers * 2
+        pending: List[asyncio.Future] = []
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < window:
+                start, end = ranges[next_range]
+                pending.append(loop.run_in_executor(pool, extract_pdf_pages, job.file_path, start, end))
+                next_range += 1
+            pages = await pending.pop(0)
+            for page_text in pages:
+                job.pages_done += 1
+                yield page_text
+
+    async def _iter_text_blocks(self, job: IngestJob) -> AsyncIterator[str]:
+        """Yield a TXT upload in blocks read off the event loop."""
+        loop = asyncio.get_running_loop()
+        blocks = iter_text_blocks(job.file_path)
+        job.pages_total = 1
+        while True:
+            block = await loop.run_in_executor(self._io_executor, next, blocks, None)
+            if block is None:
+                job.pages_done = 1
+                return
+            yield block
+
+    async def _store(self, job: IngestJob, session: IncrementalIngest, batch: List[str]) -> None:
+        """Embed and store the new chunks of one bounded batch."""
+        loop = asyncio.get_running_loop()
+        counts = await loop.run_in_executor(self._io_executor, session.add, batch)
+        job.chunks_embedded += counts["embedded"]
+        job.chunks_reused += counts["reused"]
+        job.chunks_duplicate += counts["duplicates"]
+        job.chunks_stored = job.chunks_embedded + job.chunks_reused
+        job.batches_stored += 1
+
+    async def _run(self, job: IngestJob) -> None:
+        """Stream pages into the chunker and write embeddings in bounded batches."""
+        async with self._job_slots:
+            job.status = "running"
+            job.started_at = time.time()
+            loop = asyncio.get_running_loop()
+            session: Optional[IncrementalIngest] = None
+            try:
+                suffix = Path(job.filename).suffix.lower()
+                if suffix == ".pdf":
+                    pieces = self._iter_pdf_pages(job)
+                elif suffix == ".txt":
+                    pieces = self._iter_text_blocks(job)
+                else:
+                    raise ValueError("Unsupported file type. Only PDF and TXT files are allowed.")
+
+                session = await loop.run_in_executor(
+                    self._io_executor, ingest_service.begin, job.filename, None, job.tenant
+                )
+                chunker = StreamingChunker()
+                batch: List[str] = []
+                first_piece = True
+                async for piece in pieces:
+                    # Pages are joined with newlines, matching IngestService.load_document.
+                    text = piece if first_piece or suffix != ".pdf" else "\n" + piece
+                    first_piece = False
+                    batch.extend(chunker.feed(text))
+                    while len(batch) >= self.embed_batch_size:
+                        await self._store(job, session, batch[: self.embed_batch_size])
+                        batch = batch[self.embed_batch_size :]
+                batch.extend(chunker.finish())
+                for start in range(0, len(batch), self.embed_batch_size):
+                    await self._store(job, session, batch[start : start + self.embed_batch_size])
+                summary = await loop.run_in_executor(self._io_executor, session.finish)
+                job.chunks_deleted = summary["deleted"]
+                job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                raise
+            except Exception as exc:
+                job.errors.append(str(exc))
+                job.status = "failed"
+                if session is not None:
+                    # Keep the previous version's chunks but drop replies cached before the partial write.
+                    await loop.run_in_executor(self._io_executor, session.finish, False)
+            finally:
+                job.finished_at = time.time()
+                Path(job.file_path).unlink(missing_ok=True)
+                job.done.set()
+
+    async def shutdown(self) -> None:
+        """Cancel running jobs and stop worker pools."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        self._io_executor.shutdown(wait=False)
+
+
+ingest_jobs = IngestJobManager(
+    process_workers=settings.INGEST_PROCESS_WORKERS,
+    pages_per_task=settings.INGEST_PAGES_PER_TASK,
+    embed_batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+    max_concurrent_jobs=settings.INGEST_MAX_CONCURRENT_JOBS,
+)
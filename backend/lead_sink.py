@@ -0,0 +1,237 @@
+"""Background lead sink that spools rows to SQLite and flushes them to Sheets in batches."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import timed
+
+
+RowWriter = Callable[[str, List[List[str]]], None]
+
+
+def _default_writer(sheet_id: str, rows: List[List[str]]) -> None:
+    """Write rows through the Google Sheets helper, imported lazily to keep startup light."""
+    from sheets import append_rows
+
+    append_rows(sheet_id, rows)
+
+
+class LeadSink:
+    """Queue lead rows durably and flush them in bulk on a size or time trigger.
+
+    Every enqueued row is committed to a local SQLite spool before ``enqueue`` returns, so
+    restarts and Sheets outages never lose leads. A daemon thread flushes pending rows
+    with one ``append_rows`` call per sheet and deletes them only after the write succeeds.
+
+    Several worker processes may share one spool: each flush first claims its rows inside
+    a ``BEGIN IMMEDIATE`` transaction, so no two flushers write the same row. Claims left
+    by a process that died mid-write expire after ``claim_timeout`` seconds. A sheet whose
+    writes fail is backed off on its own, so other sheets keep flowing. Leads without a
+    sheet ID are not spooled, since they could never be written.
+    """
+
+    def __init__(
+        self,
+        spool_path: Path,
+        writer: Optional[RowWriter] = None,
+        batch_size: int = 50,
+        flush_interval: float = 5.0,
+        max_backoff: float = 300.0,
+        claim_timeout: float = 300.0,
+    ) -> None:
+        """Open the spool database and configure flush triggers."""
+        self.spool_path = Path(spool_path)
+        self.writer = writer or _default_writer
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval, 0.0)
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # sheet_id -> (consecutive failures, monotonic time of the next attempt)
+        self._sheet_backoff: Dict[str, Tuple[int, float]] = {}
+        self._stats: Dict[str, float] = {
+            "enqueued": 0,
+            "skipped_no_sheet": 0,
+            "flushed_rows": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+        }
+        self.last_error = ""
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the spool database in WAL mode and create the pending table."""
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.spool_path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_leads ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, sheet_id TEXT NOT NULL, "
+            "row_json TEXT NOT NULL, created_at REAL NOT NULL, claimed_by TEXT, claimed_at REAL)"
+        )
+        return conn
+
+    def start(self) -> None:
+        """Start the background flush thread if it is not already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="lead-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flush thread after a final flush attempt."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, sheet_id: str, values: List[str]) -> None:
+        """Durably spool one lead row and wake the flusher when a batch is ready."""
+        if not sheet_id:
+            self._stats["skipped_no_sheet"] += 1
+            return
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT INTO pending_leads (sheet_id, row_json, created_at) VALUES (?, ?, ?)",
+                (sheet_id, json.dumps(values), time.time()),
+            )
+            self._stats["enqueued"] += 1
+        self.start()
+        if self.queue_depth() >= self.batch_size:
+            self._wakeup.set()
+
+    def queue_depth(self) -> int:
+        """Return the number of rows waiting to be written."""
+        with self._db_lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM pending_leads").fetchone()[0])
+
+    def _oldest_age(self) -> float:
+        """Return how many seconds the oldest pending row has waited."""
+        with self._db_lock:
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM pending_leads").fetchone()[0]
+        return time.time() - oldest if oldest is not None else 0.0
+
+    def _claim(self) -> List[tuple]:
+        """Claim up to ``batch_size`` unclaimed rows of sheets not backing off and return them."""
+        now = time.time()
+        monotonic_now = time.monotonic()
+        parked = [sheet_id for sheet_id, (_, retry_at) in self._sheet_backoff.items() if retry_at > monotonic_now]
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._conn.execute(
+                    "SELECT id, sheet_id, row_json FROM pending_leads "
+                    "WHERE (claimed_at IS NULL OR claimed_at < ?) "
+                    f"AND sheet_id NOT IN ({','.join('?' * len(parked))}) ORDER BY id LIMIT ?",
+                    (now - self.claim_timeout, *parked, self.batch_size),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE pending_leads SET claimed_by = ?, claimed_at = ? WHERE id = ?",
+                    [(self._owner, now, row_id) for row_id, _, _ in pending],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return pending
+
+    def _sheet_failed(self, sheet_id: str) -> None:
+        """Back off a failing sheet exponentially without holding up the others."""
+        failures = self._sheet_backoff.get(sheet_id, (0, 0.0))[0] + 1
+        delay = min(self.flush_interval * (2 ** failures), self.max_backoff)
+        self._sheet_backoff[sheet_id] = (failures, time.monotonic() + delay)
+
+    def flush(self) -> int:
+        """Write one batch of claimed rows per sheet and return how many rows were written."""
+        pending = self._claim()
+        if not pending:
+            return 0
+
+        grouped: Dict[str, List[tuple]] = {}
+        for row_id, sheet_id, row_json in pending:
+            grouped.setdefault(sheet_id, []).append((row_id, json.loads(row_json)))
+
+        written = 0
+        for sheet_id, items in grouped.items():
+            ids = [(row_id, self._owner) for row_id, _ in items]
+            started = time.perf_counter()
+            try:
+                with timed("sheets_write"):
+                    self.writer(sheet_id, [values for _, values in items])
+            except Exception as exc:
+                self._stats["flush_failures"] += 1
+                self._sheet_failed(sheet_id)
+                self.last_error = str(exc)
+                print(f"Lead sink flush failed for sheet {sheet_id}: {exc}")
+                with self._db_lock:
+                    self._conn.executemany(
+                        "UPDATE pending_leads SET claimed_by = NULL, claimed_at = NULL "
+                        "WHERE id = ? AND claimed_by = ?",
+                        ids,
+                    )
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with self._db_lock:
+                self._conn.executemany("DELETE FROM pending_leads WHERE id = ? AND claimed_by = ?", ids)
+            self._sheet_backoff.pop(sheet_id, None)
+            self._stats["flushes"] += 1
+            self._stats["flushed_rows"] += len(items)
+            self._stats["last_flush_ms"] = round(elapsed_ms, 2)
+            self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed_ms), 2)
+            written += len(items)
+        return written
+
+    def _run(self) -> None:
+        """Flush whenever a batch fills up or the oldest row exceeds the flush interval."""
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                while self.queue_depth() >= self.batch_size or (
+                    self.queue_depth() and self._oldest_age() >= self.flush_interval
+                ):
+                    if not self.flush():
+                        break
+            except Exception as exc:
+                self.last_error = str(exc)
+                print(f"Lead sink error: {exc}")
+        try:
+            self.flush()
+        except Exception as exc:
+            self.last_error = str(exc)
+
+    def stats(self) -> Dict[str, object]:
+        """Return queue depth, flush counters, and flush latency."""
+        data: Dict[str, object] = dict(self._stats)
+        data["queue_depth"] = self.queue_depth()
+        data["oldest_pending_s"] = round(self._oldest_age(), 2)
+        data["backing_off_sheets"] = {
+            sheet_id: failures for sheet_id, (failures, _) in self._sheet_backoff.items()
+        }
+        data["last_error"] = self.last_error
+        data["running"] = bool(self._thread is not None and self._thread.is_alive())
+        return data
+
+
+lead_sink = LeadSink(
+    spool_path=Path(settings.LEAD_SPOOL_PATH or Path(__file__).resolve().parent / "lead_spool.sqlite3"),
+    batch_size=settings.LEAD_SINK_BATCH_SIZE,
+    flush_interval=settings.LEAD_SINK_FLUSH_INTERVAL_SECONDS,
+)
@@ -1,21 +1,44 @@
 """FastAPI application entrypoint and route registration."""
 
 import asyncio
+import json
 import os
 import tempfile
+import time
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Header, HTTPException, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
+from cache import response_cache
 from chat import chat_service
-from ingest import ingest_service
+from coalesce import message_coalescer
+from config import settings
+from database import embedding_cache
+from delivery import delivery_queue
+from faq import get_faq_index, parse_faq_entries
+from idempotency import IdempotencyInProgress, idempotency_store, message_key
 from instagram import router as instagram_router
+from jobs import ingest_jobs
+from lead_sink import lead_sink
+from memory import memory_manager
+from metrics import HTTP_SECONDS, IN_FLIGHT, profiler, registry, server_timing_header, start_request_timing
+from resilience import llm_guard
+from routing import model_router
+from scheduler import Admission, Overloaded, chat_scheduler
+from tenants import Tenant, tenant_registry
+from warmup import startup_profile, warm_up
 from whatsapp import router as whatsapp_router
 
 
+startup_profile.mark("imported")
+
+
 class ChatMessageRequest(BaseModel):
     """Incoming chat payload for web widget/API clients."""
 
@@ -43,10 +66,54 @@ app.include_router(whatsapp_router)
 app.include_router(instagram_router)
 
 
+@app.middleware("http")
+async def record_request_metrics(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Track in-flight requests and per-route latency for ``/metrics``."""
+    IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            route=getattr(route, "path", "unmatched"),
+            method=request.method,
+            status=str(status),
+        )
+
+
 @app.on_event("startup")
 async def startup_event() -> None:
-    """Load environment variables when the application starts."""
+    """Load environment variables, start background workers, and optionally warm up heavy resources."""
+    started = time.perf_counter()
     load_dotenv()
+    lead_sink.start()
+    delivery_queue.start()
+    if settings.PROFILER_ENABLED:
+        profiler.start()
+    if settings.WARMUP_MODE == "blocking":
+        await asyncio.to_thread(warm_up)
+    elif settings.WARMUP_MODE == "background":
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    startup_profile.record("startup", time.perf_counter() - started)
+    startup_profile.mark("ready")
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """Release pooled connections, drain outbound replies, and flush pending leads when the application stops."""
+    profiler.stop()
+    await chat_service.aclose()
+    await ingest_jobs.shutdown()
+    await delivery_queue.stop()
+    await asyncio.to_thread(lead_sink.stop)
 
 
 @app.get("/health")
@@ -58,34 +125,270 @@ async def health_check() -> dict:
         raise HTTPException(status_code=500, detail=f"Health check failed: {exc}") from exc
 
 
+@app.post("/warmup")
+async def warmup() -> dict:
+    """Load the embedder, vector store, and LLM client now so the next request does not pay for it."""
+    timings = await asyncio.to_thread(warm_up)
+    return {"warmup_s": {name: round(seconds, 4) for name, seconds in timings.items()}}
+
+
+@app.get("/debug/startup")
+async def debug_startup() -> dict:
+    """Return import, startup, and warm-up timings measured from process start."""
+    return startup_profile.report()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Return stage latency histograms, event counters, and gauges in Prometheus text format."""
+    body = await asyncio.to_thread(registry.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _require_profiler() -> None:
+    """Hide the profiler endpoints unless profiling is enabled in settings."""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(limit: int = 25) -> PlainTextResponse:
+    """Return the hottest sampled frames and collapsed stacks of the event-loop thread."""
+    _require_profiler()
+    return PlainTextResponse(profiler.report(limit))
+
+
+@app.post("/debug/profile/start")
+async def debug_profile_start(reset: bool = True) -> dict:
+    """Start sampling the event-loop thread, discarding earlier samples unless ``reset=false``."""
+    _require_profiler()
+    if reset:
+        profiler.reset()
+    profiler.start()
+    return {"running": profiler.running}
+
+
+@app.post("/debug/profile/stop")
+async def debug_profile_stop() -> dict:
+    """Stop sampling and keep the collected samples for ``/debug/profile``."""
+    _require_profiler()
+    profiler.stop()
+    return {"running": profiler.running, "samples": profiler.samples}
+
+
+@app.get("/chat/cache/stats")
+async def chat_cache_stats() -> dict:
+    """Return response cache hit/miss counters."""
+    return response_cache.stats()
+
+
+@app.get("/chat/retrieval/stats")
+async def chat_retrieval_stats() -> dict:
+    """Return retrieval batching and query-embedding cache counters."""
+    return {
+        "batching": chat_service.retrieval_stats(),
+        "embedding_cache": embedding_cache.stats(),
+    }
+
+
+@app.get("/chat/routing/stats")
+async def chat_routing_stats() -> dict:
+    """Return each model tier's model, token limit, and routing and escalation counts."""
+    return model_router.stats()
+
+
+@app.get("/chat/faq/stats")
+async def chat_faq_stats(api_key: str = Header("", alias="X-API-Key")) -> dict:
+    """Return the caller's FAQ size and exact, semantic, and missed match counts."""
+    faq_index = await asyncio.to_thread(get_faq_index, _resolve_tenant(api_key))
+    if faq_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **await asyncio.to_thread(faq_index.stats)}
+
+
+@app.get("/chat/llm/stats")
+async def chat_llm_stats() -> dict:
+    """Return LLM retry, hedge, and deadline counters and each model's circuit state and p95 latency."""
+    return llm_guard.stats()
+
+
+@app.get("/leads/sink/stats")
+async def lead_sink_stats() -> dict:
+    """Return lead queue depth and flush latency."""
+    return await asyncio.to_thread(lead_sink.stats)
+
+
+@app.get("/delivery/stats")
+async def delivery_stats() -> dict:
+    """Return outbound queue depth, delivery counters, and dead-letter backlog."""
+    return await asyncio.to_thread(delivery_queue.stats)
+
+
+@app.get("/delivery/dead-letters")
+async def delivery_dead_letters(limit: int = 50) -> dict:
+    """Return the most recent undeliverable replies."""
+    return {"dead_letters": await asyncio.to_thread(delivery_queue.dead_letters, limit)}
+
+
+@app.post("/delivery/dead-letters/retry")
+async def delivery_retry_dead_letters(limit: int = 100) -> dict:
+    """Requeue dead-lettered replies for another delivery attempt."""
+    return {"requeued": await delivery_queue.retry_dead_letters(limit)}
+
+
+@app.get("/chat/scheduler/stats")
+async def chat_scheduler_stats() -> dict:
+    """Return in-flight LLM calls, queue depth, and shed counters."""
+    return chat_scheduler.stats()
+
+
+@app.get("/chat/idempotency/stats")
+async def chat_idempotency_stats() -> dict:
+    """Return stored message IDs and duplicate counters."""
+    return await asyncio.to_thread(idempotency_store.stats)
+
+
+@app.get("/chat/coalesce/stats")
+async def chat_coalesce_stats() -> dict:
+    """Return burst counts and messages merged per reply."""
+    return message_coalescer.stats()
+
+
+@app.get("/chat/memory/stats")
+async def chat_memory_stats() -> dict:
+    """Return conversation memory usage and eviction counters."""
+    return await asyncio.to_thread(memory_manager.stats)
+
+
+@app.get("/tenants/stats")
+async def tenant_stats() -> dict:
+    """Return configured tenants, the ones holding resources, and idle evictions."""
+    return tenant_registry.stats()
+
+
+def _resolve_tenant(api_key: str) -> Tenant:
+    """Return the tenant owning an ``X-API-Key`` (the default tenant when none is sent)."""
+    tenant = tenant_registry.by_api_key(api_key)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Unknown API key.")
+    return tenant
+
+
 @app.post("/chat/message", response_model=ChatMessageResponse)
-async def chat_message(payload: ChatMessageRequest) -> ChatMessageResponse:
-    """Handle website/widget chat requests."""
+async def chat_message(
+    payload: ChatMessageRequest,
+    response: Response,
+    idempotency_key: str = Header("", alias="Idempotency-Key"),
+    api_key: str = Header("", alias="X-API-Key"),
+) -> ChatMessageResponse:
+    """Handle website/widget chat requests; retries with the same Idempotency-Key get the first reply."""
+    tenant = _resolve_tenant(api_key)
+    timings = start_request_timing() if settings.SERVER_TIMING_ENABLED else None
+    started = time.perf_counter()
     try:
-        reply = await asyncio.to_thread(chat_service.get_reply, payload.user_id, payload.message, "web")
+        reply, _ = await idempotency_store.run_once(
+            message_key(f"web:{tenant.scoped(payload.user_id)}", idempotency_key),
+            lambda: chat_service.aget_reply(payload.user_id, payload.message, "web", tenant=tenant),
+        )
+        if timings is not None:
+            response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - started)
         return ChatMessageResponse(reply=reply)
+    except Overloaded as exc:
+        raise _overloaded_error(exc) from exc
+    except IdempotencyInProgress as exc:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.") from exc
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Chat request failed: {exc}") from exc
 
 
+def _format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Events frame with a JSON data payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _overloaded_error(exc: Overloaded) -> HTTPException:
+    """Build the 429 response used when the scheduler sheds a chat request."""
+    return HTTPException(
+        status_code=429,
+        detail=f"Too many requests: {exc.reason}.",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def _stream_chat_events(
+    payload: ChatMessageRequest, admission: Admission, tenant: Tenant
+) -> AsyncIterator[str]:
+    """Yield SSE frames for each reply token followed by a final done event."""
+    parts = []
+    try:
+        async for token in chat_service.astream_reply(payload.user_id, payload.message, "web", admission, tenant):
+            parts.append(token)
+            yield _format_sse("token", {"token": token})
+    except Exception as exc:
+        yield _format_sse("error", {"detail": f"Chat request failed: {exc}"})
+        return
+    yield _format_sse("done", {"reply": "".join(parts)})
+
+
+@app.post("/chat/stream")
+async def chat_stream(payload: ChatMessageRequest, api_key: str = Header("", alias="X-API-Key")) -> StreamingResponse:
+    """Stream website/widget chat replies token by token as Server-Sent Events."""
+    tenant = _resolve_tenant(api_key)
+    try:
+        admission = chat_scheduler.admit(tenant.scoped(payload.user_id))
+    except Overloaded as exc:
+        raise _overloaded_error(exc) from exc
+    return StreamingResponse(
+        _stream_chat_events(payload, admission, tenant),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(admission.release),
+    )
+
+
+async def _save_upload(file: UploadFile, suffix: str) -> str:
+    """Copy an upload to a temporary file in blocks without blocking the event loop."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        temp_path = tmp.name
+        while True:
+            block = await file.read(1024 * 1024)
+            if not block:
+                break
+            await asyncio.to_thread(tmp.write, block)
+    return temp_path
+
+
 @app.post("/ingest")
-async def ingest_document(file: UploadFile = File(...)) -> dict:
-    """Ingest a PDF or TXT document into the vector store."""
+async def ingest_document(
+    file: UploadFile = File(...),
+    wait: bool = False,
+    api_key: str = Header("", alias="X-API-Key"),
+) -> JSONResponse:
+    """Queue a PDF or TXT document for background ingestion and return its job ID.
+
+    The ``X-API-Key`` header selects the tenant whose knowledge base receives the document.
+    Pass ``wait=true`` to block until the job finishes and receive its final report, with
+    status 500 if it failed or 503 if it was cancelled by a shutdown.
+    """
+    tenant = _resolve_tenant(api_key)
     temp_path = None
     try:
         suffix = Path(file.filename or "").suffix.lower()
         if suffix not in {".pdf", ".txt"}:
             raise HTTPException(status_code=400, detail="Only PDF and TXT files are supported.")
 
-        data = await file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(data)
-            temp_path = tmp.name
-
-        text = ingest_service.load_document(temp_path)
-        chunks = ingest_service.chunk_text(text)
-        stored = ingest_service.embed_and_store(chunks)
-        return {"status": "ok", "chunks_stored": stored}
+        temp_path = await _save_upload(file, suffix)
+        job = ingest_jobs.submit(file.filename or f"upload{suffix}", temp_path, tenant)
+        temp_path = None
+        if wait:
+            await job.done.wait()
+            # A caller that waited for the report gets an error status when the job did not complete.
+            status_code = {"completed": 200, "cancelled": 503}.get(job.status, 500)
+            return JSONResponse(job.to_dict(), status_code=status_code)
+        return JSONResponse(
+            {"status": "accepted", "job_id": job.id, "status_url": f"/ingest/{job.id}"},
+            status_code=202,
+        )
     except HTTPException:
         raise
     except Exception as exc:
@@ -95,6 +398,37 @@ async def ingest_document(file: UploadFile = File(...)) -> dict:
             Path(temp_path).unlink()
 
 
+@app.post("/ingest/faq")
+async def ingest_faq(file: UploadFile = File(...), api_key: str = Header("", alias="X-API-Key")) -> dict:
+    """Replace the caller's curated FAQ with a JSON file and precompute its question embeddings.
+
+    The file is a list of ``{"answer": "...", "questions": ["...", ...]}`` objects; an
+    empty list removes the FAQ. Matching messages are then answered without the LLM.
+    """
+    tenant = _resolve_tenant(api_key)
+    faq_index = await asyncio.to_thread(get_faq_index, tenant)
+    if faq_index is None:
+        raise HTTPException(status_code=400, detail="The FAQ fast path is disabled (FAQ_ENABLED=false).")
+    try:
+        entries = parse_faq_entries(json.loads(await file.read()))
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid FAQ file: {exc}") from exc
+    try:
+        return await asyncio.to_thread(faq_index.save, entries)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"FAQ ingest failed: {exc}") from exc
+
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str, api_key: str = Header("", alias="X-API-Key")) -> dict:
+    """Report progress, throughput, and errors for one of the caller's ingestion jobs."""
+    tenant = _resolve_tenant(api_key)
+    job = ingest_jobs.get(job_id)
+    if job is None or job.tenant is not tenant:
+        raise HTTPException(status_code=404, detail="Ingest job not found.")
+    return job.to_dict()
+
+
 def get_port() -> int:
     """Return server port from environment variable PORT or default to 8000."""
     return int(os.getenv("PORT", "8000"))
@@ -1,37 +1,360 @@
-"""Simple per-user memory storage without LangChain dependencies."""
+"""Per-user conversation memory with bounded in-process and shared SQLite backends."""
 
-from typing import Dict, List
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import registry
+
+
+_SUMMARY_LABELS = {"user": "Customer", "assistant": "Assistant"}
+
+
+def fold_into_summary(summary: str, role: str, content: str, max_chars: int = 1200) -> str:
+    """Append a condensed line for a message leaving the recent window, trimming the oldest lines."""
+    text = " ".join(content.split())
+    limit = 160 if role == "user" else 100
+    if len(text) > limit:
+        text = text[:limit].rsplit(" ", 1)[0] + "..."
+    if not text:
+        return summary
+    lines = summary.splitlines() if summary else []
+    lines.append(f"{_SUMMARY_LABELS.get(role, role.title())}: {text}")
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class _Conversation:
+    """Compact per-user ring buffer of (role, content) tuples, a rolling summary, and last-activity time."""
+
+    __slots__ = ("messages", "summary", "last_seen")
+
+    def __init__(self, max_messages: int) -> None:
+        """Create an empty ring buffer holding at most ``max_messages`` entries."""
+        self.messages: Deque[Tuple[str, str]] = deque(maxlen=max_messages)
+        self.summary = ""
+        self.last_seen = time.monotonic()
 
 
 class MemoryManager:
-    """Store per-user message history in-memory with a 4-message cap."""
+    """Store per-user message history in-memory with LRU eviction and TTL expiry.
 
-    def __init__(self) -> None:
-        """Initialize the user history dictionary."""
-        self._memories: Dict[str, List[Dict[str, str]]] = {}
+    Conversations are kept in least-recently-used order, so evicting idle users and
+    expiring stale ones only ever touches the front of the ordered dict. Messages that
+    fall out of the recent window are folded into a per-user rolling summary.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 8,
+        max_users: int = 10000,
+        ttl_seconds: float = 86400.0,
+        summary_max_chars: int = 1200,
+    ) -> None:
+        """Initialize an empty store with per-user, global, and idle-time limits."""
+        self.max_messages = max(max_messages, 1)
+        self.summary_max_chars = summary_max_chars
+        self.max_users = max(max_users, 1)
+        self.ttl_seconds = ttl_seconds
+        self._memories: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire_idle(self, now: float) -> None:
+        """Drop conversations idle for longer than the TTL. Caller holds the lock."""
+        if self.ttl_seconds <= 0:
+            return
+        while self._memories:
+            user_id, conversation = next(iter(self._memories.items()))
+            if now - conversation.last_seen <= self.ttl_seconds:
+                break
+            del self._memories[user_id]
+            self.expirations += 1
 
     def get_history(self, user_id: str) -> List[Dict[str, str]]:
-        """Return message history for a user, creating empty history if needed."""
-        if user_id not in self._memories:
-            self._memories[user_id] = []
-        self._trim_history(user_id)
-        return self._memories[user_id]
+        """Return message history for a user, oldest first."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            conversation = self._memories.get(user_id)
+            if conversation is None:
+                return []
+            return [{"role": role, "content": content} for role, content in conversation.messages]
+
+    def get_summary(self, user_id: str) -> str:
+        """Return the rolling summary of messages older than the recent window."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            conversation = self._memories.get(user_id)
+            return conversation.summary if conversation is not None else ""
 
     def add_message(self, user_id: str, role: str, content: str) -> None:
-        """Append one message and enforce the 4-message limit."""
-        history = self.get_history(user_id)
-        history.append({"role": role, "content": content})
-        self._trim_history(user_id)
+        """Append one message, folding the oldest into the summary once the per-user limit is reached."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            conversation = self._memories.get(user_id)
+            if conversation is None:
+                conversation = _Conversation(self.max_messages)
+                self._memories[user_id] = conversation
+                while len(self._memories) > self.max_users:
+                    self._memories.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._memories.move_to_end(user_id)
+            if len(conversation.messages) == self.max_messages:
+                old_role, old_content = conversation.messages[0]
+                conversation.summary = fold_into_summary(
+                    conversation.summary, old_role, old_content, self.summary_max_chars
+                )
+            conversation.messages.append((sys.intern(role), content))
+            conversation.last_seen = now
 
     def clear_memory(self, user_id: str) -> None:
         """Delete a user's stored history if it exists."""
-        self._memories.pop(user_id, None)
+        with self._lock:
+            self._memories.pop(user_id, None)
+
+    def user_count(self) -> int:
+        """Return the number of users with stored conversations."""
+        return len(self._memories)
+
+    def stats(self) -> Dict[str, float]:
+        """Return user/message counts, an approximate byte footprint, and eviction counters."""
+        with self._lock:
+            users = len(self._memories)
+            messages = 0
+            content_bytes = 0
+            for conversation in self._memories.values():
+                messages += len(conversation.messages)
+                content_bytes += sum(sys.getsizeof(content) for _, content in conversation.messages)
+                content_bytes += sys.getsizeof(conversation.summary)
+            overhead = users * (sys.getsizeof(_Conversation(1)) + sys.getsizeof(deque(maxlen=self.max_messages)))
+        return {
+            "backend": "memory",
+            "users": users,
+            "messages": messages,
+            "approx_bytes": content_bytes + overhead + messages * sys.getsizeof(("", "")),
+            "max_users": self.max_users,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SqliteMemoryManager:
+    """Store per-user message history in a shared SQLite (WAL) database.
+
+    Several worker processes can point at the same file and see one conversation
+    history. Per-user, global-capacity, and TTL limits match :class:`MemoryManager`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_messages: int = 8,
+        max_users: int = 10000,
+        ttl_seconds: float = 86400.0,
+        summary_max_chars: int = 1200,
+        sweep_every: int = 256,
+    ) -> None:
+        """Open the database and create the tables if needed."""
+        self.path = Path(path)
+        self.max_messages = max(max_messages, 1)
+        self.summary_max_chars = summary_max_chars
+        self.max_users = max(max_users, 1)
+        self.ttl_seconds = ttl_seconds
+        self.sweep_every = max(sweep_every, 1)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the shared database in WAL mode."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_users (user_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS memory_users_last_seen ON memory_users (last_seen)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS memory_messages_user ON memory_messages (user_id, id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_summaries (user_id TEXT PRIMARY KEY, summary TEXT NOT NULL)"
+        )
+        return conn
+
+    def _live_cutoff(self) -> Optional[float]:
+        """Return the last_seen timestamp below which conversations are expired."""
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else None
+
+    def get_history(self, user_id: str) -> List[Dict[str, str]]:
+        """Return message history for a user, oldest first."""
+        cutoff = self._live_cutoff()
+        with self._lock:
+            if cutoff is not None:
+                row = self._conn.execute("SELECT last_seen FROM memory_users WHERE user_id = ?", (user_id,)).fetchone()
+                if row is None or row[0] < cutoff:
+                    return []
+            rows = self._conn.execute(
+                "SELECT role, content FROM memory_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, self.max_messages),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def get_summary(self, user_id: str) -> str:
+        """Return the rolling summary of messages older than the recent window."""
+        cutoff = self._live_cutoff()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT s.summary, u.last_seen FROM memory_summaries s "
+                "JOIN memory_users u ON u.user_id = s.user_id WHERE s.user_id = ?",
+                (user_id,),
+            ).fetchone()
+        if row is None or (cutoff is not None and row[1] < cutoff):
+            return ""
+        return row[0]
+
+    def add_message(self, user_id: str, role: str, content: str) -> None:
+        """Append one message, folding messages beyond the per-user limit into the summary."""
+        now = time.time()
+        cutoff = self._live_cutoff()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if cutoff is not None:
+                    # An expired conversation the sweep has not reached yet starts over.
+                    self.expirations += self._drop_users("user_id = ? AND last_seen < ?", (user_id, cutoff))
+                self._conn.execute(
+                    "INSERT INTO memory_users (user_id, last_seen) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET last_seen = excluded.last_seen",
+                    (user_id, now),
+                )
+                self._conn.execute(
+                    "INSERT INTO memory_messages (user_id, role, content) VALUES (?, ?, ?)",
+                    (user_id, role, content),
+                )
+                overflow = self._conn.execute(
+                    "SELECT id, role, content FROM memory_messages WHERE user_id = ? AND id NOT IN "
+                    "(SELECT id FROM memory_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (user_id, user_id, self.max_messages),
+                ).fetchall()
+                if overflow:
+                    row = self._conn.execute(
+                        "SELECT summary FROM memory_summaries WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+                    summary = row[0] if row else ""
+                    for _, old_role, old_content in overflow:
+                        summary = fold_into_summary(summary, old_role, old_content, self.summary_max_chars)
+                    self._conn.execute(
+                        "INSERT INTO memory_summaries (user_id, summary) VALUES (?, ?) "
+                        "ON CONFLICT(user_id) DO UPDATE SET summary = excluded.summary",
+                        (user_id, summary),
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM memory_messages WHERE id = ?", [(row_id,) for row_id, _, _ in overflow]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._sweep()
+
+    def _drop_users(self, where: str, params: tuple) -> int:
+        """Delete users matching a condition together with their messages and summaries. Caller holds the lock."""
+        for table in ("memory_messages", "memory_summaries"):
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE user_id IN (SELECT user_id FROM memory_users WHERE {where})",
+                params,
+            )
+        return self._conn.execute(f"DELETE FROM memory_users WHERE {where}", params).rowcount
+
+    def _sweep(self) -> None:
+        """Expire idle users and evict the least recently active beyond capacity. Caller holds the lock."""
+        cutoff = self._live_cutoff()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if cutoff is not None:
+                self.expirations += self._drop_users("last_seen < ?", (cutoff,))
+            users = self._conn.execute("SELECT COUNT(*) FROM memory_users").fetchone()[0]
+            overflow = users - self.max_users
+            if overflow > 0:
+                self.evictions += self._drop_users(
+                    "user_id IN (SELECT user_id FROM memory_users ORDER BY last_seen LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def clear_memory(self, user_id: str) -> None:
+        """Delete a user's stored history if it exists."""
+        with self._lock:
+            self._drop_users("user_id = ?", (user_id,))
+
+    def user_count(self) -> int:
+        """Return the number of users with stored conversations."""
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM memory_users").fetchone()[0])
+
+    def stats(self) -> Dict[str, float]:
+        """Return user/message counts, database size, and eviction counters."""
+        with self._lock:
+            users = self._conn.execute("SELECT COUNT(*) FROM memory_users").fetchone()[0]
+            messages = self._conn.execute("SELECT COUNT(*) FROM memory_messages").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "users": users,
+            "messages": messages,
+            "approx_bytes": page_count * page_size,
+            "max_users": self.max_users,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
 
-    def _trim_history(self, user_id: str) -> None:
-        """Keep only the latest 4 messages for a user."""
-        history = self._memories.get(user_id, [])
-        if len(history) > 4:
-            self._memories[user_id] = history[-4:]
+def create_memory_manager() -> "MemoryManager | SqliteMemoryManager":
+    """Build the conversation memory backend selected in settings."""
+    if settings.MEMORY_BACKEND == "sqlite":
+        path = Path(settings.MEMORY_SQLITE_PATH or Path(__file__).resolve().parent / "memory.sqlite3")
+        return SqliteMemoryManager(
+            path,
+            max_messages=settings.MEMORY_MAX_MESSAGES,
+            max_users=settings.MEMORY_MAX_USERS,
+            ttl_seconds=settings.MEMORY_TTL_SECONDS,
+            summary_max_chars=settings.MEMORY_SUMMARY_MAX_CHARS,
+        )
+    return MemoryManager(
+        max_messages=settings.MEMORY_MAX_MESSAGES,
+        max_users=settings.MEMORY_MAX_USERS,
+        ttl_seconds=settings.MEMORY_TTL_SECONDS,
+        summary_max_chars=settings.MEMORY_SUMMARY_MAX_CHARS,
+    )
 
 
-memory_manager = MemoryManager()
+memory_manager = create_memory_manager()
+registry.gauge(
+    "chatbot_memory_users",
+    "Users with stored conversation memory.",
+    callback=lambda: {(): memory_manager.user_count()},
+)
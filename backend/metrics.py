@@ -0,0 +1,350 @@
+"""Lightweight latency instrumentation, Prometheus text exposition, and a sampling profiler."""
+
+import bisect
+import sys
+import threading
+import time
+from collections import Counter as _TallyCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import settings
+
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    """Render ``{name="value",...}`` or an empty string when there are no labels."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Shared bookkeeping for a named metric with fixed label names."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        """Store the metric name, help text, and label names."""
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """Order label values to match the declared label names."""
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        """Return exposition lines for every label combination."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Return the HELP/TYPE header and samples in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        """Create an empty counter."""
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the counter for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current count for the given labels."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        """Return one line per label combination."""
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value:g}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Current value per label combination, either set directly or read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> None:
+        """Create a gauge; ``callback`` returns ``{label_values: value}`` when scraped."""
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for the given labels."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Raise the gauge for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Lower the gauge for the given labels."""
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        """Return set values merged with callback values."""
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception as exc:
+                print(f"Metrics gauge {self.name} failed: {exc}")
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value:g}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram per label combination."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Create an empty histogram with upper bounds ``buckets`` (seconds)."""
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts, then sum and count at the end.
+            series = self._values.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 3)
+                self._values[key] = series
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        """Return cumulative bucket, sum, and count lines."""
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        lines: List[str] = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative:g}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together on ``/metrics``."""
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric, returning the existing one when the name is already registered."""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        """Register and return a counter."""
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> Gauge:
+        """Register and return a gauge."""
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Histogram:
+        """Register and return a histogram."""
+        return self.register(Histogram(name, documentation, labels))
+
+    def render(self) -> str:
+        """Return every metric in Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "chatbot_stage_seconds", "Time spent in each stage of the chat pipeline.", ["stage"]
+)
+WEBHOOK_SECONDS = registry.histogram(
+    "chatbot_webhook_seconds", "Time from webhook receipt to reply queued, per platform.", ["platform"]
+)
+HTTP_SECONDS = registry.histogram(
+    "chatbot_http_request_seconds", "HTTP request latency by route and status.", ["route", "method", "status"]
+)
+DELIVERY_SECONDS = registry.histogram(
+    "chatbot_delivery_send_seconds", "Outbound send API latency per provider and outcome.", ["provider", "outcome"]
+)
+EVENTS = registry.counter(
+    "chatbot_events_total", "Pipeline events such as cache hits, handoffs, leads, and deliveries.", ["event"]
+)
+ERRORS = registry.counter("chatbot_errors_total", "Errors by stage.", ["stage"])
+IN_FLIGHT = registry.gauge("chatbot_http_in_flight_requests", "HTTP requests currently being handled.")
+
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into the histogram and the current request's Server-Timing list."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def count(event: str, amount: float = 1.0) -> None:
+    """Increment a pipeline event counter."""
+    EVENTS.inc(amount, event=event)
+
+
+def start_request_timing() -> List[Tuple[str, float]]:
+    """Begin collecting stage timings for the current request context."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Format collected stage timings as a ``Server-Timing`` header value (milliseconds)."""
+    totals: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    parts = [f"{stage};dur={elapsed * 1000.0:.1f}" for stage, elapsed in totals.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000.0:.1f}")
+    return ", ".join(parts)
+
+
+class SamplingProfiler:
+    """Periodically sample one thread's Python stack to find where the hot path spends time.
+
+    A daemon thread reads ``sys._current_frames()`` every ``interval`` seconds, so the
+    profiled code runs unmodified. Results are collapsed stacks suitable for flame graphs
+    plus a top list of the innermost frames.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 40) -> None:
+        """Configure the sampling interval and the deepest stack kept per sample."""
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: _TallyCounter = _TallyCounter()
+        self._leaves: _TallyCounter = _TallyCounter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target: Optional[int] = None
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        """Return True while sampling."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """Start sampling ``thread_id`` (the calling thread, normally the event loop, by default)."""
+        if self.running:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and keep the collected data."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def reset(self) -> None:
+        """Discard collected samples."""
+        self._stacks.clear()
+        self._leaves.clear()
+        self.samples = 0
+
+    def _run(self) -> None:
+        """Sample the target thread until stopped."""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            names: List[str] = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self._leaves[names[0]] += 1
+            self._stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def report(self, limit: int = 25) -> str:
+        """Return the hottest frames followed by collapsed stacks."""
+        lines = [f"# samples={self.samples} interval_ms={self.interval * 1000.0:g} running={self.running}", "# top frames"]
+        for name, hits in self._leaves.most_common(limit):
+            share = hits / self.samples * 100.0 if self.samples else 0.0
+            lines.append(f"{share:6.2f}% {hits:8d} {name}")
+        lines.append("# collapsed stacks")
+        lines.extend(f"{stack} {hits}" for stack, hits in self._stacks.most_common(limit * 4))
+        return "\n".join(lines) + "\n"
+
+
+profiler = SamplingProfiler(interval=settings.PROFILER_INTERVAL_MS / 1000.0)
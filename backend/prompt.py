@@ -0,0 +1,139 @@
+"""Token-budgeted prompt assembly from business settings, context, and conversation state."""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimate LLM tokens as roughly four characters per token."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _truncate_to_tokens(text: str, tokens: int, keep_end: bool = False) -> str:
+    """Cut text to about ``tokens`` tokens at a word boundary, keeping the start or the end."""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    if keep_end:
+        cut = text[-limit:]
+        space = cut.find(" ")
+        return cut[space + 1 :] if 0 <= space < 40 else cut
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return cut[:space] if space > limit - 40 else cut
+
+
+def _overlap_length(previous: str, current: str, max_overlap: int = 200) -> int:
+    """Return the length of the longest suffix of ``previous`` that prefixes ``current``."""
+    for size in range(min(len(previous), len(current), max_overlap), 0, -1):
+        if previous.endswith(current[:size]):
+            return size
+    return 0
+
+
+def dedupe_chunks(chunks: List[str]) -> List[str]:
+    """Drop repeated or contained chunks and trim text shared with an earlier chunk's edges."""
+    kept: List[str] = []
+    for chunk in chunks:
+        text = chunk.strip()
+        if not text or any(text in existing for existing in kept):
+            continue
+        kept = [existing for existing in kept if existing not in text]
+        for existing in kept:
+            # Neighbouring chunks from ingest.chunk_text share a short overlap at their edges.
+            overlap = _overlap_length(existing, text)
+            if overlap >= 20:
+                text = text[overlap:].lstrip()
+            else:
+                tail = _overlap_length(text, existing)
+                if tail >= 20:
+                    text = text[: len(text) - tail].rstrip()
+        if text:
+            kept.append(text)
+    return kept
+
+
+class PromptAssembler:
+    """Fit system instructions, context, summary, and recent turns into a token budget.
+
+    The business header and the new user message always fit. Remaining tokens go first to
+    deduplicated context chunks (capped by ``max_context_tokens``), then to the rolling
+    summary of older turns, then to the most recent messages, newest first.
+    """
+
+    def __init__(self, token_budget: int = 1500, max_context_tokens: int = 700, max_summary_tokens: int = 200) -> None:
+        """Configure the overall input budget and per-section caps."""
+        self.token_budget = token_budget
+        self.max_context_tokens = max_context_tokens
+        self.max_summary_tokens = max_summary_tokens
+
+    def _header(self, business_name: str, bot_tone: str) -> str:
+        """Return the fixed business instructions."""
+        return (
+            f"You are the AI customer support assistant for {business_name}.\n"
+            f"Tone: {bot_tone}.\n"
+            "Use the context below when relevant. If context is missing, be transparent and helpful."
+        )
+
+    def _fit_context(self, chunks: List[str], budget: int) -> List[str]:
+        """Select deduplicated chunks in rank order, truncating the last one to fit."""
+        selected: List[str] = []
+        remaining = budget
+        for chunk in dedupe_chunks(chunks):
+            cost = estimate_tokens(chunk) + 1
+            if cost <= remaining:
+                selected.append(chunk)
+                remaining -= cost
+                continue
+            if remaining >= 50:
+                selected.append(_truncate_to_tokens(chunk, remaining - 1))
+            break
+        return selected
+
+    def assemble(
+        self,
+        context_chunks: List[str],
+        summary: str,
+        history: List[Dict[str, str]],
+        message: str,
+        business_name: Optional[str] = None,
+        bot_tone: Optional[str] = None,
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """Return the system prompt and the recent history entries that fit the budget.
+
+        ``business_name`` and ``bot_tone`` default to the deployment-wide settings.
+        """
+        header = self._header(business_name or settings.BUSINESS_NAME, bot_tone or settings.BOT_TONE)
+        remaining = self.token_budget - estimate_tokens(header) - estimate_tokens(message) - 8
+
+        context = self._fit_context(context_chunks, max(min(remaining, self.max_context_tokens), 0))
+        context_block = "\n\n".join(context) if context else "No specific knowledge found."
+        remaining -= estimate_tokens(context_block) + 4
+
+        summary_block = ""
+        if summary and remaining > 0:
+            summary_block = _truncate_to_tokens(summary, min(remaining, self.max_summary_tokens), keep_end=True)
+            remaining -= estimate_tokens(summary_block) + 8
+
+        recent: List[Dict[str, str]] = []
+        for item in reversed(history):
+            cost = estimate_tokens(item.get("content", "")) + 4
+            if cost > remaining:
+                break
+            recent.append(item)
+            remaining -= cost
+        recent.reverse()
+
+        prompt = f"{header}\n\nContext:\n{context_block}"
+        if summary_block:
+            prompt += f"\n\nEarlier in this conversation:\n{summary_block}"
+        return prompt, recent
+
+
+prompt_assembler = PromptAssembler(
+    token_budget=settings.PROMPT_TOKEN_BUDGET,
+    max_context_tokens=settings.PROMPT_MAX_CONTEXT_TOKENS,
+    max_summary_tokens=settings.PROMPT_MAX_SUMMARY_TOKENS,
+)
@@ -0,0 +1,471 @@
+"""Deadlines, retries, hedged requests, and circuit breakers around LLM calls."""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+import httpx
+
+from config import settings
+from metrics import LabelValues, count, registry
+
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, and server errors.
+TRANSIENT_STATUS_CODES = frozenset({408, 409, 425, 429})
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_END = object()
+
+
+class LLMUnavailable(Exception):
+    """No model reply is available: the circuit is open, the deadline ran out, or every attempt failed."""
+
+
+class Deadline:
+    """Time budget for one request, shared by every LLM attempt made for it."""
+
+    def __init__(self, seconds: float) -> None:
+        """Start the budget now."""
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Return the seconds left, never negative."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Return True for timeouts, connection errors, rate limits, and server errors."""
+    if isinstance(exc, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS_CODES or status >= 500
+    # SDK errors raised before any response arrives (APIConnectionError, APITimeoutError).
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class CircuitBreaker:
+    """Fail fast after ``failure_threshold`` consecutive transient failures.
+
+    While open, calls are rejected for ``reset_seconds``; then a single probe call is let
+    through (half-open) and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        """Start closed."""
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """Return True while calls would be rejected without waiting for the reset period."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_seconds
+
+    def allow(self) -> bool:
+        """Return True when a call may go ahead, admitting one probe once the reset period has passed."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a call that reached the model."""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after one ended without saying anything about the model's health."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a transient failure, opening the circuit at the threshold or when a probe fails."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self) -> Dict[str, object]:
+        """Return the state and failure counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyWindow:
+    """The most recent successful call durations, used to pick the hedging delay."""
+
+    def __init__(self, size: int = 200) -> None:
+        """Keep up to ``size`` samples."""
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        """Record one call duration."""
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float, min_samples: int = 20) -> Optional[float]:
+        """Return the given percentile (0-1), or None until ``min_samples`` calls have been seen."""
+        samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+class LLMGuard:
+    """Run LLM calls under a deadline with retries, optional hedging, and per-model circuit breakers.
+
+    Each attempt may use whatever is left of the request's :class:`Deadline`. Transient
+    failures are retried with exponential backoff and full jitter while the budget lasts.
+    With ``hedge`` on, an identical second request is sent when the first has not answered
+    within the model's recent p95 latency, and whichever replies first wins. A model whose
+    calls keep failing has its circuit opened, so callers get :class:`LLMUnavailable` at
+    once and can serve a degraded answer instead of waiting.
+
+    Blocking calls run on a small thread pool so the deadline can be enforced; a call that
+    overruns it keeps its thread until the HTTP client's own timeout ends it.
+    """
+
+    def __init__(
+        self,
+        deadline_seconds: float = 15.0,
+        max_attempts: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 2.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.5,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        workers: int = 32,
+    ) -> None:
+        """Configure the budget, retry policy, hedging, and breaker thresholds."""
+        self.deadline_seconds = deadline_seconds
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.workers = workers
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "deadline_exceeded": 0,
+            "circuit_rejections": 0,
+            "failures": 0,
+        }
+
+    def deadline(self) -> Deadline:
+        """Start a new request budget."""
+        return Deadline(self.deadline_seconds)
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Return the circuit breaker for a model, creating it on first use."""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(self.failure_threshold, self.reset_seconds))
+        return breaker
+
+    def _window(self, name: str) -> LatencyWindow:
+        """Return the latency window for a model."""
+        window = self._latencies.get(name)
+        if window is None:
+            with self._lock:
+                window = self._latencies.setdefault(name, LatencyWindow())
+        return window
+
+    def ensure_available(self, name: str) -> None:
+        """Raise :class:`LLMUnavailable` at once when a model's circuit is open, e.g. before queueing for a slot."""
+        breaker = self.breaker(name)
+        if breaker.is_open():
+            breaker.rejected += 1
+            self.counters["circuit_rejections"] += 1
+            count("llm_circuit_rejected")
+            raise LLMUnavailable(f"Circuit open for {name}.")
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Return how long to wait before hedging a call, or None when hedging is off or unmeasured."""
+        if not self.hedge:
+            return None
+        p95 = self._window(name).percentile(0.95)
+        return max(p95, self.hedge_min_delay) if p95 is not None else None
+
+    def _backoff(self, attempt: int) -> float:
+        """Return the delay before retry ``attempt`` using exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_base * (2 ** (attempt - 1)), self.backoff_max))
+
+    def _admit(self, name: str) -> CircuitBreaker:
+        """Return the model's breaker, raising :class:`LLMUnavailable` when its circuit is open."""
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            self.counters["circuit_rejections"] += 1
+            count("llm_circuit_rejected")
+            raise LLMUnavailable(f"Circuit open for {name}.")
+        return breaker
+
+    def _start_attempt(self, name: str, breaker: CircuitBreaker, attempt: int, deadline: Deadline) -> None:
+        """Raise :class:`LLMUnavailable` without blaming the model when no budget is left for an attempt."""
+        if deadline.remaining() > 0:
+            return
+        breaker.release_probe()
+        self.counters["deadline_exceeded"] += 1
+        self.counters["failures"] += 1
+        count("llm_deadline_exceeded")
+        raise LLMUnavailable(f"{name}: deadline exhausted before attempt {attempt}.")
+
+    def _failed(self, name: str, breaker: CircuitBreaker, attempt: int, exc: Exception, deadline: Deadline) -> float:
+        """Record a failed attempt and return the backoff before retrying, or raise :class:`LLMUnavailable`."""
+        transient = is_transient(exc)
+        if transient:
+            breaker.record_failure()
+        else:
+            # A 400 or 401 is about this request or its credentials, not the model's health.
+            breaker.release_probe()
+        if isinstance(exc, TimeoutError) and deadline.remaining() <= 0:
+            self.counters["deadline_exceeded"] += 1
+            count("llm_deadline_exceeded")
+        if not transient or attempt >= self.max_attempts or breaker.state != CLOSED:
+            self.counters["failures"] += 1
+            raise LLMUnavailable(f"{name} failed after {attempt} attempt(s): {exc!r}") from exc
+        delay = self._backoff(attempt)
+        if delay >= deadline.remaining():
+            self.counters["failures"] += 1
+            raise LLMUnavailable(f"{name} has no time left to retry after {attempt} attempt(s): {exc!r}") from exc
+        self.counters["retries"] += 1
+        count("llm_retry")
+        return delay
+
+    async def acall(self, name: str, call: Callable[[], Awaitable[T]], deadline: Deadline) -> T:
+        """Await ``call()`` under the deadline, retrying transient failures and hedging slow attempts."""
+        breaker = self._admit(name)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._start_attempt(name, breaker, attempt, deadline)
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._ahedged(name, call), timeout=deadline.remaining())
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as exc:
+                await asyncio.sleep(self._failed(name, breaker, attempt, exc, deadline))
+                continue
+            self._window(name).observe(time.perf_counter() - started)
+            breaker.record_success()
+            return result
+
+    async def _ahedged(self, name: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Await one attempt, adding a hedged duplicate if it runs past the hedging delay."""
+        delay = self.hedge_delay(name)
+        if delay is None:
+            return await call()
+        tasks: List[asyncio.Future] = [asyncio.ensure_future(call())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.counters["hedges"] += 1
+                count("llm_hedge")
+                tasks.append(asyncio.ensure_future(call()))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the pool that runs blocking calls, creating it on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="llm")
+        return self._executor
+
+    def call(self, name: str, call: Callable[[], T], deadline: Deadline) -> T:
+        """Blocking variant of :meth:`acall`."""
+        breaker = self._admit(name)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._start_attempt(name, breaker, attempt, deadline)
+            started = time.perf_counter()
+            try:
+                result = self._hedged(name, call, deadline)
+            except Exception as exc:
+                time.sleep(self._failed(name, breaker, attempt, exc, deadline))
+                continue
+            self._window(name).observe(time.perf_counter() - started)
+            breaker.record_success()
+            return result
+
+    def _hedged(self, name: str, call: Callable[[], T], deadline: Deadline) -> T:
+        """Run one attempt on the pool, adding a hedged duplicate if it runs past the hedging delay."""
+        executor = self._get_executor()
+        delay = self.hedge_delay(name)
+        futures = [executor.submit(call)]
+        if delay is not None and delay < deadline.remaining():
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                self.counters["hedges"] += 1
+                count("llm_hedge")
+                futures.append(executor.submit(call))
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise TimeoutError(f"No reply within the {deadline.seconds:g}s deadline.")
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self.counters["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def astream(
+        self, name: str, open_stream: Callable[[], AsyncIterator[T]], deadline: Deadline
+    ) -> AsyncIterator[T]:
+        """Yield a streamed reply, bounding and retrying only the wait for its first chunk.
+
+        Chunks already sent cannot be taken back, so streams are never hedged and a failure
+        after the first chunk is raised to the caller.
+        """
+        breaker = self._admit(name)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._start_attempt(name, breaker, attempt, deadline)
+            stream = open_stream().__aiter__()
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), timeout=deadline.remaining())
+                break
+            except StopAsyncIteration:
+                breaker.record_success()
+                return
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as exc:
+                await asyncio.sleep(self._failed(name, breaker, attempt, exc, deadline))
+        breaker.record_success()
+        yield first
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as exc:
+            if is_transient(exc):
+                breaker.record_failure()
+            raise
+
+    def stream(self, name: str, open_stream: Callable[[], Iterator[T]], deadline: Deadline) -> Iterator[T]:
+        """Blocking variant of :meth:`astream`."""
+        breaker = self._admit(name)
+        executor = self._get_executor()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._start_attempt(name, breaker, attempt, deadline)
+            iterator = iter(open_stream())
+            try:
+                first = executor.submit(next, iterator, _END).result(timeout=deadline.remaining())
+                break
+            except Exception as exc:
+                time.sleep(self._failed(name, breaker, attempt, exc, deadline))
+        breaker.record_success()
+        if first is _END:
+            return
+        yield first
+        try:
+            yield from iterator
+        except Exception as exc:
+            if is_transient(exc):
+                breaker.record_failure()
+            raise
+
+    def open_circuits(self) -> Dict[LabelValues, float]:
+        """Return 1 for each model whose circuit is not closed, for the metrics gauge."""
+        return {(name,): 1.0 for name, breaker in list(self._breakers.items()) if breaker.state != CLOSED}
+
+    def stats(self) -> Dict[str, object]:
+        """Return the policy, retry and hedge counters, and each model's breaker and p95 latency."""
+        models: Dict[str, object] = {}
+        for name, breaker in list(self._breakers.items()):
+            p95 = self._window(name).percentile(0.95)
+            models[name] = {**breaker.stats(), "p95_s": round(p95, 4) if p95 is not None else None}
+        return {
+            "deadline_seconds": self.deadline_seconds,
+            "max_attempts": self.max_attempts,
+            "hedge": self.hedge,
+            **self.counters,
+            "models": models,
+        }
+
+
+llm_guard = LLMGuard(
+    deadline_seconds=settings.LLM_DEADLINE_SECONDS,
+    max_attempts=settings.LLM_MAX_ATTEMPTS,
+    backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+    hedge=settings.LLM_HEDGE_ENABLED,
+    hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+    failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+    workers=settings.LLM_MAX_CONCURRENCY,
+)
+CIRCUIT_OPEN = registry.gauge(
+    "chatbot_llm_circuit_open", "1 while a model's circuit breaker is open or half-open.", ["model"],
+    callback=llm_guard.open_circuits,
+)
@@ -0,0 +1,84 @@
+"""Micro-batched asynchronous retrieval on top of the Chroma helpers."""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database import query_scored_batch
+
+
+class RetrievalBatcher:
+    """Coalesce concurrent similarity queries into one multi-text collection query."""
+
+    def __init__(self, executor: Optional[Executor] = None, window_ms: float = 5.0, max_batch: int = 32) -> None:
+        """Configure the collection window, maximum batch size, and executor for blocking queries."""
+        self.executor = executor
+        self.window_seconds = max(window_ms, 0.0) / 1000.0
+        self.max_batch = max(max_batch, 1)
+        self._pending: Dict[str, List[Tuple[str, int, asyncio.Future]]] = {}
+        self._collections: Dict[str, Any] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # The event loop only keeps weak references to tasks; these keep running batches alive.
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.queries = 0
+
+    @staticmethod
+    def _collection_key(collection: Any) -> str:
+        """Return a stable grouping key so only queries against the same collection share a batch."""
+        return str(getattr(collection, "name", id(collection)))
+
+    async def query(self, collection: Any, query_text: str, n: int = 4) -> List[str]:
+        """Queue a similarity query and return only this caller's chunk texts."""
+        return [doc for doc, _ in await self.query_scored(collection, query_text, n)]
+
+    async def query_scored(self, collection: Any, query_text: str, n: int = 4) -> List[Tuple[str, float]]:
+        """Queue a similarity query and return this caller's (chunk, similarity) pairs."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        key = self._collection_key(collection)
+        self._collections[key] = collection
+        pending = self._pending.setdefault(key, [])
+        pending.append((query_text, n, future))
+
+        if len(pending) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window_seconds, self._flush, key)
+        return await future
+
+    def _flush(self, key: str) -> None:
+        """Detach the pending batch for a collection and run it in the background."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        collection = self._collections.pop(key, None)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(collection, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, collection: Any, batch: List[Tuple[str, int, asyncio.Future]]) -> None:
+        """Execute one multi-text query and resolve every waiting caller."""
+        texts = [item[0] for item in batch]
+        max_n = max(item[1] for item in batch)
+        self.batches += 1
+        self.queries += len(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, query_scored_batch, collection, texts, max_n)
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, n, future), docs in zip(batch, results):
+            if not future.done():
+                future.set_result(docs[:n])
+
+    def stats(self) -> Dict[str, float]:
+        """Return batch counters and the average batch size."""
+        average = round(self.queries / self.batches, 2) if self.batches else 0.0
+        return {"batches": self.batches, "queries": self.queries, "avg_batch_size": average}
@@ -0,0 +1,159 @@
+"""Pick a model tier for each message from cheap local heuristics and the retrieval score."""
+
+import re
+from typing import Dict, Optional
+
+from config import settings
+from metrics import registry
+
+
+SMALL_TALK = "small_talk"
+FAQ = "faq"
+COMPLEX = "complex"
+
+ROUTES = registry.counter("chatbot_model_routes_total", "Replies by model tier.", ["tier"])
+ESCALATIONS = registry.counter(
+    "chatbot_model_escalations_total", "Small-tier replies regenerated by the complex tier.", ["tier"]
+)
+
+# Words that make up greetings, thanks, acknowledgements, and goodbyes.
+SMALL_TALK_WORDS = frozenset(
+    {
+        "hi", "hii", "hello", "hey", "heya", "hiya", "yo", "morning", "afternoon", "evening", "good", "night",
+        "thanks", "thank", "thx", "ty", "you", "so", "much", "very", "a", "lot", "ok", "okay", "okey", "k", "kk",
+        "alright", "sure", "cool", "great", "nice", "perfect", "awesome", "fine", "got", "it", "noted", "yes",
+        "yeah", "yep", "no", "nope", "bye", "goodbye", "later", "see", "cheers", "welcome", "there", "again",
+        "appreciate", "appreciated", "lol", "wow", "all", "the", "best", "have", "day",
+    }
+)
+# Phrases that ask for explanation, comparison, or advice rather than a lookup.
+COMPLEX_CUES = (
+    "why", "how do i", "how can i", "how does", "how would", "explain", "compare", "comparison", "difference",
+    "better", "recommend", "suggest", "should i", "what if", "problem", "issue", "complain", "complaint",
+    "not working", "wrong", "broken",
+)
+# Phrases that suggest a small-tier reply did not know the answer.
+LOW_CONFIDENCE_PHRASES = (
+    "i'm not sure", "i am not sure", "not certain", "i don't know", "i do not know", "i don't have",
+    "i do not have", "no information", "unable to", "i can't help", "i cannot help", "i'm sorry, but",
+    "contact us directly", "i couldn't find", "i could not find",
+)
+
+_WORDS = re.compile(r"[a-z']+")
+_COMPLEX_CUE = re.compile(r"\b(?:" + "|".join(re.escape(cue) for cue in COMPLEX_CUES) + r")\b")
+
+
+class ModelTier:
+    """The model and output limit used for one class of messages."""
+
+    __slots__ = ("name", "model_name", "max_tokens")
+
+    def __init__(self, name: str, model_name: str, max_tokens: int) -> None:
+        """Store the tier name, Groq model name (empty means the tenant's main model), and token limit."""
+        self.name = name
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+
+
+class ModelRouter:
+    """Classify messages into small-talk, FAQ, and complex tiers.
+
+    Greetings and acknowledgements are recognised from the words alone, so they skip
+    retrieval. Everything else is retrieved first: a close knowledge-base match makes a
+    short question an FAQ lookup, while long, multi-part, or advice-seeking messages and
+    poorly matched ones go to the complex tier. With ``escalate`` on, a small-tier reply
+    that hedges or is cut off is regenerated by the complex tier.
+    """
+
+    def __init__(
+        self,
+        tiers: Dict[str, ModelTier],
+        enabled: bool = True,
+        faq_min_score: float = 0.6,
+        complex_min_words: int = 25,
+        small_talk_max_words: int = 6,
+        escalate: bool = True,
+    ) -> None:
+        """Configure the tiers and the thresholds that choose between them."""
+        self.tiers = tiers
+        self.enabled = enabled
+        self.faq_min_score = faq_min_score
+        self.complex_min_words = complex_min_words
+        self.small_talk_max_words = small_talk_max_words
+        self.escalate = escalate
+
+    def is_small_talk(self, message: str) -> bool:
+        """Return True for short messages made only of greeting and acknowledgement words."""
+        if not self.enabled:
+            return False
+        words = _WORDS.findall(message.lower())
+        if not words:
+            # Emoji, punctuation, or a sticker caption with no words.
+            return bool(message.strip()) and "?" not in message
+        return len(words) <= self.small_talk_max_words and all(word in SMALL_TALK_WORDS for word in words)
+
+    def classify(self, message: str, top_score: Optional[float] = None) -> str:
+        """Return the tier for a message, given the best retrieval similarity when it was retrieved."""
+        if not self.enabled:
+            return COMPLEX
+        if self.is_small_talk(message):
+            return SMALL_TALK
+        lowered = message.lower()
+        if (
+            len(_WORDS.findall(lowered)) >= self.complex_min_words
+            or lowered.count("?") > 1
+            or _COMPLEX_CUE.search(lowered)
+        ):
+            return COMPLEX
+        if top_score is not None and top_score >= self.faq_min_score:
+            return FAQ
+        return COMPLEX
+
+    def tier(self, name: str) -> ModelTier:
+        """Return the configuration of a tier and count the routing decision."""
+        ROUTES.inc(tier=name)
+        return self.tiers[name]
+
+    def should_escalate(self, tier: ModelTier, reply_text: str, finish_reason: str = "") -> bool:
+        """Return True when a small-tier reply looks unreliable enough to ask the complex tier."""
+        if not self.escalate or tier.name == COMPLEX:
+            return False
+        if tier.name == SMALL_TALK:
+            return not reply_text.strip()
+        lowered = reply_text.lower().replace("’", "'")
+        return not reply_text.strip() or finish_reason == "length" or any(
+            phrase in lowered for phrase in LOW_CONFIDENCE_PHRASES
+        )
+
+    def record_escalation(self, tier: ModelTier) -> None:
+        """Count a reply that was regenerated by the complex tier."""
+        ESCALATIONS.inc(tier=tier.name)
+
+    def stats(self) -> Dict[str, object]:
+        """Return per-tier models, limits, and routing and escalation counts."""
+        return {
+            "enabled": self.enabled,
+            "escalate": self.escalate,
+            "tiers": {
+                name: {
+                    "model": tier.model_name or settings.GROQ_MODEL_NAME,
+                    "max_tokens": tier.max_tokens,
+                    "routed": ROUTES.value(tier=name),
+                    "escalated": ESCALATIONS.value(tier=name),
+                }
+                for name, tier in self.tiers.items()
+            },
+        }
+
+
+model_router = ModelRouter(
+    tiers={
+        SMALL_TALK: ModelTier(SMALL_TALK, settings.ROUTING_SMALL_TALK_MODEL, settings.ROUTING_SMALL_TALK_MAX_TOKENS),
+        FAQ: ModelTier(FAQ, settings.ROUTING_FAQ_MODEL, settings.ROUTING_FAQ_MAX_TOKENS),
+        COMPLEX: ModelTier(COMPLEX, settings.ROUTING_COMPLEX_MODEL, settings.ROUTING_COMPLEX_MAX_TOKENS),
+    },
+    enabled=settings.MODEL_ROUTING_ENABLED,
+    faq_min_score=settings.ROUTING_FAQ_MIN_SCORE,
+    complex_min_words=settings.ROUTING_COMPLEX_MIN_WORDS,
+    escalate=settings.ROUTING_ESCALATE,
+)
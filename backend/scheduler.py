@@ -0,0 +1,236 @@
+"""Admission control, per-user ordering, and rate limiting for chat pipelines."""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from config import settings
+from metrics import registry
+
+
+BUSY_REPLY = "We're receiving a lot of messages right now. Please try again in a minute."
+
+SHED = registry.counter("chatbot_requests_shed_total", "Chat requests rejected by the scheduler.", ["reason"])
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued; carries a Retry-After hint."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        """Store the shed reason and the suggested retry delay in seconds."""
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Start full with ``capacity`` tokens."""
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        """Add tokens earned since the last update."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Return seconds until one token is available without consuming it."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1.0 or self.rate <= 0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """Take one token; callers check ``wait_time`` first."""
+        self.tokens -= 1.0
+
+
+class Admission:
+    """A reserved place in the scheduler; entering it waits for the user's turn."""
+
+    def __init__(self, scheduler: "ChatScheduler", user_id: str) -> None:
+        """Bind the reservation to a user."""
+        self._scheduler = scheduler
+        self.user_id = user_id
+        self._lock: Optional[asyncio.Lock] = None
+        self._holding = False
+        self._released = False
+
+    async def __aenter__(self) -> "Admission":
+        """Wait until earlier messages from the same user have finished."""
+        self._lock = self._scheduler._user_lock(self.user_id)
+        try:
+            await asyncio.wait_for(self._lock.acquire(), timeout=self._scheduler.queue_timeout)
+        except asyncio.TimeoutError as exc:
+            self.release()
+            raise self._scheduler._shed("user queue timeout", self._scheduler.queue_timeout) from exc
+        self._holding = True
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Hand the user's turn to the next queued message."""
+        self.release()
+
+    def release(self) -> None:
+        """Free the reservation; safe to call more than once."""
+        if self._released:
+            return
+        self._released = True
+        if self._holding and self._lock is not None:
+            self._lock.release()
+            self._holding = False
+        self._scheduler._release(self.user_id)
+
+
+class ChatScheduler:
+    """Cap in-flight LLM calls, serialize each user's messages, and shed load when saturated."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_queue: int = 256,
+        max_user_queue: int = 3,
+        queue_timeout: float = 20.0,
+        user_rate_per_minute: float = 20.0,
+        user_burst: float = 5.0,
+        global_rate_per_second: float = 20.0,
+        global_burst: float = 40.0,
+    ) -> None:
+        """Configure concurrency, queue, and rate limits."""
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue = max(max_queue, 1)
+        self.max_user_queue = max(max_user_queue, 1)
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate_per_minute / 60.0
+        self.user_burst = user_burst
+        self._llm_slots = asyncio.Semaphore(self.max_in_flight)
+        self._global_bucket = TokenBucket(global_rate_per_second, global_burst)
+        self._user_buckets: Dict[str, TokenBucket] = {}
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+        self._user_pending: Dict[str, int] = {}
+        self.pending = 0
+        self.in_flight = 0
+        self.llm_waiting = 0
+        self.shed: Dict[str, int] = {}
+
+    def _shed(self, reason: str, retry_after: float) -> Overloaded:
+        """Count a rejected request and build the exception to raise."""
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        SHED.inc(reason=reason)
+        return Overloaded(reason, retry_after)
+
+    def _prune_user_buckets(self, now: float) -> None:
+        """Forget full buckets of idle users so the map stays bounded."""
+        if len(self._user_buckets) < 10000:
+            return
+        idle: List[str] = []
+        for user_id, bucket in self._user_buckets.items():
+            bucket.wait_time(now)
+            if user_id not in self._user_pending and bucket.tokens >= bucket.capacity:
+                idle.append(user_id)
+        for user_id in idle:
+            del self._user_buckets[user_id]
+
+    def admit(self, user_id: str) -> Admission:
+        """Reserve a place for one message or raise :class:`Overloaded` immediately."""
+        now = time.monotonic()
+        if self.pending >= self.max_queue:
+            raise self._shed("queue full", self.queue_timeout / 4)
+        if self._user_pending.get(user_id, 0) >= self.max_user_queue:
+            raise self._shed("user queue full", self.queue_timeout / 4)
+
+        global_wait = self._global_bucket.wait_time(now)
+        if global_wait > 0:
+            raise self._shed("global rate limit", global_wait)
+
+        self._prune_user_buckets(now)
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+            self._user_buckets[user_id] = bucket
+        user_wait = bucket.wait_time(now)
+        if user_wait > 0:
+            raise self._shed("user rate limit", user_wait)
+
+        self._global_bucket.consume()
+        bucket.consume()
+        self.pending += 1
+        self._user_pending[user_id] = self._user_pending.get(user_id, 0) + 1
+        return Admission(self, user_id)
+
+    def _user_lock(self, user_id: str) -> asyncio.Lock:
+        """Return the lock that orders one user's messages."""
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_id] = lock
+        return lock
+
+    def _release(self, user_id: str) -> None:
+        """Drop bookkeeping for a finished admission."""
+        self.pending = max(self.pending - 1, 0)
+        remaining = self._user_pending.get(user_id, 0) - 1
+        if remaining > 0:
+            self._user_pending[user_id] = remaining
+        else:
+            self._user_pending.pop(user_id, None)
+            self._user_locks.pop(user_id, None)
+
+    @asynccontextmanager
+    async def llm_slot(self) -> AsyncIterator[None]:
+        """Hold one of the global in-flight LLM slots for the duration of a call."""
+        self.llm_waiting += 1
+        try:
+            await asyncio.wait_for(self._llm_slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError as exc:
+            raise self._shed("llm queue timeout", self.queue_timeout) from exc
+        finally:
+            self.llm_waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._llm_slots.release()
+
+    def stats(self) -> Dict[str, object]:
+        """Return queue depth, in-flight calls, and shed counters."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "pending": self.pending,
+            "llm_waiting": self.llm_waiting,
+            "active_users": len(self._user_pending),
+            "shed": dict(self.shed),
+        }
+
+
+chat_scheduler = ChatScheduler(
+    max_in_flight=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.SCHEDULER_MAX_QUEUE,
+    max_user_queue=settings.SCHEDULER_MAX_USER_QUEUE,
+    queue_timeout=settings.SCHEDULER_QUEUE_TIMEOUT_SECONDS,
+    user_rate_per_minute=settings.USER_RATE_LIMIT_PER_MINUTE,
+    user_burst=settings.USER_RATE_LIMIT_BURST,
+    global_rate_per_second=settings.GLOBAL_RATE_LIMIT_PER_SECOND,
+    global_burst=settings.GLOBAL_RATE_LIMIT_BURST,
+)
+registry.gauge(
+    "chatbot_llm_in_flight",
+    "LLM calls currently running.",
+    callback=lambda: {(): chat_scheduler.in_flight},
+)
+registry.gauge(
+    "chatbot_scheduler_pending",
+    "Chat requests admitted and waiting for their turn.",
+    callback=lambda: {(): chat_scheduler.pending},
+)
@@ -1,6 +1,7 @@
 """Google Sheets helper functions for lead storage."""
 
-from typing import List
+import threading
+from typing import Dict, List, Optional
 
 import gspread
 from google.oauth2.service_account import Credentials
@@ -8,19 +9,53 @@ from google.oauth2.service_account import Credentials
 from config import settings
 
 
+_client: Optional[gspread.Client] = None
+_worksheets: Dict[str, gspread.Worksheet] = {}
+_lock = threading.Lock()
+
+
 def _get_client() -> gspread.Client:
-    """Build an authenticated gspread client using a service account JSON key."""
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-    credentials = Credentials.from_service_account_file(
-        settings.GOOGLE_SERVICE_ACCOUNT_JSON,
-        scopes=scopes,
-    )
-    return gspread.authorize(credentials)
+    """Return a cached gspread client authorized with the service account JSON key."""
+    global _client
+    with _lock:
+        if _client is None:
+            scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+            credentials = Credentials.from_service_account_file(
+                settings.GOOGLE_SERVICE_ACCOUNT_JSON,
+                scopes=scopes,
+            )
+            _client = gspread.authorize(credentials)
+        return _client
+
+
+def _get_worksheet(sheet_id: str) -> gspread.Worksheet:
+    """Return the cached first worksheet for a spreadsheet, opening it on first use."""
+    worksheet = _worksheets.get(sheet_id)
+    if worksheet is None:
+        worksheet = _get_client().open_by_key(sheet_id).sheet1
+        _worksheets[sheet_id] = worksheet
+    return worksheet
+
+
+def reset_client() -> None:
+    """Drop the cached client and worksheets so the next call re-authorizes."""
+    global _client
+    with _lock:
+        _client = None
+        _worksheets.clear()
+
+
+def append_rows(sheet_id: str, rows: List[List[str]]) -> None:
+    """Append several rows to the first worksheet in one API call."""
+    if not rows:
+        return
+    try:
+        _get_worksheet(sheet_id).append_rows(rows, value_input_option="USER_ENTERED")
+    except Exception:
+        reset_client()
+        raise
 
 
 def append_row(sheet_id: str, values_list: List[str]) -> None:
     """Append a single row of values to the first worksheet in the target sheet."""
-    client = _get_client()
-    spreadsheet = client.open_by_key(sheet_id)
-    worksheet = spreadsheet.sheet1
-    worksheet.append_row(values_list, value_input_option="USER_ENTERED")
+    append_rows(sheet_id, [values_list])
@@ -0,0 +1,244 @@
+"""Tenant registry for serving several businesses from one process.
+
+Each tenant has its own business profile, credentials, knowledge collection, memory
+namespace, and lead sheet. The embedder, HTTP connection pools, and event loop stay
+shared; per-tenant handles are created on first use and dropped when a tenant goes idle.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+
+DEFAULT_TENANT_ID = "default"
+
+
+def normalize_whatsapp_number(number: str) -> str:
+    """Strip the ``whatsapp:`` prefix and spaces so Twilio numbers compare equal."""
+    value = number.strip()
+    if value.lower().startswith("whatsapp:"):
+        value = value[len("whatsapp:"):]
+    return value.replace(" ", "")
+
+
+class Tenant:
+    """One business served by this process."""
+
+    def __init__(self, tenant_id: str, config: Dict[str, Any]) -> None:
+        """Read a tenant's config; unset profile and Groq fields inherit from settings.
+
+        Twilio and Meta credentials and the lead sheet never inherit, so a tenant without its
+        own cannot send on that channel or save leads under another business's accounts.
+        """
+        self.id = tenant_id
+
+        def inherit(field: str, setting: str) -> str:
+            return str(config.get(field) or getattr(settings, setting))
+
+        def own(field: str) -> str:
+            return str(config.get(field) or "")
+
+        self.business_name = inherit("business_name", "BUSINESS_NAME")
+        self.bot_tone = inherit("bot_tone", "BOT_TONE")
+        self.groq_api_key = inherit("groq_api_key", "GROQ_API_KEY")
+        self.groq_model_name = inherit("groq_model_name", "GROQ_MODEL_NAME")
+        self.twilio_account_sid = own("twilio_account_sid")
+        self.twilio_auth_token = own("twilio_auth_token")
+        self.meta_page_access_token = own("meta_page_access_token")
+        self.google_sheet_id = own("google_sheet_id")
+        self.api_keys: List[str] = [str(key) for key in config.get("api_keys") or []]
+        self.whatsapp_number = str(config.get("whatsapp_number") or "")
+        self.instagram_account_id = str(config.get("instagram_account_id") or "")
+        self.collection_name = str(
+            config.get("collection_name") or f"{settings.CHROMA_COLLECTION_NAME}_{tenant_id}"
+        )
+
+    @property
+    def is_default(self) -> bool:
+        """Return True for the tenant built from the deployment-wide settings."""
+        return self.id == DEFAULT_TENANT_ID
+
+    @property
+    def namespace(self) -> str:
+        """Return the prefix that keeps this tenant's users and cached replies apart."""
+        return self.id
+
+    def scoped(self, user_id: str) -> str:
+        """Return ``user_id`` qualified by the tenant, for memory, scheduling, and dedup keys.
+
+        Every tenant, the default included, is prefixed; tenant IDs cannot contain ``:``, so a
+        client-chosen user ID can never spell another tenant's key.
+        """
+        return f"{self.namespace}:{user_id}"
+
+
+def _default_tenant() -> Tenant:
+    """Build the tenant that serves requests matching no configured tenant."""
+    return Tenant(DEFAULT_TENANT_ID, {
+        "whatsapp_number": settings.TWILIO_WHATSAPP_NUMBER,
+        "instagram_account_id": settings.INSTAGRAM_ACCOUNT_ID,
+        "collection_name": settings.CHROMA_COLLECTION_NAME,
+        "twilio_account_sid": settings.TWILIO_ACCOUNT_SID,
+        "twilio_auth_token": settings.TWILIO_AUTH_TOKEN,
+        "meta_page_access_token": settings.META_PAGE_ACCESS_TOKEN,
+        "google_sheet_id": settings.GOOGLE_SHEET_ID,
+    })
+
+
+class TenantRegistry:
+    """Route requests to tenants and hold each tenant's lazily created resources.
+
+    Tenants come from a JSON file holding a list of objects with an ``id`` plus any of
+    ``api_keys``, ``whatsapp_number``, ``instagram_account_id``, ``collection_name``,
+    ``business_name``, ``bot_tone``, ``groq_api_key``, ``groq_model_name``,
+    ``twilio_account_sid``, ``twilio_auth_token``, ``meta_page_access_token``, and
+    ``google_sheet_id``. Profile and Groq fields left out inherit from settings; messaging
+    credentials and the lead sheet do not.
+    Requests that match no tenant go to the default tenant, which is built from
+    settings so single-business deployments work unchanged.
+
+    Resources registered through :meth:`resource` are closed once their tenant has not
+    been used for ``idle_seconds``; the default tenant's are kept for the process lifetime.
+    """
+
+    def __init__(self, config_path: str = "", idle_seconds: float = 900.0) -> None:
+        """Load tenants from ``config_path`` (if set) next to the default tenant."""
+        self.idle_seconds = idle_seconds
+        self.default = _default_tenant()
+        self._tenants: Dict[str, Tenant] = {}
+        self._by_api_key: Dict[str, Tenant] = {}
+        self._by_whatsapp_number: Dict[str, Tenant] = {}
+        self._by_instagram_account: Dict[str, Tenant] = {}
+        self._resources: Dict[str, Dict[str, Tuple[Any, Optional[Callable[[Any], None]]]]] = {}
+        self._last_used: Dict[str, float] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._register(self.default)
+        if config_path:
+            self.load(Path(config_path))
+
+    def _register(self, tenant: Tenant) -> None:
+        """Index a tenant by ID and by each routing key, rejecting duplicates."""
+        if tenant.id in self._tenants:
+            raise ValueError(f"Duplicate tenant ID: {tenant.id}")
+        self._tenants[tenant.id] = tenant
+        routes = [
+            (self._by_api_key, tenant.api_keys),
+            (self._by_whatsapp_number, [normalize_whatsapp_number(tenant.whatsapp_number)]),
+            (self._by_instagram_account, [tenant.instagram_account_id]),
+        ]
+        for index, keys in routes:
+            for key in keys:
+                if not key:
+                    continue
+                if key in index and index[key] is not self.default:
+                    raise ValueError(f"Tenants {index[key].id} and {tenant.id} share the routing key {key!r}.")
+                index[key] = tenant
+
+    def load(self, path: Path) -> None:
+        """Register every tenant listed in a JSON config file."""
+        entries = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(entries, list):
+            raise ValueError(f"Tenant config {path} must be a JSON list of tenant objects.")
+        for entry in entries:
+            tenant_id = str(entry.get("id") or "").strip() if isinstance(entry, dict) else ""
+            if not tenant_id or ":" in tenant_id:
+                raise ValueError(f"Tenant config {path} has an entry without a valid id: {entry!r}")
+            self._register(Tenant(tenant_id, entry))
+
+    def get(self, tenant_id: str) -> Optional[Tenant]:
+        """Return a tenant by ID."""
+        return self._tenants.get(tenant_id or DEFAULT_TENANT_ID)
+
+    def by_api_key(self, api_key: str) -> Optional[Tenant]:
+        """Return the tenant owning an API key, the default tenant for no key, or None when unknown."""
+        if not api_key:
+            return self.default
+        return self._by_api_key.get(api_key)
+
+    def by_whatsapp_number(self, number: str) -> Tenant:
+        """Return the tenant whose WhatsApp sender number received a message."""
+        return self._by_whatsapp_number.get(normalize_whatsapp_number(number), self.default)
+
+    def by_instagram_account(self, account_id: str) -> Tenant:
+        """Return the tenant whose Instagram account received a message."""
+        return self._by_instagram_account.get(account_id, self.default)
+
+    def is_own_instagram_account(self, account_id: str) -> bool:
+        """Return True when ``account_id`` belongs to any tenant (used to skip echoes)."""
+        return bool(account_id) and account_id in self._by_instagram_account
+
+    def resource(
+        self,
+        tenant: Tenant,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """Return a tenant's cached resource, creating it with ``factory`` on first use.
+
+        ``close`` is called with the resource when the tenant is evicted for being idle.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_used[tenant.id] = now
+            entry = self._resources.get(tenant.id, {}).get(name)
+        if entry is None:
+            value = factory()
+            with self._lock:
+                entry = self._resources.setdefault(tenant.id, {}).setdefault(name, (value, close))
+            if entry[0] is not value and close is not None:
+                close(value)
+        self.evict_idle(now)
+        return entry[0]
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Close the resources of tenants idle for longer than ``idle_seconds``; returns tenants evicted."""
+        now = time.monotonic() if now is None else now
+        if self.idle_seconds <= 0 or now - self._last_sweep < self.idle_seconds / 4:
+            return 0
+        with self._lock:
+            self._last_sweep = now
+            idle = [
+                tenant_id for tenant_id, last_used in self._last_used.items()
+                if tenant_id != DEFAULT_TENANT_ID and now - last_used > self.idle_seconds
+            ]
+            evicted = [(tenant_id, self._resources.pop(tenant_id, {})) for tenant_id in idle]
+            for tenant_id in idle:
+                self._last_used.pop(tenant_id, None)
+            self.evictions += len(idle)
+        for tenant_id, resources in evicted:
+            for name, (value, close) in resources.items():
+                if close is None:
+                    continue
+                try:
+                    close(value)
+                except Exception as exc:
+                    print(f"Closing {name} for idle tenant {tenant_id} failed: {exc}")
+        return len(idle)
+
+    def stats(self) -> Dict[str, object]:
+        """Return configured and active tenant counts and idle evictions."""
+        now = time.monotonic()
+        with self._lock:
+            active = {
+                tenant_id: {
+                    "resources": sorted(self._resources.get(tenant_id, {})),
+                    "idle_s": round(now - last_used, 1),
+                }
+                for tenant_id, last_used in self._last_used.items()
+            }
+        return {
+            "tenants": len(self._tenants),
+            "active": active,
+            "evictions": self.evictions,
+            "idle_seconds": self.idle_seconds,
+        }
+
+
+tenant_registry = TenantRegistry(config_path=settings.TENANTS_CONFIG_PATH, idle_seconds=settings.TENANT_IDLE_SECONDS)
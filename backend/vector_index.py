@@ -0,0 +1,476 @@
+"""In-process NumPy vector index used as a lightweight alternative to Chroma."""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+EmbeddingFunction = Callable[[List[str]], Sequence[Sequence[float]]]
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+# Quantized matrices are dequantized in row blocks of this size to bound temporary memory.
+SCORE_BLOCK_ROWS = 4096
+
+
+class NumpyVectorIndex:
+    """Store unit-normalized chunk embeddings in one contiguous matrix and answer top-k by dot product.
+
+    The matrix is written to ``<root>/<name>/`` as versioned ``.npy`` files and opened with
+    ``mmap_mode="r"`` so every worker process shares the same page-cache copy. A small
+    ``manifest.json`` points at the live version; readers reload when it changes.
+
+    Writers in any process serialize on ``<root>/<name>/.lock``. Every write publishes a full
+    copy of the matrix, so a single upsert, update, or delete costs O(N) in the stored chunks.
+    Ingestion collects a whole document's changes in an :class:`IndexBatch` and publishes them
+    once, which keeps that affordable up to a few hundred thousand chunks.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        root: Path,
+        embedding_function: Optional[EmbeddingFunction] = None,
+        dtype: str = "float32",
+    ) -> None:
+        """Open (or prepare) the index directory for a named collection."""
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported vector index dtype: {dtype}")
+        self.name = name
+        self.dtype = dtype
+        self.path = Path(root) / name
+        self.embedding_function = embedding_function
+        self._lock = threading.RLock()
+        self._manifest_mtime: Optional[int] = None
+        self._version = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._refresh()
+
+    @property
+    def _manifest_path(self) -> Path:
+        """Return the path of the manifest naming the live version."""
+        return self.path / "manifest.json"
+
+    def _refresh(self) -> None:
+        """Reload the memory-mapped matrix when another process published a new version."""
+        try:
+            self._load_manifest()
+        except FileNotFoundError:
+            # A writer published twice while we read and removed the version we were opening.
+            self._load_manifest()
+
+    def _load_manifest(self) -> None:
+        """Open the version the manifest names unless it is the one already loaded."""
+        try:
+            mtime = self._manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+
+        with self._lock:
+            manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+            version = int(manifest["version"])
+            records = json.loads((self.path / f"records-{version}.json").read_text(encoding="utf-8"))
+            matrix_path = self.path / f"embeddings-{version}.npy"
+            scales_path = self.path / f"scales-{version}.npy"
+            self._matrix = np.load(matrix_path, mmap_mode="r") if records["ids"] else None
+            self._scales = np.load(scales_path, mmap_mode="r") if scales_path.exists() else None
+            self._ids = records["ids"]
+            self._documents = records["documents"]
+            self._metadatas = records["metadatas"]
+            self.dtype = manifest.get("dtype", self.dtype)
+            self._version = version
+            self._manifest_mtime = mtime
+
+    def count(self) -> int:
+        """Return the number of stored chunks."""
+        self._refresh()
+        return len(self._ids)
+
+    def _embed(self, documents: List[str]) -> np.ndarray:
+        """Embed documents with the configured embedding function."""
+        if self.embedding_function is None:
+            raise ValueError("Embeddings must be provided when no embedding function is configured.")
+        return np.asarray(self.embedding_function(documents), dtype=np.float32)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale each row to unit length so dot products equal cosine similarity."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _dense_matrix(self) -> np.ndarray:
+        """Return the stored embeddings as float32 rows, dequantizing if needed."""
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        matrix = np.asarray(self._matrix, dtype=np.float32)
+        if self._scales is not None:
+            matrix = matrix * np.asarray(self._scales, dtype=np.float32)[:, None]
+        return matrix
+
+    @contextmanager
+    def _writer_lock(self) -> Iterator[None]:
+        """Hold this process's lock and the cross-process file lock around a read-modify-publish."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path / ".lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _encode(self, matrix: np.ndarray) -> tuple:
+        """Convert float32 rows into the on-disk dtype and optional per-row int8 scales."""
+        if self.dtype == "float16":
+            return matrix.astype(np.float16), None
+        if self.dtype == "int8":
+            peaks = np.abs(matrix).max(axis=1)
+            scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+            quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            return quantized, scales
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+
+    def _publish(self, matrix: np.ndarray, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Write a new version to disk and atomically point the manifest at it. Caller holds the writer lock."""
+        previous = self._version
+        version = max(previous + 1, time.time_ns())
+        encoded, scales = self._encode(matrix) if len(ids) else (np.zeros((0, 0), dtype=np.float32), None)
+
+        np.save(self.path / f"embeddings-{version}.npy", encoded)
+        if scales is not None:
+            np.save(self.path / f"scales-{version}.npy", scales)
+        records = {"ids": ids, "documents": documents, "metadatas": metadatas}
+        (self.path / f"records-{version}.json").write_text(json.dumps(records), encoding="utf-8")
+
+        manifest_tmp = self.path / f"manifest-{version}.tmp"
+        manifest_tmp.write_text(json.dumps({"version": version, "dtype": self.dtype, "count": len(ids)}), encoding="utf-8")
+        os.replace(manifest_tmp, self._manifest_path)
+
+        # Keep the previous version for readers that just read the old manifest; unlinking
+        # older ones is safe for readers that still hold their memory maps.
+        live = {str(version), str(previous)}
+        for stale in self.path.glob("*-*.*"):
+            if stale.suffix in {".npy", ".json"} and stale.stem.rsplit("-", 1)[-1] not in live:
+                stale.unlink(missing_ok=True)
+        self._manifest_mtime = None
+        self._refresh()
+
+    def _apply(
+        self,
+        upserts: Dict[str, Tuple[str, Dict[str, Any], np.ndarray]],
+        updates: Dict[str, Tuple[Optional[str], Optional[Dict[str, Any]], Optional[np.ndarray]]],
+        deletes: Set[str],
+    ) -> None:
+        """Delete, update, then upsert rows by ID and publish the result as one version.
+
+        ``upserts`` insert or replace whole rows; ``updates`` change the given fields of rows
+        that exist and ignore unknown IDs. Nothing is published when no row changes.
+        """
+        with self._writer_lock():
+            self._refresh()
+            keep = [index for index, chunk_id in enumerate(self._ids) if chunk_id not in deletes]
+            deleted = len(keep) < len(self._ids)
+            all_ids = [self._ids[index] for index in keep]
+            all_documents = [self._documents[index] for index in keep]
+            all_metadatas = [self._metadatas[index] for index in keep]
+            positions = {chunk_id: index for index, chunk_id in enumerate(all_ids)}
+            updates = {chunk_id: change for chunk_id, change in updates.items() if chunk_id in positions}
+            if not (deleted or updates or upserts):
+                return
+
+            matrix = self._dense_matrix()
+            if deleted:
+                matrix = matrix[keep] if keep else np.zeros((0, 0), dtype=np.float32)
+            replaced: Dict[int, np.ndarray] = {}
+            appended: List[np.ndarray] = []
+            for chunk_id, (document, metadata, vector) in updates.items():
+                index = positions[chunk_id]
+                if document is not None:
+                    all_documents[index] = document
+                if metadata is not None:
+                    all_metadatas[index] = metadata
+                if vector is not None:
+                    replaced[index] = vector
+            for chunk_id, (document, metadata, vector) in upserts.items():
+                index = positions.get(chunk_id)
+                if index is None:
+                    positions[chunk_id] = len(all_ids)
+                    all_ids.append(chunk_id)
+                    all_documents.append(document)
+                    all_metadatas.append(metadata)
+                    appended.append(vector)
+                else:
+                    all_documents[index] = document
+                    all_metadatas[index] = metadata
+                    replaced[index] = vector
+
+            if replaced:
+                matrix = np.array(matrix, dtype=np.float32)
+                matrix[list(replaced)] = np.vstack(list(replaced.values()))
+            if appended:
+                rows = np.vstack(appended)
+                matrix = np.vstack([matrix, rows]) if len(matrix) else rows
+            self._publish(matrix, all_ids, all_documents, all_metadatas)
+
+    def _vectors(
+        self, documents: Optional[List[str]], embeddings: Optional[Sequence[Sequence[float]]]
+    ) -> Optional[np.ndarray]:
+        """Return unit-normalized vectors from ``embeddings``, else embed ``documents``; None when neither is given."""
+        if embeddings is not None:
+            return self._normalize(np.asarray(embeddings, dtype=np.float32))
+        if documents is not None:
+            return self._normalize(self._embed(documents))
+        return None
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+    ) -> None:
+        """Insert or replace chunks by ID, embedding documents when vectors are not supplied."""
+        if ids:
+            self._apply(_upsert_rows(self, ids, documents, metadatas, embeddings), {}, set())
+
+    def update(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+    ) -> None:
+        """Change stored chunks by ID, ignoring unknown IDs; mirrors ``chromadb.Collection.update``.
+
+        Vectors are kept unless ``embeddings`` are supplied or ``documents`` change, in which
+        case the new documents are embedded.
+        """
+        if ids:
+            self._apply({}, _update_rows(self, ids, documents, metadatas, embeddings), set())
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+    ) -> None:
+        """Add new chunks; mirrors ``chromadb.Collection.add``."""
+        self.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove chunks by ID."""
+        if ids:
+            self._apply({}, {}, set(ids))
+
+    def batch(self) -> "IndexBatch":
+        """Return a writer that collects changes and publishes them together on ``commit()``."""
+        return IndexBatch(self)
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+    ) -> Dict[str, List[Any]]:
+        """Return stored chunks filtered by ID and simple metadata equality, like Chroma."""
+        self._refresh()
+        with self._lock:
+            wanted = set(ids) if ids is not None else None
+            selected = [
+                index
+                for index, chunk_id in enumerate(self._ids)
+                if (wanted is None or chunk_id in wanted)
+                and all(self._metadatas[index].get(key) == value for key, value in (where or {}).items())
+            ]
+            include = ["documents", "metadatas"] if include is None else include
+            result: Dict[str, List[Any]] = {"ids": [self._ids[index] for index in selected]}
+            if "documents" in include:
+                result["documents"] = [self._documents[index] for index in selected]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[index] for index in selected]
+        return result
+
+    def query(
+        self,
+        query_embeddings: Optional[Sequence[Sequence[float]]] = None,
+        query_texts: Optional[List[str]] = None,
+        n_results: int = 4,
+        **_: Any,
+    ) -> Dict[str, List[List[Any]]]:
+        """Return the top ``n_results`` chunks per query in Chroma's result layout."""
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts or [])
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+
+        self._refresh()
+        with self._lock:
+            matrix, scales = self._matrix, self._scales
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if matrix is None or not ids or n_results <= 0:
+            for key in results:
+                results[key] = [[] for _ in range(len(queries))]
+            return results
+
+        scores = self._score(queries, matrix, scales)
+        k = min(n_results, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results["ids"].append([ids[index] for index in ordered])
+            results["documents"].append([documents[index] for index in ordered])
+            results["metadatas"].append([metadatas[index] for index in ordered])
+            results["distances"].append([float(1.0 - row[index]) for index in ordered])
+        return results
+
+    @staticmethod
+    def _score(queries: np.ndarray, matrix: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        """Return cosine scores of every query against every stored row."""
+        if matrix.dtype == np.float32:
+            return queries @ matrix.T
+
+        scores = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start : start + len(block)] = queries @ block.T
+        if scales is not None:
+            scores *= np.asarray(scales, dtype=np.float32)[None, :]
+        return scores
+
+
+def _upsert_rows(
+    index: NumpyVectorIndex,
+    ids: List[str],
+    documents: List[str],
+    metadatas: Optional[List[Dict[str, Any]]],
+    embeddings: Optional[Sequence[Sequence[float]]],
+) -> Dict[str, Tuple[str, Dict[str, Any], np.ndarray]]:
+    """Return whole rows keyed by ID, embedding documents when vectors are not supplied."""
+    vectors = index._vectors(documents, embeddings)
+    metadatas = metadatas or [{} for _ in ids]
+    return {
+        chunk_id: (document, metadata, vector)
+        for chunk_id, document, metadata, vector in zip(ids, documents, metadatas, vectors)
+    }
+
+
+def _update_rows(
+    index: NumpyVectorIndex,
+    ids: List[str],
+    documents: Optional[List[str]],
+    metadatas: Optional[List[Dict[str, Any]]],
+    embeddings: Optional[Sequence[Sequence[float]]],
+) -> Dict[str, Tuple[Optional[str], Optional[Dict[str, Any]], Optional[np.ndarray]]]:
+    """Return partial rows keyed by ID; missing fields are None and stay as stored."""
+    vectors = index._vectors(documents, embeddings)
+    return {
+        chunk_id: (
+            documents[order] if documents is not None else None,
+            metadatas[order] if metadatas is not None else None,
+            vectors[order] if vectors is not None else None,
+        )
+        for order, chunk_id in enumerate(ids)
+    }
+
+
+class IndexBatch:
+    """Collect upserts, updates, and deletes for one index and publish them as a single version.
+
+    Vectors are embedded as changes arrive, but nothing is visible to readers until
+    :meth:`commit`, which costs one O(N) publish however many calls were collected.
+    Later calls for an ID override earlier ones, as if each had been applied in turn.
+    """
+
+    def __init__(self, index: NumpyVectorIndex) -> None:
+        """Start an empty batch for ``index``."""
+        self.index = index
+        self._upserts: Dict[str, Tuple[str, Dict[str, Any], np.ndarray]] = {}
+        self._updates: Dict[str, Tuple[Optional[str], Optional[Dict[str, Any]], Optional[np.ndarray]]] = {}
+        self._deletes: Set[str] = set()
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+    ) -> None:
+        """Queue whole rows to insert or replace."""
+        if not ids:
+            return
+        for chunk_id, row in _upsert_rows(self.index, ids, documents, metadatas, embeddings).items():
+            self._deletes.discard(chunk_id)
+            self._updates.pop(chunk_id, None)
+            self._upserts[chunk_id] = row
+
+    def update(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+    ) -> None:
+        """Queue field changes for stored or queued rows; deleted IDs are ignored."""
+        if not ids:
+            return
+        for chunk_id, change in _update_rows(self.index, ids, documents, metadatas, embeddings).items():
+            if chunk_id in self._deletes:
+                continue
+            queued = self._upserts.get(chunk_id) or self._updates.get(chunk_id)
+            if queued is not None:
+                change = tuple(new if new is not None else old for new, old in zip(change, queued))
+            target = self._upserts if chunk_id in self._upserts else self._updates
+            target[chunk_id] = change
+
+    def delete(self, ids: List[str]) -> None:
+        """Queue rows to remove."""
+        for chunk_id in ids:
+            self._upserts.pop(chunk_id, None)
+            self._updates.pop(chunk_id, None)
+            self._deletes.add(chunk_id)
+
+    def commit(self) -> None:
+        """Publish every queued change as one version and start over empty."""
+        upserts, updates, deletes = self._upserts, self._updates, self._deletes
+        self._upserts, self._updates, self._deletes = {}, {}, set()
+        if upserts or updates or deletes:
+            self.index._apply(upserts, updates, deletes)
+
+
+_indexes: Dict[str, NumpyVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(
+    name: str,
+    root: Path,
+    embedding_function: Optional[EmbeddingFunction] = None,
+    dtype: str = "float32",
+) -> NumpyVectorIndex:
+    """Return the process-wide index for a collection name, opening it on first use."""
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = NumpyVectorIndex(name, root, embedding_function=embedding_function, dtype=dtype)
+            _indexes[name] = index
+        return index
+
+
+def release_vector_index(name: str) -> None:
+    """Forget the cached index for a collection name; the next use reopens it from disk."""
+    with _indexes_lock:
+        _indexes.pop(name, None)
@@ -0,0 +1,124 @@
+"""Optional warm-up of lazily loaded resources and a cold-start timing report."""
+
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+
+def _process_start_time() -> Optional[float]:
+    """Return the wall-clock time this process started (Linux only), or None."""
+    try:
+        with open("/proc/uptime", encoding="utf-8") as handle:
+            uptime = float(handle.read().split()[0])
+        with open("/proc/self/stat", encoding="utf-8") as handle:
+            # Field 22 (starttime, ticks after boot) follows the parenthesized command name.
+            fields = handle.read().rsplit(")", 1)[1].split()
+        return time.time() - (uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Record when the app finished importing, how long startup hooks took, and warm-up costs."""
+
+    def __init__(self) -> None:
+        """Capture the process start time so later marks are measured from it."""
+        self.process_started = _process_start_time()
+        self.marks: Dict[str, float] = {}
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def _since_start(self) -> Optional[float]:
+        """Return seconds since the process started."""
+        return time.time() - self.process_started if self.process_started is not None else None
+
+    def mark(self, name: str) -> None:
+        """Record that a milestone (e.g. ``imported`` or ``ready``) was reached now."""
+        elapsed = self._since_start()
+        if elapsed is not None:
+            self.marks[name] = round(elapsed, 4)
+
+    def record(self, name: str, seconds: float, error: str = "") -> None:
+        """Record the duration of a startup or warm-up step."""
+        self.steps[name] = round(seconds, 4)
+        if error:
+            self.errors[name] = error
+
+    def report(self) -> Dict[str, object]:
+        """Return milestones (seconds since process start), step durations, and errors."""
+        return {
+            "seconds_since_process_start": self.marks,
+            "steps": self.steps,
+            "errors": self.errors,
+            "warmup_mode": settings.WARMUP_MODE,
+        }
+
+
+def _warm_embedder() -> None:
+    """Load the embedding model by embedding one string."""
+    from database import get_embedding_function
+
+    embedding_fn = get_embedding_function()
+    if embedding_fn is not None:
+        embedding_fn(["warm-up"])
+
+
+def _warm_vector_store() -> None:
+    """Open the knowledge collection."""
+    from database import get_collection
+
+    get_collection(settings.CHROMA_COLLECTION_NAME)
+
+
+def _warm_llm_client() -> None:
+    """Import the Groq client and build the pooled chat model of every routing tier."""
+    from chat import chat_service
+    from routing import model_router
+
+    for tier in model_router.tiers.values():
+        chat_service._get_model(tier=tier)
+
+
+def _warm_faq() -> None:
+    """Load the default tenant's curated FAQ and its precomputed embeddings."""
+    from faq import get_faq_index
+
+    get_faq_index()
+
+
+def _warm_analyzer() -> None:
+    """Compile the phrase automaton."""
+    from analyzer import message_analyzer
+
+    message_analyzer.analyze("warm-up")
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("embedder", _warm_embedder),
+    ("vector_store", _warm_vector_store),
+    ("llm_client", _warm_llm_client),
+    ("faq", _warm_faq),
+    ("analyzer", _warm_analyzer),
+]
+
+
+def warm_up() -> Dict[str, float]:
+    """Initialize every lazily loaded resource now and return each step's duration in seconds."""
+    timings: Dict[str, float] = {}
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        error = ""
+        try:
+            step()
+        except Exception as exc:
+            error = str(exc)
+            print(f"Warm-up step {name} failed: {exc}")
+        timings[name] = time.perf_counter() - started
+        startup_profile.record(f"warmup.{name}", timings[name], error)
+    startup_profile.mark("warmed_up")
+    return timings
+
+
+startup_profile = StartupProfile()
@@ -1,21 +1,52 @@
 """Twilio WhatsApp webhook routes."""
 
-import asyncio
+import time
 
-from fastapi import APIRouter, Form, HTTPException, Response
-from twilio.rest import Client
-from twilio.twiml.messaging_response import MessagingResponse
+from fastapi import APIRouter, BackgroundTasks, Form, HTTPException, Response
 
-from chat import chat_service
-from config import settings
+from chat import FALLBACK_REPLY, chat_service
+from coalesce import message_coalescer
+from delivery import OutboundMessage, delivery_queue
+from idempotency import IdempotencyInProgress, idempotency_store, message_key
+from metrics import ERRORS, WEBHOOK_SECONDS
+from scheduler import BUSY_REPLY, Overloaded
+from tenants import Tenant, tenant_registry
 
 
 router = APIRouter(prefix="/webhook/whatsapp", tags=["whatsapp"])
 
+# Empty TwiML (what ``str(MessagingResponse())`` renders), so the webhook never imports the Twilio SDK.
+EMPTY_TWIML = '<?xml version="1.0" encoding="UTF-8"?><Response />'
 
-def _get_twilio_client() -> Client:
-    """Create a Twilio REST client from configured credentials."""
-    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+async def _generate_and_deliver(tenant: Tenant, user_id: str, user_message: str) -> str:
+    """Generate a reply and queue it for delivery; returns "" when merged into an earlier message's reply."""
+    started = time.perf_counter()
+    parts = await message_coalescer.collect("whatsapp", tenant.scoped(user_id), user_message)
+    if parts is None:
+        return ""
+    try:
+        reply_text = await chat_service.aget_reply(user_id, "\n".join(parts), "whatsapp", parts=parts, tenant=tenant)
+    except Overloaded:
+        reply_text = BUSY_REPLY
+    except Exception as exc:
+        ERRORS.inc(stage="whatsapp_webhook")
+        print(f"WhatsApp webhook error: {exc}")
+        reply_text = FALLBACK_REPLY
+    WEBHOOK_SECONDS.observe(time.perf_counter() - started, platform="whatsapp")
+    delivery_queue.enqueue(OutboundMessage("twilio", user_id, reply_text, tenant_id=tenant.id))
+    return reply_text
+
+
+async def _reply_and_deliver(tenant: Tenant, user_id: str, user_message: str, message_sid: str = "") -> None:
+    """Reply once per Twilio MessageSid after the webhook has been acknowledged."""
+    try:
+        await idempotency_store.run_once(
+            message_key("twilio", message_sid),
+            lambda: _generate_and_deliver(tenant, user_id, user_message),
+        )
+    except IdempotencyInProgress:
+        print(f"WhatsApp message {message_sid} is still being processed elsewhere; duplicate skipped.")
 
 
 @router.get("")
@@ -28,34 +59,17 @@ async def verify_whatsapp_webhook() -> dict:
 
 
 @router.post("")
-async def receive_whatsapp_message(From: str = Form(...), Body: str = Form(...)) -> Response:
-    """Receive WhatsApp webhook payload, generate reply, and return TwiML."""
-    try:
-        user_id = From
-        user_message = Body.strip()
-        reply_text = await asyncio.to_thread(chat_service.get_reply, user_id, user_message, "whatsapp")
-
-        twilio_from = settings.TWILIO_WHATSAPP_NUMBER
-        twilio_to = From
-        print(f"Twilio WhatsApp send from_: {twilio_from}")
-        print(f"Twilio WhatsApp send to: {twilio_to}")
-
-        twiml = MessagingResponse()
-
-        try:
-            twilio_client = _get_twilio_client()
-            await asyncio.to_thread(
-                twilio_client.messages.create,
-                from_=twilio_from,
-                to=twilio_to,
-                body=reply_text,
-            )
-        except Exception as send_exc:
-            print(f"Twilio send failed: {send_exc}")
-
-        return Response(content=str(twiml), media_type="application/xml")
-    except Exception as exc:
-        print(f"WhatsApp webhook error: {exc}")
-        fallback = MessagingResponse()
-        fallback.message("Sorry, something went wrong. Please try again shortly.")
-        return Response(content=str(fallback), media_type="application/xml")
+async def receive_whatsapp_message(
+    background_tasks: BackgroundTasks,
+    From: str = Form(...),
+    Body: str = Form(...),
+    MessageSid: str = Form(""),
+    To: str = Form(""),
+) -> Response:
+    """Acknowledge a WhatsApp webhook with empty TwiML and reply through the delivery queue.
+
+    The business number the message was sent to (``To``) selects the tenant.
+    """
+    tenant = tenant_registry.by_whatsapp_number(To)
+    background_tasks.add_task(_reply_and_deliver, tenant, From, Body.strip(), MessageSid)
+    return Response(content=EMPTY_TWIML, media_type="application/xml")
@@ -0,0 +1,26 @@
+"""Shared pytest setup: put ``backend/`` on the import path with placeholder settings and temporary state."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+STATE_DIR = Path(tempfile.mkdtemp(prefix="chatbot-tests-"))
+
+os.environ.update({
+    "GROQ_API_KEY": "test",
+    "TWILIO_ACCOUNT_SID": "ACtest",
+    "TWILIO_AUTH_TOKEN": "test",
+    "TWILIO_WHATSAPP_NUMBER": "whatsapp:+10000000000",
+    "META_PAGE_ACCESS_TOKEN": "test",
+    "INSTAGRAM_ACCOUNT_ID": "17841400000000000",
+    "GOOGLE_SHEET_ID": "",
+    "VECTOR_BACKEND": "numpy",
+    "LEAD_SPOOL_PATH": str(STATE_DIR / "lead_spool.sqlite3"),
+    "DELIVERY_DEAD_LETTER_PATH": str(STATE_DIR / "dead_letters.sqlite3"),
+    "IDEMPOTENCY_SQLITE_PATH": str(STATE_DIR / "idempotency.sqlite3"),
+    "MEMORY_SQLITE_PATH": "",
+    "FAQ_STORE_PATH": str(STATE_DIR / "faq_store"),
+})
+sys.path.insert(0, str(BACKEND_DIR))
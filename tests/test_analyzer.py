@@ -0,0 +1,21 @@
+"""Tests for lead and intent extraction in ``analyzer``."""
+
+import pytest
+
+from analyzer import message_analyzer
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["I amended my order yesterday", "I amazingly love it", "I'mma buy", "My name isn't important"],
+)
+def test_name_cue_needs_whitespace_after_it(message):
+    assert "name" not in message_analyzer.analyze(message).lead
+
+
+@pytest.mark.parametrize(
+    "message, name",
+    [("I am John", "John"), ("my name is Sara Lee", "Sara Lee"), ("Hi, I'm Bob", "Bob"), ("I’m Ana", "Ana")],
+)
+def test_name_cue_reads_the_following_name(message, name):
+    assert message_analyzer.analyze(message).lead["name"] == name
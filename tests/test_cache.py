@@ -0,0 +1,74 @@
+"""Tests for the response cache's expiry, semantic matching, and invalidation."""
+
+import cache
+from cache import ResponseCache
+
+VECTORS = {
+    "what are your hours": [1.0, 0.0, 0.0],
+    "when are you open": [0.99, 0.1, 0.0],
+    "what time do you open": [0.97, 0.2, 0.0],
+    "where are you": [0.0, 1.0, 0.0],
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    monkeypatch.setattr(cache, "embed_texts", lambda texts: [VECTORS[text] for text in texts])
+    return ResponseCache(**kwargs), clock
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    responses, clock = _cache(monkeypatch, ttl_seconds=60.0)
+    responses.store("What are your hours?", "9 to 5")
+    clock.now += 30
+    assert responses.lookup("what are your hours") == "9 to 5"
+    clock.now += 31
+    assert responses.lookup("what are your hours") is None
+    assert responses.stats()["expirations"] == 1
+
+
+def test_semantic_match_stays_within_the_namespace(monkeypatch):
+    responses, _ = _cache(monkeypatch)
+    responses.store("what are your hours", "9 to 5", namespace="a")
+    assert responses.lookup("when are you open", namespace="a") == "9 to 5"
+    assert responses.lookup("when are you open", namespace="b") is None
+    assert responses.lookup("where are you", namespace="a") is None
+
+
+def test_semantic_match_skips_an_expired_best_entry(monkeypatch):
+    responses, clock = _cache(monkeypatch, ttl_seconds=60.0)
+    responses.store("what are your hours", "old answer")
+    clock.now += 50
+    responses.store("what time do you open", "new answer")
+    clock.now += 20
+    assert responses.lookup("when are you open") == "new answer"
+
+
+def test_invalidating_a_namespace_keeps_other_namespaces(monkeypatch):
+    responses, _ = _cache(monkeypatch)
+    before_a, before_b = responses.generation("a"), responses.generation("b")
+    responses.store("what are your hours", "A", namespace="a")
+    responses.store("what are your hours", "B", namespace="b")
+
+    responses.invalidate("a")
+    assert responses.lookup("what are your hours", namespace="a") is None
+    assert responses.lookup("what are your hours", namespace="b") == "B"
+
+    # A reply generated before its namespace was invalidated is not stored; others still are.
+    responses.store("where are you", "stale", generation=before_a, namespace="a")
+    responses.store("where are you", "fresh", generation=before_b, namespace="b")
+    assert responses.lookup("where are you", namespace="a") is None
+    assert responses.lookup("where are you", namespace="b") == "fresh"
+
+    responses.invalidate()
+    assert responses.generation("b") != before_b
+    assert responses.lookup("what are your hours", namespace="b") is None
@@ -0,0 +1,33 @@
+"""Tests for the async chat pipeline."""
+
+import asyncio
+import threading
+
+import chat
+from benchmarks.fakes import FakeChatModel
+from tenants import Tenant
+
+
+def test_async_reply_touches_memory_off_the_event_loop(monkeypatch):
+    tenant = Tenant("chat-offloop", {})
+    model = FakeChatModel(latency_ms=0, tokens_per_second=0, reply_tokens=6)
+    monkeypatch.setattr(chat.chat_service, "_get_model", lambda tenant=None, tier=None: model)
+    monkeypatch.setattr(type(chat.response_cache), "enabled", property(lambda self: False))
+    threads = []
+    for name in ("get_history", "get_summary", "add_message"):
+        original = getattr(chat.memory_manager, name)
+
+        def recording(*args, _original=original, **kwargs):
+            threads.append(threading.get_ident())
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(chat.memory_manager, name, recording)
+
+    async def reply():
+        text = await chat.chat_service._agenerate_reply(tenant, "user-1", "hello", "web")
+        return threading.get_ident(), text
+
+    loop_thread, text = asyncio.run(reply())
+    assert text.startswith("Thanks for asking")
+    assert threads and loop_thread not in threads
+    assert [item["role"] for item in chat.memory_manager.get_history(tenant.scoped("user-1"))] == ["user", "assistant"]
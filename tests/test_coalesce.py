@@ -0,0 +1,55 @@
+"""Tests for merging a user's rapid-fire messages."""
+
+import asyncio
+
+from coalesce import MessageCoalescer
+
+
+async def _send(coalescer, platform, user_id, message, delay=0.0):
+    await asyncio.sleep(delay)
+    return await coalescer.collect(platform, user_id, message)
+
+
+def test_messages_within_the_idle_window_are_merged_into_the_first_run():
+    coalescer = MessageCoalescer("whatsapp", idle_ms=80, max_wait_ms=1000)
+
+    async def main():
+        return await asyncio.gather(
+            _send(coalescer, "whatsapp", "u1", "hi"),
+            _send(coalescer, "whatsapp", "u1", "are you open", 0.01),
+            _send(coalescer, "whatsapp", "u1", "today?", 0.02),
+            _send(coalescer, "whatsapp", "u2", "hello", 0.01),
+            _send(coalescer, "whatsapp", "u1", "thanks", 0.3),
+        )
+
+    assert asyncio.run(main()) == [["hi", "are you open", "today?"], None, None, ["hello"], ["thanks"]]
+    stats = coalescer.stats()
+    assert (stats["bursts"], stats["merged"], stats["open_bursts"]) == (3, 2, 0)
+
+
+def test_burst_closes_at_max_batch_and_max_wait():
+    coalescer = MessageCoalescer("whatsapp:100", max_wait_ms=80, max_batch=2)
+
+    async def full_batch():
+        return await asyncio.gather(
+            _send(coalescer, "whatsapp", "u1", "a"),
+            _send(coalescer, "whatsapp", "u1", "b"),
+            _send(coalescer, "whatsapp", "u1", "c"),
+        )
+
+    # The second message fills the batch, so the third starts a new burst.
+    assert asyncio.run(full_batch()) == [["a", "b"], None, ["c"]]
+
+    # Each message keeps the 250 ms idle window open, but max_wait ends the burst at 150 ms.
+    coalescer = MessageCoalescer("whatsapp:250", max_wait_ms=150, max_batch=10)
+
+    async def chatty():
+        return await asyncio.gather(*(_send(coalescer, "whatsapp", "u1", f"m{n}", n * 0.06) for n in range(4)))
+
+    assert asyncio.run(chatty()) == [["m0", "m1", "m2"], None, None, ["m3"]]
+
+
+def test_platforms_without_a_window_are_not_delayed():
+    coalescer = MessageCoalescer("whatsapp")
+    assert not coalescer.enabled("web")
+    assert asyncio.run(coalescer.collect("web", "u1", "hi")) == ["hi"]
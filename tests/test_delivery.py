@@ -0,0 +1,114 @@
+"""Tests for retries, ordering, and dead-lettering in the outbound delivery queue."""
+
+import asyncio
+
+from delivery import DeliveryError, DeliveryQueue, OutboundMessage, Provider
+
+
+class ScriptedProvider(Provider):
+    """Provider that fails each text's first ``failures[text]`` sends, asking to retry after ``retry_after``."""
+
+    name = "fake"
+
+    def __init__(self, failures=None, retryable=True, retry_after=None):
+        super().__init__("http://fake.invalid", rate_per_second=1000, burst=1000)
+        self.failures = dict(failures or {})
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.sent = []
+
+    async def send(self, message):
+        if self.failures.get(message.text, 0) > 0:
+            self.failures[message.text] -= 1
+            raise DeliveryError(f"fake error for {message.text}", retryable=self.retryable, retry_after=self.retry_after)
+        self.sent.append((message.recipient, message.text))
+
+    async def _post(self, message):
+        raise AssertionError("send() is overridden and never posts")
+
+
+def _queue(tmp_path, provider, **options):
+    options.setdefault("backoff_base", 0.2)
+    options.setdefault("backoff_max", 0.2)
+    return DeliveryQueue({"fake": provider}, tmp_path / "dead_letters.sqlite3", **options)
+
+
+def test_backoff_does_not_hold_a_worker(tmp_path):
+    provider = ScriptedProvider({"a1": 1}, retry_after=0.2)
+    queue = _queue(tmp_path, provider, workers=1, max_attempts=3)
+
+    async def main():
+        queue.enqueue(OutboundMessage("fake", "alice", "a1"))
+        queue.enqueue(OutboundMessage("fake", "bob", "b1"))
+        await asyncio.sleep(0.05)
+        assert provider.sent == [("bob", "b1")]
+        assert queue.stats()["waiting_to_retry"] == 1
+        await asyncio.wait_for(queue.join(), 5)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert provider.sent == [("bob", "b1"), ("alice", "a1")]
+    assert queue.stats()["retries"] == 1
+
+
+def test_messages_to_one_recipient_stay_in_order_across_retries(tmp_path):
+    provider = ScriptedProvider({"a1": 2, "a3": 1})
+    queue = _queue(tmp_path, provider, workers=4, max_attempts=5, backoff_base=0.02, backoff_max=0.02)
+
+    async def main():
+        for text in ("a1", "a2", "a3", "a4"):
+            queue.enqueue(OutboundMessage("fake", "alice", text))
+        queue.enqueue(OutboundMessage("fake", "bob", "b1"))
+        await asyncio.wait_for(queue.join(), 5)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert [text for recipient, text in provider.sent if recipient == "alice"] == ["a1", "a2", "a3", "a4"]
+    assert queue.stats()["held_behind_recipient"] == 0
+
+
+def test_exhausted_and_permanent_failures_are_dead_lettered(tmp_path):
+    provider = ScriptedProvider({"a1": 9, "a2": 0}, retryable=True)
+    queue = _queue(tmp_path, provider, max_attempts=2, backoff_base=0.01, backoff_max=0.01)
+
+    async def main():
+        queue.enqueue(OutboundMessage("fake", "alice", "a1"))
+        queue.enqueue(OutboundMessage("fake", "alice", "a2"))
+        await asyncio.wait_for(queue.join(), 5)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert provider.sent == [("alice", "a2")]
+    letters = queue.dead_letters()
+    assert [(letter["text"], letter["attempts"]) for letter in letters] == [("a1", 2)]
+
+
+def test_stop_dead_letters_parked_and_held_messages(tmp_path):
+    provider = ScriptedProvider({"a1": 1}, retry_after=10)
+    queue = _queue(tmp_path, provider, backoff_base=10, backoff_max=10)
+
+    async def main():
+        queue.enqueue(OutboundMessage("fake", "alice", "a1"))
+        queue.enqueue(OutboundMessage("fake", "alice", "a2"))
+        await asyncio.sleep(0.05)
+        await queue.stop(timeout=0.05)
+
+    asyncio.run(main())
+    assert provider.sent == []
+    assert sorted(letter["text"] for letter in queue.dead_letters()) == ["a1", "a2"]
+    assert queue.stats()["dead_lettered"] == 2
+
+
+def test_retry_dead_letters_requeues_them(tmp_path):
+    provider = ScriptedProvider()
+    queue = _queue(tmp_path, provider)
+    queue._dead_letter([OutboundMessage("fake", "alice", "a1")], "earlier outage")
+
+    async def main():
+        assert await queue.retry_dead_letters() == 1
+        await asyncio.wait_for(queue.join(), 5)
+        await queue.stop()
+
+    asyncio.run(main())
+    assert provider.sent == [("alice", "a1")]
+    assert queue.dead_letters() == []
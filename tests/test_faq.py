@@ -0,0 +1,42 @@
+"""Tests for the curated FAQ fast path."""
+
+import asyncio
+import json
+import threading
+
+import faq
+from cache import response_cache
+from chat import chat_service
+from tenants import Tenant
+
+
+def _write_faq(tenant_id, answer, questions):
+    entry = {"answer": answer, "questions": questions, "normalized": [response_cache.normalize(q) for q in questions]}
+    faq._faq_root.mkdir(parents=True, exist_ok=True)
+    (faq._faq_root / f"{tenant_id}.json").write_text(json.dumps([entry]), encoding="utf-8")
+
+
+def test_async_match_loads_the_index_off_the_event_loop(monkeypatch):
+    tenant = Tenant("faq-offloop", {})
+    _write_faq(tenant.id, "We open at 9.", ["When do you open?"])
+    loads = []
+    original = faq.FaqIndex._load
+
+    def recording_load(self):
+        loads.append(threading.get_ident())
+        original(self)
+
+    monkeypatch.setattr(faq.FaqIndex, "_load", recording_load)
+
+    async def match():
+        return threading.get_ident(), await chat_service._amatch_faq("when do you open", tenant)
+
+    loop_thread, answer = asyncio.run(match())
+    assert answer == "We open at 9."
+    assert loads and loop_thread not in loads
+
+
+def test_tenant_without_faq_falls_through():
+    tenant = Tenant("faq-empty", {})
+    assert chat_service._match_faq("when do you open", tenant) is None
+    assert asyncio.run(chat_service._amatch_faq("when do you open", tenant)) is None
@@ -0,0 +1,94 @@
+"""Tests for duplicate handling in the idempotency stores."""
+
+import asyncio
+import threading
+
+import pytest
+
+from idempotency import IdempotencyInProgress, IdempotencyStore, SqliteIdempotencyStore
+
+
+def test_duplicates_share_the_first_result():
+    store = IdempotencyStore()
+    runs = []
+
+    async def produce():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "reply"
+
+    async def main():
+        return await asyncio.gather(store.run_once("k", produce), store.run_once("k", produce))
+
+    assert asyncio.run(main()) == [("reply", False), ("reply", True)]
+    assert len(runs) == 1
+
+
+def test_duplicate_gives_up_with_in_progress():
+    store = IdempotencyStore(wait_timeout=0.01)
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "reply"
+
+    async def main():
+        first = asyncio.create_task(store.run_once("k", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(IdempotencyInProgress):
+            await store.run_once("k", slow)
+        return await first
+
+    assert asyncio.run(main()) == ("reply", False)
+
+
+def test_timeout_inside_the_pipeline_is_not_reported_as_in_progress():
+    store = IdempotencyStore(wait_timeout=1.0)
+
+    async def timing_out():
+        await asyncio.sleep(0.01)
+        raise asyncio.TimeoutError("model took too long")
+
+    async def main():
+        results = await asyncio.gather(
+            store.run_once("k", timing_out), store.run_once("k", timing_out), return_exceptions=True
+        )
+        return [type(result) for result in results]
+
+    assert asyncio.run(main()) == [asyncio.TimeoutError, asyncio.TimeoutError]
+
+
+def test_sqlite_duplicate_in_another_worker_gives_up_with_in_progress(tmp_path):
+    owner = SqliteIdempotencyStore(tmp_path / "keys.sqlite3")
+    other = SqliteIdempotencyStore(tmp_path / "keys.sqlite3", wait_timeout=0.05, poll_interval=0.01)
+    assert owner._claim("k")
+
+    async def produce():
+        return "reply"
+
+    with pytest.raises(IdempotencyInProgress):
+        asyncio.run(other.run_once("k", produce))
+
+
+def test_sqlite_store_queries_off_the_event_loop(tmp_path, monkeypatch):
+    store = SqliteIdempotencyStore(tmp_path / "keys.sqlite3")
+    threads = []
+    for name in ("_get_result", "_claim", "_store_result"):
+        original = getattr(store, name)
+
+        def recording(*args, _original=original):
+            threads.append(threading.get_ident())
+            return _original(*args)
+
+        monkeypatch.setattr(store, name, recording)
+
+    async def produce():
+        return "reply"
+
+    async def main():
+        first = await store.run_once("k", produce)
+        second = await store.run_once("k", produce)
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert (first, second) == (("reply", False), ("reply", True))
+    assert len(threads) == 4 and loop_thread not in threads
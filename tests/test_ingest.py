@@ -0,0 +1,64 @@
+"""Tests for incremental re-ingestion of a source document."""
+
+import numpy as np
+
+from ingest import IncrementalIngest
+from vector_index import NumpyVectorIndex
+
+
+def _embed(texts):
+    return [np.frombuffer(text.encode("utf-8").ljust(16, b" ")[:16], dtype=np.uint8).astype(np.float32) for text in texts]
+
+
+def test_reingest_reuses_chunks_and_restamps_their_version(tmp_path):
+    index = NumpyVectorIndex("docs", tmp_path, embedding_function=_embed)
+    first = IncrementalIngest(index, "faq.txt", version="1")
+    assert first.add(["hours", "address"]) == {"embedded": 2, "reused": 0, "duplicates": 0}
+    first.finish()
+    before = index.query(query_embeddings=_embed(["hours"]), n_results=1)
+
+    second = IncrementalIngest(index, "faq.txt", version="2")
+    assert second.add(["hours", "returns"]) == {"embedded": 1, "reused": 1, "duplicates": 0}
+    assert second.finish() == {"embedded": 1, "reused": 1, "duplicates": 0, "deleted": 1}
+
+    stored = index.get(where={"source": "faq.txt"})
+    assert sorted(stored["documents"]) == ["hours", "returns"]
+    assert {metadata["version"] for metadata in stored["metadatas"]} == {"2"}
+    assert index.query(query_embeddings=_embed(["hours"]), n_results=1)["distances"] == before["distances"]
+
+
+def test_repeated_chunks_are_counted_as_duplicates(tmp_path):
+    index = NumpyVectorIndex("docs", tmp_path, embedding_function=_embed)
+    session = IncrementalIngest(index, "faq.txt", version="1")
+    assert session.add(["hours", "hours"]) == {"embedded": 1, "reused": 0, "duplicates": 1}
+    assert session.add(["hours", "address"]) == {"embedded": 1, "reused": 0, "duplicates": 1}
+    summary = session.finish()
+
+    assert summary == {"embedded": 2, "reused": 0, "duplicates": 2, "deleted": 0}
+    assert index.count() == summary["embedded"] + summary["reused"]
+
+
+def test_reused_chunks_are_restamped_once_per_document():
+    class RecordingCollection:
+        def __init__(self, ids):
+            self.ids = ids
+            self.updates = []
+
+        def get(self, where=None, include=None):
+            return {"ids": self.ids}
+
+        def upsert(self, ids, documents, metadatas):
+            pass
+
+        def update(self, ids, metadatas):
+            self.updates.append(list(ids))
+
+    chunks = ["hours", "address", "returns"]
+    collection = RecordingCollection([IncrementalIngest.chunk_id("faq.txt", chunk) for chunk in chunks])
+    session = IncrementalIngest(collection, "faq.txt", version="2")
+    for chunk in chunks:
+        assert session.add([chunk])["reused"] == 1
+    assert not collection.updates
+
+    session.finish()
+    assert collection.updates == [[IncrementalIngest.chunk_id("faq.txt", chunk) for chunk in chunks]]
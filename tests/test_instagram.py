@@ -0,0 +1,113 @@
+"""Tests for Instagram webhook parsing and reply delivery."""
+
+import asyncio
+
+import pytest
+
+import instagram
+from chat import FALLBACK_REPLY
+
+ACCOUNT = "17841400000000000"
+
+
+def _messaging(sender, mid, text=None, **message):
+    if text is not None:
+        message["text"] = text
+    return {"sender": {"id": sender}, "recipient": {"id": ACCOUNT}, "message": {"mid": mid, **message}}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record replies instead of generating and delivering them."""
+    outbox = []
+    calls = []
+
+    async def aget_reply(user_id, message, platform, parts=None, tenant=None):
+        calls.append((user_id, message))
+        return f"re: {message}"
+
+    monkeypatch.setattr(instagram.chat_service, "aget_reply", aget_reply)
+    monkeypatch.setattr(instagram.delivery_queue, "enqueue", lambda message: outbox.append(message))
+    return outbox, calls
+
+
+def test_extracts_every_message_across_entries():
+    payload = {
+        "object": "instagram",
+        "entry": [
+            {"id": ACCOUNT, "messaging": [_messaging("u1", "m1", "hi"), _messaging("u2", "m2", " price? ")]},
+            {"id": ACCOUNT, "messaging": [_messaging("u1", "m3", "still there?")]},
+        ],
+    }
+    events = instagram.extract_message_events(payload)
+    assert [(event.sender_id, event.mid, event.text) for event in events] == [
+        ("u1", "m1", "hi"),
+        ("u2", "m2", "price?"),
+        ("u1", "m3", "still there?"),
+    ]
+    assert {event.account_id for event in events} == {ACCOUNT}
+
+
+def test_skips_echoes_receipts_and_non_text_events():
+    payload = {
+        "entry": [
+            {
+                "id": ACCOUNT,
+                "messaging": [
+                    _messaging("u1", "m1", "our own reply", is_echo=True),
+                    _messaging(ACCOUNT, "m2", "sent from the account"),
+                    {"sender": {"id": "u1"}, "recipient": {"id": ACCOUNT}, "read": {"mid": "m0"}},
+                    {"sender": {"id": "u1"}, "recipient": {"id": ACCOUNT}, "delivery": {"mids": ["m0"]}},
+                    {"sender": {"id": "u1"}, "recipient": {"id": ACCOUNT}, "reaction": {"mid": "m0"}},
+                    _messaging("u1", "m3", attachments=[{"type": "image"}]),
+                    _messaging("u1", "m4", "   "),
+                    _messaging("u1", "m5", "deleted", is_deleted=True),
+                    "not an object",
+                ],
+            },
+            "not an entry",
+        ]
+    }
+    assert instagram.extract_message_events(payload) == []
+    assert instagram.extract_message_events(["not", "a", "dict"]) == []
+
+
+def test_duplicate_mids_are_answered_once(sent):
+    outbox, calls = sent
+    events = instagram.extract_message_events(
+        {"entry": [{"id": ACCOUNT, "messaging": [_messaging("u1", "dup-1", "hello"), _messaging("u1", "dup-1", "hello")]}]}
+    )
+    asyncio.run(instagram.process_events(events))
+    asyncio.run(instagram.process_events(events[:1]))
+
+    assert calls == [("u1", "hello")]
+    assert [message.text for message in outbox] == ["re: hello"]
+
+
+def test_each_sender_is_answered_in_order(sent):
+    outbox, calls = sent
+    events = instagram.extract_message_events(
+        {
+            "entry": [
+                {"id": ACCOUNT, "messaging": [_messaging("a", "order-1", "one"), _messaging("b", "order-2", "uno")]},
+                {"id": ACCOUNT, "messaging": [_messaging("a", "order-3", "two")]},
+            ]
+        }
+    )
+    asyncio.run(instagram.process_events(events))
+
+    assert [text for user, text in calls if user == "a"] == ["one", "two"]
+    assert sorted(message.recipient for message in outbox) == ["a", "a", "b"]
+
+
+def test_failed_reply_sends_the_fallback(sent, monkeypatch):
+    outbox, _ = sent
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(instagram.chat_service, "aget_reply", broken)
+    events = instagram.extract_message_events({"entry": [{"id": ACCOUNT, "messaging": [_messaging("u1", "fail-1", "hi")]}]})
+    asyncio.run(instagram.process_events(events))
+
+    assert [message.text for message in outbox] == [FALLBACK_REPLY]
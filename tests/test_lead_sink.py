@@ -0,0 +1,69 @@
+"""Tests for the spooled lead sink in ``lead_sink``."""
+
+import threading
+
+from lead_sink import LeadSink
+
+
+class RecordingWriter:
+    """Sheets writer stand-in that records rows and fails for chosen sheets."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def __call__(self, sheet_id, rows):
+        if sheet_id in self.failing:
+            raise RuntimeError(f"sheet {sheet_id} unavailable")
+        with self._lock:
+            self.rows.extend((sheet_id, row[0]) for row in rows)
+
+
+def _sink(path, writer, **options):
+    """Return a sink flushed only by the test, not by its background thread."""
+    sink = LeadSink(path, writer=writer, **options)
+    sink.start = lambda: None
+    return sink
+
+
+def test_flushers_sharing_a_spool_write_each_row_once(tmp_path):
+    writer = RecordingWriter()
+    sinks = [_sink(tmp_path / "spool.sqlite3", writer, batch_size=7) for _ in range(4)]
+    for index in range(200):
+        sinks[0].enqueue("sheet", [str(index)])
+
+    def drain(sink):
+        while sink.flush():
+            pass
+
+    threads = [threading.Thread(target=drain, args=(sink,)) for sink in sinks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(int(value) for _, value in writer.rows) == list(range(200))
+    assert sinks[0].queue_depth() == 0
+
+
+def test_failing_sheet_does_not_block_other_sheets(tmp_path):
+    writer = RecordingWriter(failing={"broken"})
+    sink = _sink(tmp_path / "spool.sqlite3", writer, batch_size=5)
+    for index in range(10):
+        sink.enqueue("broken", [f"b{index}"])
+    for index in range(3):
+        sink.enqueue("healthy", [f"h{index}"])
+
+    assert sink.flush() == 0
+    assert sink.flush() == 3
+    assert [value for _, value in writer.rows] == ["h0", "h1", "h2"]
+    assert sink.queue_depth() == 10
+    assert sink.stats()["backing_off_sheets"] == {"broken": 1}
+
+
+def test_leads_without_a_sheet_are_not_spooled(tmp_path):
+    sink = _sink(tmp_path / "spool.sqlite3", RecordingWriter())
+    sink.enqueue("", ["lead"])
+    assert sink.queue_depth() == 0
+    assert sink.stats()["skipped_no_sheet"] == 1
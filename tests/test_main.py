@@ -0,0 +1,48 @@
+"""Tests for HTTP status codes returned by the API routes."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from jobs import IngestJob
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_chat_timeout_inside_the_pipeline_is_a_server_error(client, monkeypatch):
+    async def timing_out(*args, **kwargs):
+        raise asyncio.TimeoutError("model took too long")
+
+    monkeypatch.setattr(main.chat_service, "aget_reply", timing_out)
+    response = client.post("/chat/message", json={"user_id": "u1", "message": "hi"}, headers={"Idempotency-Key": "t-1"})
+    assert response.status_code == 500
+
+
+def test_chat_duplicate_still_in_progress_is_a_conflict(client, monkeypatch):
+    async def in_progress(key, produce):
+        raise main.IdempotencyInProgress(key)
+
+    monkeypatch.setattr(main.idempotency_store, "run_once", in_progress)
+    response = client.post("/chat/message", json={"user_id": "u1", "message": "hi"}, headers={"Idempotency-Key": "t-2"})
+    assert response.status_code == 409
+
+
+@pytest.mark.parametrize("status, expected", [("completed", 200), ("failed", 500), ("cancelled", 503)])
+def test_ingest_wait_reports_the_job_outcome(client, monkeypatch, status, expected):
+    def submit(filename, file_path, tenant):
+        Path(file_path).unlink()
+        job = IngestJob(filename, file_path, tenant)
+        job.status = status
+        job.done.set()
+        return job
+
+    monkeypatch.setattr(main.ingest_jobs, "submit", submit)
+    response = client.post("/ingest?wait=true", files={"file": ("notes.txt", b"Open 9 to 5.", "text/plain")})
+    assert response.status_code == expected
+    assert response.json()["status"] == status
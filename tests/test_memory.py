@@ -0,0 +1,38 @@
+"""Tests for TTL expiry in the conversation memory backends."""
+
+import time
+
+from memory import MemoryManager, SqliteMemoryManager
+
+
+def test_sqlite_expired_conversation_starts_over(tmp_path):
+    memory = SqliteMemoryManager(tmp_path / "memory.sqlite3", max_messages=2, ttl_seconds=60)
+    for turn in range(4):
+        memory.add_message("alice", "user", f"message {turn}")
+    assert memory.get_summary("alice")
+    memory._conn.execute("UPDATE memory_users SET last_seen = ?", (time.time() - 120,))
+
+    memory.add_message("alice", "user", "back again")
+
+    assert memory.get_history("alice") == [{"role": "user", "content": "back again"}]
+    assert memory.get_summary("alice") == ""
+    assert memory.expirations == 1
+
+
+def test_sqlite_live_conversation_keeps_its_history(tmp_path):
+    memory = SqliteMemoryManager(tmp_path / "memory.sqlite3", max_messages=4, ttl_seconds=60)
+    memory.add_message("alice", "user", "hello")
+    memory.add_message("alice", "assistant", "hi")
+    assert [message["content"] for message in memory.get_history("alice")] == ["hello", "hi"]
+    assert memory.expirations == 0
+
+
+def test_in_memory_summary_expires_with_the_conversation():
+    memory = MemoryManager(max_messages=1, ttl_seconds=60)
+    memory.add_message("alice", "user", "first")
+    memory.add_message("alice", "user", "second")
+    assert memory.get_summary("alice")
+    memory._memories["alice"].last_seen -= 120
+
+    assert memory.get_summary("alice") == ""
+    assert memory.expirations == 1
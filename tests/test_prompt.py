@@ -0,0 +1,53 @@
+"""Tests for token-budgeted prompt assembly and rolling summaries."""
+
+from memory import fold_into_summary
+from prompt import PromptAssembler, dedupe_chunks, estimate_tokens
+
+
+def _history(count, words=20):
+    return [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": f"turn {index} " + "word " * words}
+        for index in range(count)
+    ]
+
+
+def test_overlapping_and_contained_chunks_are_deduplicated():
+    shared = "Deliveries leave the warehouse every weekday morning."
+    first = "Orders over $50 ship free. " + shared
+    second = shared + " Weekend orders ship on Monday."
+    assert dedupe_chunks([first, first, "ship free", second]) == [first, "Weekend orders ship on Monday."]
+
+
+def test_prompt_fits_the_budget_and_keeps_the_newest_turns():
+    assembler = PromptAssembler(token_budget=400, max_context_tokens=150, max_summary_tokens=40)
+    history = _history(20)
+    chunks = [f"Fact {index}: " + "detail " * 60 for index in range(5)]
+    message = "When do you open?"
+
+    prompt, recent = assembler.assemble(chunks, "Customer: asked about refunds", history, message, "Acme", "warm")
+
+    used = estimate_tokens(prompt) + estimate_tokens(message) + sum(estimate_tokens(item["content"]) for item in recent)
+    assert used <= 400
+    assert "Acme" in prompt and "Fact 0" in prompt and "Fact 4" not in prompt
+    assert "Earlier in this conversation:\nCustomer: asked about refunds" in prompt
+    assert recent and recent == history[-len(recent):]
+    assert len(recent) < len(history)
+
+
+def test_context_is_dropped_last_when_history_is_long():
+    assembler = PromptAssembler(token_budget=300, max_context_tokens=100, max_summary_tokens=50)
+    prompt, recent = assembler.assemble(["Opening hours are 9 to 5."], "", _history(50), "hours?")
+    assert "Opening hours are 9 to 5." in prompt
+    assert "Earlier in this conversation" not in prompt
+    assert 0 < len(recent) < 50
+
+
+def test_summary_keeps_its_newest_lines_within_the_limit():
+    summary = ""
+    for index in range(40):
+        summary = fold_into_summary(summary, "user", f"question {index} " + "about the order status " * 3, 300)
+    lines = summary.splitlines()
+    assert len(summary) <= 300
+    assert lines[-1].startswith("Customer: question 39")
+    assert not any(line.startswith("Customer: question 0 ") for line in lines)
+    assert fold_into_summary(summary, "assistant", "   ") == summary
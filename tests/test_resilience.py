@@ -0,0 +1,183 @@
+"""Tests for deadlines, retries, hedging, and circuit breaking in ``resilience``."""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeLLMError
+from resilience import CLOSED, HALF_OPEN, OPEN, Deadline, LLMGuard, LLMUnavailable
+
+MESSAGES = [HumanMessage(content="What are your hours?")]
+
+
+class StatusError(Exception):
+    """Provider error carrying an HTTP status, like the Groq SDK's."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class ScriptedModel:
+    """Fake LLM whose calls follow a script of delays (seconds) and exceptions."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        await asyncio.sleep(step)
+        return f"reply {self.calls}"
+
+    def invoke(self, messages):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        return f"reply {self.calls}"
+
+    async def astream(self, messages):
+        yield await self.ainvoke(messages)
+
+
+def _guard(**options):
+    options.setdefault("backoff_base", 0.001)
+    options.setdefault("backoff_max", 0.001)
+    return LLMGuard(**options)
+
+
+def test_transient_errors_are_retried():
+    guard = _guard(max_attempts=3)
+    model = ScriptedModel(StatusError(503), StatusError(429), 0)
+    assert asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5))) == "reply 3"
+    assert guard.counters["retries"] == 2
+    assert guard.breaker("m").state == CLOSED
+
+
+def test_blocking_calls_are_retried():
+    guard = _guard(max_attempts=2)
+    model = ScriptedModel(ConnectionError("reset"), 0)
+    assert guard.call("m", lambda: model.invoke(MESSAGES), Deadline(5)) == "reply 2"
+
+
+def test_retries_stop_after_max_attempts():
+    guard = _guard(max_attempts=2, failure_threshold=10)
+    model = FakeChatModel(latency_ms=1, tokens_per_second=0, error_rate=1.0)
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert model.calls == 2
+
+
+def test_non_transient_error_is_not_retried_and_leaves_breaker_unchanged():
+    guard = _guard(failure_threshold=5)
+    breaker = guard.breaker("m")
+    breaker.record_failure()
+    breaker.record_failure()
+    model = ScriptedModel(StatusError(400))
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert model.calls == 1
+    assert (breaker.state, breaker.failures) == (CLOSED, 2)
+
+
+def test_breaker_opens_on_sustained_failures_and_fails_fast():
+    guard = _guard(max_attempts=1, failure_threshold=3, reset_seconds=60)
+    model = FakeChatModel(latency_ms=1, tokens_per_second=0, error_rate=1.0)
+    for _ in range(3):
+        with pytest.raises(LLMUnavailable):
+            asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert guard.breaker("m").state == OPEN
+
+    started = time.perf_counter()
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    with pytest.raises(LLMUnavailable):
+        guard.ensure_available("m")
+    assert time.perf_counter() - started < 0.05
+    assert model.calls == 3
+    assert guard.counters["circuit_rejections"] == 2
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    guard = _guard(max_attempts=1, failure_threshold=1, reset_seconds=0.02)
+    model = FakeChatModel(latency_ms=1, tokens_per_second=0, error_rate=1.0)
+    breaker = guard.breaker("m")
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert breaker.state == OPEN
+
+    time.sleep(0.03)
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert (breaker.state, breaker.opens) == (OPEN, 2)
+
+    time.sleep(0.03)
+    model.error_rate = 0.0
+    asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_with_non_transient_error_admits_another_probe():
+    guard = _guard(max_attempts=1, failure_threshold=1, reset_seconds=0.01)
+    breaker = guard.breaker("m")
+    breaker.record_failure()
+    time.sleep(0.02)
+    model = ScriptedModel(StatusError(401), 0)
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5)))
+    assert breaker.state == HALF_OPEN
+    assert asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5))) == "reply 2"
+    assert breaker.state == CLOSED
+
+
+def test_deadline_bounds_a_stalled_call():
+    guard = _guard(max_attempts=3)
+    model = FakeChatModel(latency_ms=1000, tokens_per_second=0)
+    started = time.perf_counter()
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(0.05)))
+    assert time.perf_counter() - started < 0.5
+    assert guard.counters["deadline_exceeded"] == 1
+
+
+def test_exhausted_deadline_is_not_blamed_on_the_model():
+    guard = _guard(failure_threshold=1)
+    model = FakeChatModel(latency_ms=1, tokens_per_second=0)
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(0)))
+    assert model.calls == 0
+    assert guard.breaker("m").state == CLOSED
+
+
+def test_hedged_request_beats_a_stalled_one():
+    guard = _guard(hedge=True, hedge_min_delay=0.01)
+    for _ in range(20):
+        guard._window("m").observe(0.01)
+    model = ScriptedModel(2.0, 0.0)
+    started = time.perf_counter()
+    assert asyncio.run(guard.acall("m", lambda: model.ainvoke(MESSAGES), Deadline(5))) == "reply 2"
+    assert time.perf_counter() - started < 0.5
+    assert (guard.counters["hedges"], guard.counters["hedge_wins"]) == (1, 1)
+
+
+def test_no_hedge_before_latency_is_measured():
+    guard = _guard(hedge=True, hedge_min_delay=0.01)
+    assert guard.hedge_delay("m") is None
+
+
+def test_stream_retries_before_the_first_chunk():
+    guard = _guard(max_attempts=2)
+    model = ScriptedModel(FakeLLMError("boom"), 0)
+
+    async def collect():
+        return [chunk async for chunk in guard.astream("m", lambda: model.astream(MESSAGES), Deadline(5))]
+
+    assert asyncio.run(collect()) == ["reply 2"]
+    assert guard.counters["retries"] == 1
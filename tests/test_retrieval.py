@@ -0,0 +1,70 @@
+"""Tests for micro-batched retrieval."""
+
+import asyncio
+
+import retrieval
+from retrieval import RetrievalBatcher
+
+
+class Collection:
+    def __init__(self, name):
+        self.name = name
+
+
+def _fake_batch(calls):
+    def query_scored_batch(collection, texts, n):
+        calls.append((collection.name, list(texts), n))
+        return [[(f"{text}-{rank}", 1.0 - rank / 10) for rank in range(n)] for text in texts]
+
+    return query_scored_batch
+
+
+def test_concurrent_queries_share_one_batch_and_get_their_own_results(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retrieval, "query_scored_batch", _fake_batch(calls))
+    batcher = RetrievalBatcher(window_ms=20)
+    docs = Collection("docs")
+
+    async def main():
+        return await asyncio.gather(
+            batcher.query(docs, "hours", 1), batcher.query(docs, "address", 3), batcher.query(docs, "returns", 2)
+        )
+
+    assert asyncio.run(main()) == [
+        ["hours-0"],
+        ["address-0", "address-1", "address-2"],
+        ["returns-0", "returns-1"],
+    ]
+    assert calls == [("docs", ["hours", "address", "returns"], 3)]
+    assert batcher.stats() == {"batches": 1, "queries": 3, "avg_batch_size": 3.0}
+    assert not batcher._tasks
+
+
+def test_batches_are_split_by_collection_and_size(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retrieval, "query_scored_batch", _fake_batch(calls))
+    batcher = RetrievalBatcher(window_ms=1000, max_batch=2)
+    docs, faq = Collection("docs"), Collection("faq")
+
+    async def main():
+        # A full batch flushes at once; the window is long enough that a timer flush would time out.
+        full = asyncio.gather(batcher.query(docs, "a", 1), batcher.query(docs, "b", 1))
+        return await asyncio.wait_for(full, 0.5), await batcher.query(faq, "c", 1)
+
+    assert asyncio.run(main()) == ([["a-0"], ["b-0"]], ["c-0"])
+    assert calls == [("docs", ["a", "b"], 1), ("faq", ["c"], 1)]
+
+
+def test_a_failed_batch_fails_every_caller(monkeypatch):
+    def broken(collection, texts, n):
+        raise RuntimeError("store unavailable")
+
+    monkeypatch.setattr(retrieval, "query_scored_batch", broken)
+    batcher = RetrievalBatcher(window_ms=1)
+    docs = Collection("docs")
+
+    async def main():
+        return await asyncio.gather(batcher.query(docs, "a"), batcher.query(docs, "b"), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ["store unavailable", "store unavailable"]
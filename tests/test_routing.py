@@ -0,0 +1,48 @@
+"""Tests for model tier routing and escalation."""
+
+import pytest
+
+from routing import COMPLEX, FAQ, SMALL_TALK, ModelRouter, ModelTier
+
+
+def _router(**kwargs):
+    tiers = {name: ModelTier(name, f"{name}-model", 256) for name in (SMALL_TALK, FAQ, COMPLEX)}
+    return ModelRouter(tiers, faq_min_score=0.6, complex_min_words=25, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "message, top_score, tier",
+    [
+        ("Hi there!", None, SMALL_TALK),
+        ("thanks so much", None, SMALL_TALK),
+        ("👍", None, SMALL_TALK),
+        ("What time do you open?", 0.8, FAQ),
+        ("What time do you open?", 0.3, COMPLEX),
+        ("What time do you open?", None, COMPLEX),
+        ("Why was my order late?", 0.9, COMPLEX),
+        ("Do you deliver? Do you take cards?", 0.9, COMPLEX),
+        (" ".join(["word"] * 25), 0.9, COMPLEX),
+    ],
+)
+def test_classify_picks_the_tier(message, top_score, tier):
+    assert _router().classify(message, top_score) == tier
+
+
+def test_disabled_router_sends_everything_to_the_complex_tier():
+    router = _router(enabled=False)
+    assert not router.is_small_talk("hi")
+    assert router.classify("hi") == COMPLEX
+
+
+def test_small_tier_replies_escalate_when_they_hedge_or_are_cut_off():
+    router = _router()
+    faq, small_talk, complex_tier = router.tiers[FAQ], router.tiers[SMALL_TALK], router.tiers[COMPLEX]
+
+    assert not router.should_escalate(faq, "We open at 9am.", "stop")
+    assert router.should_escalate(faq, "I’m not sure about that.", "stop")
+    assert router.should_escalate(faq, "We open at", "length")
+    assert router.should_escalate(faq, "  ", "stop")
+    assert not router.should_escalate(small_talk, "I'm not sure, but hello!", "length")
+    assert router.should_escalate(small_talk, "", "stop")
+    assert not router.should_escalate(complex_tier, "", "length")
+    assert not _router(escalate=False).should_escalate(faq, "I don't know.", "stop")
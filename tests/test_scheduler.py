@@ -0,0 +1,84 @@
+"""Tests for chat admission control, rate limiting, and per-user ordering."""
+
+import asyncio
+
+import pytest
+
+from scheduler import ChatScheduler, Overloaded, TokenBucket
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, capacity=1.0)
+    start = bucket.updated
+    assert bucket.wait_time(start) == 0.0
+    bucket.consume()
+    assert bucket.wait_time(start) == pytest.approx(0.5)
+    assert bucket.wait_time(start + 0.5) == 0.0
+
+
+def test_user_over_their_burst_is_shed_with_a_retry_hint():
+    scheduler = ChatScheduler(user_rate_per_minute=6.0, user_burst=2.0, max_user_queue=10)
+    scheduler.admit("u1").release()
+    scheduler.admit("u1").release()
+    with pytest.raises(Overloaded) as shed:
+        scheduler.admit("u1")
+    assert shed.value.reason == "user rate limit"
+    assert 1 <= shed.value.retry_after <= 10
+    # Other users have their own bucket.
+    scheduler.admit("u2").release()
+    assert scheduler.shed == {"user rate limit": 1}
+
+
+def test_global_rate_limit_and_queue_limits_shed():
+    scheduler = ChatScheduler(global_rate_per_second=1.0, global_burst=1.0)
+    scheduler.admit("u1").release()
+    with pytest.raises(Overloaded) as shed:
+        scheduler.admit("u2")
+    assert shed.value.reason == "global rate limit"
+
+    scheduler = ChatScheduler(max_user_queue=1, max_queue=2)
+    scheduler.admit("u1")
+    with pytest.raises(Overloaded) as shed:
+        scheduler.admit("u1")
+    assert shed.value.reason == "user queue full"
+    scheduler.admit("u2")
+    with pytest.raises(Overloaded) as shed:
+        scheduler.admit("u3")
+    assert shed.value.reason == "queue full"
+
+
+def test_each_users_messages_run_one_at_a_time_in_order():
+    scheduler = ChatScheduler(max_user_queue=5, user_burst=5.0)
+    order = []
+
+    async def handle(user_id, message, delay):
+        async with scheduler.admit(user_id):
+            order.append(f"start {message}")
+            await asyncio.sleep(delay)
+            order.append(f"end {message}")
+
+    async def main():
+        await asyncio.gather(handle("u1", "a", 0.03), handle("u1", "b", 0.0), handle("u2", "c", 0.01))
+
+    asyncio.run(main())
+    assert order.index("end a") < order.index("start b")
+    # Another user's message does not wait behind u1.
+    assert order.index("start c") < order.index("end a")
+    assert scheduler.pending == 0 and not scheduler._user_locks
+
+
+def test_llm_slots_cap_concurrent_calls():
+    scheduler = ChatScheduler(max_in_flight=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with scheduler.llm_slot():
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(5)))
+
+    asyncio.run(main())
+    assert peak == 2 and scheduler.in_flight == 0
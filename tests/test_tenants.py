@@ -0,0 +1,89 @@
+"""Tests for tenant configuration, routing, key scoping, and idle eviction."""
+
+import json
+
+import pytest
+
+from tenants import DEFAULT_TENANT_ID, Tenant, TenantRegistry
+
+
+def test_tenants_do_not_inherit_messaging_credentials_or_lead_sheet(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "GOOGLE_SHEET_ID", "default-sheet")
+    tenant = Tenant("acme", {"business_name": "Acme"})
+
+    assert (tenant.twilio_account_sid, tenant.twilio_auth_token, tenant.meta_page_access_token) == ("", "", "")
+    assert tenant.google_sheet_id == ""
+    assert tenant.groq_api_key == settings.GROQ_API_KEY
+    assert TenantRegistry().default.twilio_account_sid == settings.TWILIO_ACCOUNT_SID
+
+
+def test_every_tenant_scopes_its_keys():
+    registry = TenantRegistry()
+    acme = Tenant("acme", {})
+
+    assert registry.default.scoped("u1") == f"{DEFAULT_TENANT_ID}:u1"
+    assert acme.scoped("whatsapp:+15550001111") == "acme:whatsapp:+15550001111"
+    # A client-chosen web user ID cannot collide with another tenant's key.
+    assert registry.default.scoped("acme:whatsapp:+15550001111") != acme.scoped("whatsapp:+15550001111")
+
+
+def test_tenant_ids_with_a_colon_are_rejected(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps([{"id": "acme:evil"}]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        TenantRegistry(config_path=str(path))
+
+
+def _registry(tmp_path, entries, **kwargs):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps(entries), encoding="utf-8")
+    return TenantRegistry(config_path=str(path), **kwargs)
+
+
+def test_requests_route_by_api_key_number_and_account(tmp_path):
+    registry = _registry(
+        tmp_path,
+        [
+            {"id": "acme", "api_keys": ["acme-key"], "whatsapp_number": "whatsapp:+1 555 000 1111"},
+            {"id": "globex", "api_keys": ["globex-key"], "instagram_account_id": "17841"},
+        ],
+    )
+
+    assert registry.by_api_key("acme-key").id == "acme"
+    assert registry.by_api_key("") is registry.default
+    assert registry.by_api_key("unknown") is None
+    assert registry.by_whatsapp_number("+15550001111").id == "acme"
+    assert registry.by_whatsapp_number("whatsapp:+19999999999") is registry.default
+    assert registry.by_instagram_account("17841").id == "globex"
+    assert registry.by_instagram_account("other") is registry.default
+    assert registry.is_own_instagram_account("17841") and not registry.is_own_instagram_account("")
+
+
+def test_tenants_cannot_share_a_routing_key(tmp_path):
+    with pytest.raises(ValueError):
+        _registry(tmp_path, [{"id": "acme", "api_keys": ["key"]}, {"id": "globex", "api_keys": ["key"]}])
+
+
+def test_idle_tenant_resources_are_closed_and_recreated(tmp_path):
+    registry = _registry(tmp_path, [{"id": "acme"}], idle_seconds=100.0)
+    acme = registry.get("acme")
+    closed = []
+    created = []
+
+    def factory():
+        created.append(1)
+        return f"client-{len(created)}"
+
+    assert registry.resource(acme, "client", factory, closed.append) == "client-1"
+    assert registry.resource(registry.default, "client", factory, closed.append) == "client-2"
+    assert registry.resource(acme, "client", factory, closed.append) == "client-1"
+
+    assert registry.evict_idle(registry._last_sweep + 50) == 0
+    assert registry.evict_idle(registry._last_used["acme"] + 101) == 1
+    # The default tenant's resources live for the whole process.
+    assert closed == ["client-1"]
+    assert registry.resource(acme, "client", factory, closed.append) == "client-3"
+    assert registry.resource(registry.default, "client", factory, closed.append) == "client-2"
+    assert registry.evictions == 1
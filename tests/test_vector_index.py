@@ -0,0 +1,96 @@
+"""Tests for publishing and reloading the NumPy vector index."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from vector_index import NumpyVectorIndex
+
+
+def _vectors(count, start=0):
+    rng = np.random.default_rng(start)
+    return rng.standard_normal((count, 8)).astype(np.float32)
+
+
+def test_concurrent_writers_do_not_lose_chunks(tmp_path):
+    writers = [NumpyVectorIndex("docs", tmp_path) for _ in range(4)]
+
+    def write(number, index):
+        for batch in range(5):
+            ids = [f"w{number}-{batch}-{row}" for row in range(5)]
+            index.upsert(ids, ids, embeddings=_vectors(5, number * 10 + batch))
+
+    threads = [threading.Thread(target=write, args=pair) for pair in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert NumpyVectorIndex("docs", tmp_path).count() == 100
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_upsert_replaces_and_appends_rows(tmp_path, dtype):
+    index = NumpyVectorIndex("docs", tmp_path, dtype=dtype)
+    vectors = _vectors(3)
+    index.upsert(["a", "b"], ["A", "B"], embeddings=vectors[:2])
+    index.upsert(["b", "c", "c"], ["B2", "C", "C2"], embeddings=np.vstack([vectors[0], vectors[1], vectors[2]]))
+
+    assert index.get()["documents"] == ["A", "B2", "C2"]
+    top = index.query(query_embeddings=vectors[2:3], n_results=1)
+    assert top["ids"] == [["c"]]
+    top = index.query(query_embeddings=vectors[0:1], n_results=2)
+    assert sorted(top["ids"][0]) == ["a", "b"]
+
+
+def test_publish_keeps_the_previous_version(tmp_path):
+    index = NumpyVectorIndex("docs", tmp_path)
+    for number in range(4):
+        index.upsert([f"id{number}"], ["text"], embeddings=_vectors(1, number))
+
+    assert len(list(index.path.glob("records-*.json"))) == 2
+    assert len(list(index.path.glob("embeddings-*.npy"))) == 2
+
+
+def test_reader_retries_when_its_version_is_removed(tmp_path, monkeypatch):
+    writer = NumpyVectorIndex("docs", tmp_path)
+    writer.upsert(["a"], ["A"], embeddings=_vectors(1))
+    reader = NumpyVectorIndex("docs", tmp_path)
+    writer.upsert(["b"], ["B"], embeddings=_vectors(1, 1))
+
+    original = reader._load_manifest
+    calls = []
+
+    def racing_load():
+        calls.append(1)
+        if len(calls) == 1:
+            raise FileNotFoundError("records removed by a writer")
+        original()
+
+    monkeypatch.setattr(reader, "_load_manifest", racing_load)
+    assert reader.count() == 2
+    assert len(calls) == 2
+
+
+def test_batch_publishes_all_changes_as_one_version(tmp_path, monkeypatch):
+    index = NumpyVectorIndex("docs", tmp_path)
+    index.upsert(["a", "b", "c"], ["A", "B", "C"], embeddings=_vectors(3))
+    publishes = []
+    original = index._publish
+    monkeypatch.setattr(index, "_publish", lambda *args: publishes.append(1) or original(*args))
+
+    batch = index.batch()
+    batch.upsert(["d"], ["D"], embeddings=_vectors(1, 1))
+    batch.update(["a", "missing"], metadatas=[{"version": "2"}, {"version": "2"}])
+    batch.delete(["b", "d"])
+    batch.upsert(["d"], ["D2"], embeddings=_vectors(1, 2))
+    batch.update(["d"], metadatas=[{"version": "2"}])
+    assert index.count() == 3 and not publishes
+
+    batch.commit()
+    stored = index.get()
+    assert publishes == [1]
+    assert stored["ids"] == ["a", "c", "d"]
+    assert stored["documents"] == ["A", "C", "D2"]
+    assert stored["metadatas"] == [{"version": "2"}, {}, {"version": "2"}]
@@ -1,6 +1,7 @@
 /**
  * Embeddable website chat widget.
  * Usage: <script src="widget.js" data-api-url="https://your-api-url"></script>
+ * Replies stream token by token; add data-stream="false" to use single-shot replies.
  */
 (function () {
   "use strict";
@@ -37,6 +38,17 @@
 
   injectStylesheet(scriptEl);
 
+  var baseUrl = apiUrl.replace(/\/$/, "");
+  var streamingEnabled = scriptEl.getAttribute("data-stream") !== "false";
+  var apiKey = scriptEl.getAttribute("data-api-key") || "";
+
+  /** Build request headers, adding the tenant API key when the embed sets one. */
+  function requestHeaders(extra) {
+    var headers = Object.assign({ "Content-Type": "application/json" }, extra || {});
+    if (apiKey) headers["X-API-Key"] = apiKey;
+    return headers;
+  }
+
   var conversation = [];
   var userId = "web_" + Math.random().toString(36).slice(2) + Date.now().toString(36);
   var isOpen = false;
@@ -92,6 +104,95 @@
     panel.style.display = isOpen ? "flex" : "none";
   }
 
+  /** Create an empty bot bubble and return its text node container. */
+  function addStreamingMessage() {
+    var wrap = el("div", "wa-widget-msg-wrap bot");
+    var bubble = el("div", "wa-widget-msg", "");
+    wrap.appendChild(bubble);
+    body.appendChild(wrap);
+    scrollToBottom();
+    return bubble;
+  }
+
+  /** Parse one Server-Sent Events frame into its event name and JSON data. */
+  function parseSseFrame(frame) {
+    var event = "message";
+    var data = "";
+    frame.split("\n").forEach(function (line) {
+      if (line.indexOf("event:") === 0) event = line.slice(6).trim();
+      else if (line.indexOf("data:") === 0) data += line.slice(5).trim();
+    });
+    if (!data) return null;
+    try {
+      return { event: event, data: JSON.parse(data) };
+    } catch (error) {
+      return null;
+    }
+  }
+
+  /** Request a full reply from the non-streaming endpoint. */
+  async function fetchReply(text) {
+    var response = await fetch(baseUrl + "/chat/message", {
+      method: "POST",
+      headers: requestHeaders(),
+      body: JSON.stringify({ user_id: userId, message: text }),
+    });
+    var data = await response.json();
+    return data.reply || "Sorry, I could not process that right now.";
+  }
+
+  /** Stream reply tokens into a bot bubble and return the final reply text. */
+  async function streamReply(text, typingNode) {
+    var response = await fetch(baseUrl + "/chat/stream", {
+      method: "POST",
+      headers: requestHeaders({ Accept: "text/event-stream" }),
+      body: JSON.stringify({ user_id: userId, message: text }),
+    });
+    if (!response.ok || !response.body) throw new Error("Streaming unavailable");
+
+    var reader = response.body.getReader();
+    var decoder = new TextDecoder();
+    var buffer = "";
+    var reply = "";
+    var bubble = null;
+
+    while (true) {
+      var result = await reader.read();
+      if (result.done) break;
+      buffer += decoder.decode(result.value, { stream: true });
+
+      var boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        var frame = parseSseFrame(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf("\n\n");
+        if (!frame) continue;
+
+        if (frame.event === "token") {
+          if (!bubble) {
+            typingNode.remove();
+            bubble = addStreamingMessage();
+          }
+          reply += frame.data.token;
+          bubble.textContent = reply;
+          scrollToBottom();
+        } else if (frame.event === "done") {
+          reply = frame.data.reply || reply;
+        } else if (frame.event === "error") {
+          throw new Error(frame.data.detail || "Streaming failed");
+        }
+      }
+    }
+
+    if (!bubble) {
+      typingNode.remove();
+      bubble = addStreamingMessage();
+    }
+    reply = reply || "Sorry, I could not process that right now.";
+    bubble.textContent = reply;
+    return reply;
+  }
+
   /** Send user text to backend and render response. */
   async function sendMessage() {
     var text = input.value.trim();
@@ -103,16 +204,15 @@
 
     var typingNode = showTyping();
     try {
-      var response = await fetch(apiUrl.replace(/\/$/, "") + "/chat/message", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ user_id: userId, message: text }),
-      });
-      var data = await response.json();
-      var reply = data.reply || "Sorry, I could not process that right now.";
+      var reply;
+      if (streamingEnabled && window.ReadableStream && window.TextDecoder) {
+        reply = await streamReply(text, typingNode);
+      } else {
+        reply = await fetchReply(text);
+        typingNode.remove();
+        addMessage("bot", reply);
+      }
       conversation.push({ role: "bot", text: reply });
-      typingNode.remove();
-      addMessage("bot", reply);
     } catch (error) {
       typingNode.remove();
       addMessage("bot", "Network error. Please try again.");